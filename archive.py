@@ -0,0 +1,216 @@
+import glob
+import gzip
+import json
+import mmap
+import os
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.client import responses as REASONS
+
+from crawl_output import read_ndjson
+
+# Configuration
+ARCHIVE_CONFIG = {
+    "enabled": False,  # Keep every fetched response and rendered DOM for re-extraction (--archive)
+    "path": "pages.warc.gz",  # Archive name; records go to segments like pages-<run>-0001.warc.gz
+    "index_path": "pages.warc.idx.ndjson",  # file, url, kind, offset and length of every record
+    "max_bytes": 256 * 1024 * 1024,  # A segment this large is closed and the next one started
+    "max_segments": 20,  # Oldest segments are deleted beyond this many (None = keep all)
+    "compress_level": 6  # gzip level of each record
+}
+
+# Transport headers that no longer describe the stored (decoded) body
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def _warc_record(warc_type, url, content_type, block):
+    header = (
+        "WARC/1.1\r\n"
+        f"WARC-Type: {warc_type}\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(block)}\r\n"
+        "\r\n"
+    )
+    return header.encode("utf-8") + block + b"\r\n\r\n"
+
+
+def _segment_path(path, name):
+    """Path of archive segment `name` (or a glob of all of them, for "*")"""
+    directory, base = os.path.split(path)
+    stem, dot, extension = base.partition(".")
+    return os.path.join(directory, f"{stem}-{name}{dot}{extension}")
+
+
+def segment_paths(path=None):
+    """Every segment of an archive, oldest first"""
+    return sorted(glob.glob(_segment_path(path or ARCHIVE_CONFIG["path"], "*")))
+
+
+def _parse_headers(lines):
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+    return headers
+
+
+class PageArchive:
+    """Append-only, WARC-style archive of fetched pages with an offset index.
+
+    Each record (an HTTP response with status, headers and body, or the
+    rendered DOM of a browser page) is its own gzip member, so any record
+    can be read back alone from its offset. Every run writes new segment
+    files named after its start time; a segment is closed at max_bytes and
+    only the newest max_segments are kept. The index is an NDJSON file with
+    one line per record, naming its segment.
+    """
+
+    def __init__(self, path=None, index_path=None):
+        self.path = path or ARCHIVE_CONFIG["path"]
+        self.index_path = index_path or ARCHIVE_CONFIG["index_path"]
+        self.run = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.part = 0
+        self._file = None
+        self._next_segment()
+        self._index = open(self.index_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def _next_segment(self):
+        if self._file:
+            self._file.close()
+        self.part += 1
+        self.segment = _segment_path(self.path, f"{self.run}-{self.part:04d}")
+        while os.path.exists(self.segment):  # Another run started in the same second
+            self.part += 1
+            self.segment = _segment_path(self.path, f"{self.run}-{self.part:04d}")
+        self._file = open(self.segment, "ab")
+        if ARCHIVE_CONFIG["max_segments"]:
+            for old in segment_paths(self.path)[:-ARCHIVE_CONFIG["max_segments"]]:
+                os.remove(old)  # Its index entries are skipped from now on
+
+    def _append(self, url, kind, record, **fields):
+        data = gzip.compress(record, ARCHIVE_CONFIG["compress_level"])
+        with self._lock:
+            offset = self._file.tell()
+            if offset and ARCHIVE_CONFIG["max_bytes"] and offset + len(data) > ARCHIVE_CONFIG["max_bytes"]:
+                self._next_segment()
+                offset = 0
+            self._file.write(data)
+            self._file.flush()
+            entry = dict(file=os.path.basename(self.segment), url=url, kind=kind, offset=offset,
+                         length=len(data), **fields)
+            self._index.write(json.dumps(entry) + "\n")
+            self._index.flush()
+
+    def write_response(self, response):
+        """Archive a fetcher.FetchResult: status line, headers and decoded body"""
+        if response.status_code is None:
+            return
+        status_line = f"HTTP/1.1 {response.status_code} {REASONS.get(response.status_code, '')}"
+        headers = [f"{name}: {value}" for name, value in response.headers.items()
+                   if name.lower() not in DROPPED_HEADERS]
+        block = ("\r\n".join([status_line] + headers) + "\r\n\r\n").encode("utf-8") + response.content
+        record = _warc_record("response", response.url, "application/http;msgtype=response", block)
+        self._append(response.url, "response", record, status=response.status_code,
+                     encoding=response.encoding)
+
+    def write_rendered(self, url, html):
+        """Archive the DOM of a page as rendered by the browser"""
+        block = html.encode("utf-8")
+        record = _warc_record("resource", url, "text/html; charset=utf-8", block)
+        self._append(url, "rendered", record, status=200, encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._index.close()
+
+
+class ArchiveReader:
+    """Random access to a PageArchive through read-only mmaps of its segments"""
+
+    def __init__(self, path=None, index_path=None):
+        self.path = path or ARCHIVE_CONFIG["path"]
+        self.index_path = index_path or ARCHIVE_CONFIG["index_path"]
+        self._maps = {}  # segment file name -> (file, mmap), or None if it is gone
+
+    def _map(self, name):
+        # Entries written before segments existed have no file name
+        name = name or os.path.basename(self.path)
+        if name not in self._maps:
+            try:
+                f = open(os.path.join(os.path.dirname(self.path), name), "rb")
+            except FileNotFoundError:
+                self._maps[name] = None
+            else:
+                size = os.fstat(f.fileno()).st_size
+                self._maps[name] = f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        segment = self._maps[name]
+        return segment[1] if segment else None
+
+    def entries(self):
+        """Index entries in archive order
+
+        Records cut short by a crash, or in segments deleted since, are
+        skipped.
+        """
+        for entry in read_ndjson(self.index_path):
+            data = self._map(entry.get("file"))
+            if data is not None and entry["offset"] + entry["length"] <= len(data):
+                yield entry
+
+    def latest(self, kinds=("rendered", "response")):
+        """The newest entry per URL, preferring kinds earlier in `kinds`"""
+        best = {}
+        for entry in self.entries():
+            if entry["kind"] not in kinds:
+                continue
+            current = best.get(entry["url"])
+            if current is None or kinds.index(entry["kind"]) <= kinds.index(current["kind"]):
+                best[entry["url"]] = entry
+        return list(best.values())
+
+    def read(self, offset, length, file=None):
+        """Decode the record at `offset` of segment `file`: {url, kind, status, headers, body}"""
+        data = zlib.decompress(self._map(file)[offset:offset + length], wbits=31)
+        warc_head, _, rest = data.partition(b"\r\n\r\n")
+        warc_headers = _parse_headers(warc_head.decode("utf-8").split("\r\n")[1:])
+        block = rest[:int(warc_headers["Content-Length"])]
+        record = {"url": warc_headers["WARC-Target-URI"], "status": 200, "headers": {}}
+        if warc_headers["WARC-Type"] == "response":
+            http_head, _, body = block.partition(b"\r\n\r\n")
+            lines = http_head.decode("iso-8859-1").split("\r\n")
+            record.update(kind="response", status=int(lines[0].split()[1]),
+                          headers=_parse_headers(lines[1:]), body=body)
+        else:
+            record.update(kind="rendered", body=block)
+        return record
+
+    def html(self, entry):
+        """The archived HTML of an index entry, decoded"""
+        record = self.read(entry["offset"], entry["length"], entry.get("file"))
+        return record["body"].decode(entry.get("encoding") or "utf-8", errors="replace")
+
+    def close(self):
+        for segment in self._maps.values():
+            if segment:
+                f, data = segment
+                if isinstance(data, mmap.mmap):
+                    data.close()
+                f.close()
+
+
+_archive = None
+
+
+def get_archive():
+    """Shared PageArchive, or None unless ARCHIVE_CONFIG["enabled"] (--archive) is on"""
+    global _archive
+    if _archive is None and ARCHIVE_CONFIG["enabled"]:
+        _archive = PageArchive()
+    return _archive
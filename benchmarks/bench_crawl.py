@@ -0,0 +1,173 @@
+"""Throughput, latency and resource use of crawler.py and scrapper.py against a mock site.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_crawl [crawler|scrapper|both] [--pages 400] [--latency-ms 20]
+                                     [--output results.json] [--compare baseline.json]
+
+A benchmarks.mock_site.MockSite is started locally and each pipeline runs
+its main() against it in a fresh process and a scratch directory, so
+caches and output files never carry over between runs. crawler.py fetches
+every page of the site; scrapper.py analyses the sitemap index (expanding
+every child) and crawls the sections. Reported per run: pages served per
+second, p50/p99 request latency as the crawler sees it (the metrics
+module's fetch_seconds, which includes waiting for a pooled connection),
+peak RSS over the crawler process and its extractor processes, and CPU
+seconds. With --output the numbers are saved; --compare prints the change
+against numbers saved earlier. Pages rendered by JavaScript (--js-fraction)
+need Chrome.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_site import SECTIONS, add_site_arguments, page_paths, site_from_arguments
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_FILE = "bench_result.json"
+TARGETS = ["crawler", "scrapper"]
+
+
+def peak_rss_mb(who):
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB elsewhere
+
+
+def run_child(target, base_url, pages, depth, delay):
+    """Run one pipeline in this process (the scratch directory is the cwd) and save its usage"""
+    import fetcher
+    from metrics import METRICS_CONFIG
+    METRICS_CONFIG["sinks"] = ["jsonl"]
+    fetcher.FETCH_CONFIG["min_delay"] = delay
+    if target == "crawler":
+        import crawler
+        crawler.CONFIG.update(seeds=[base_url], sections=page_paths(pages), delay=delay)
+        main = crawler.main
+    else:
+        import scrapper
+        scrapper.SEED_URLS = [base_url]
+        scrapper.MAX_DEPTH = depth
+        scrapper.MAX_PAGES_PER_SECTION = len(page_paths(pages)) // len(SECTIONS)
+        scrapper.CRAWL_DELAY = delay
+        scrapper.EXPAND_SITEMAPS = True
+        scrapper.MAX_CHILD_SITEMAPS = None
+        main = scrapper.main
+    start = time.perf_counter()
+    main()
+    wall = time.perf_counter() - start
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    with open(RESULT_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "wall_s": wall,
+            "cpu_s": sum(u.ru_utime + u.ru_stime for u in usage),
+            "peak_rss_mb": max(peak_rss_mb(resource.RUSAGE_SELF), peak_rss_mb(resource.RUSAGE_CHILDREN))
+        }, f)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def read_metrics(path):
+    latencies = []
+    sitemap_s = 0.0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["name"] == "fetch_seconds":
+                latencies.append(record["value"])
+            elif record["name"] == "sitemap_seconds":
+                sitemap_s += record["value"]
+    return sorted(latencies), sitemap_s
+
+
+def bench(target, site, args):
+    """Run `target` once against the site and return its numbers"""
+    site.reset_counts()
+    with tempfile.TemporaryDirectory(prefix=f"bench_{target}_") as workdir:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")])))
+        command = [sys.executable, "-m", "benchmarks.bench_crawl", "--child", target,
+                   "--base-url", site.base_url, "--pages", str(args.pages),
+                   "--depth", str(args.depth), "--delay", str(args.delay)]
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run(command, cwd=workdir, env=env, stdout=output, check=True)
+        with open(os.path.join(workdir, RESULT_FILE), "r", encoding="utf-8") as f:
+            result = json.load(f)
+        latencies, sitemap_s = read_metrics(os.path.join(workdir, "crawl_metrics.jsonl"))
+    pages = site.counts["pages"]
+    return {
+        "pages": pages,
+        "sitemaps": site.counts["sitemaps"],
+        "mb": round(site.counts["bytes"] / 1024 ** 2, 1),
+        "wall_s": round(result["wall_s"], 2),
+        "sitemap_s": round(sitemap_s, 2),
+        "pages_per_s": round(pages / result["wall_s"], 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "peak_rss_mb": round(result["peak_rss_mb"], 1),
+        "cpu_s": round(result["cpu_s"], 2)
+    }
+
+
+COLUMNS = ["pages", "sitemaps", "mb", "wall_s", "sitemap_s", "pages_per_s", "p50_ms", "p99_ms",
+           "peak_rss_mb", "cpu_s"]
+
+
+def print_table(results, baseline=None):
+    print(f"{'target':<10}" + "".join(f"{column:>13}" for column in COLUMNS))
+    for target, numbers in results.items():
+        print(f"{target:<10}" + "".join(f"{numbers[column]:>13}" for column in COLUMNS))
+        if baseline and target in baseline["results"]:
+            before = baseline["results"][target]
+            changes = [f"{(numbers[c] - before[c]) / before[c] * 100:+.0f}%" if before[c] else "n/a"
+                       for c in COLUMNS]
+            print(f"{'  vs base':<10}" + "".join(f"{change:>13}" for change in changes))
+
+
+def run(args):
+    targets = TARGETS if args.target == "both" else [args.target]
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    with site_from_arguments(args) as site:
+        print(f"Mock site at {site.base_url}: {args.pages} pages, fan-out {args.fanout}, "
+              f"{args.sitemap_children} child sitemaps, {args.latency_ms}+{args.jitter_ms} ms latency\n")
+        results = {}
+        for target in targets:
+            runs = [bench(target, site, args) for _ in range(args.repeat)]
+            # Keep the run with the median wall time
+            results[target] = sorted(runs, key=lambda numbers: numbers["wall_s"])[len(runs) // 2]
+    print_table(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"options": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+                       "results": results}, f, indent=2)
+        print(f"\nSaved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("target", nargs="?", default="both", choices=TARGETS + ["both"])
+    add_site_arguments(arg_parser)
+    arg_parser.add_argument("--depth", type=int, default=3, help="scrapper.py crawl depth")
+    arg_parser.add_argument("--delay", type=float, default=0.0, help="per-host crawl delay in seconds")
+    arg_parser.add_argument("--repeat", type=int, default=1, help="runs per target (the median is kept)")
+    arg_parser.add_argument("--output", help="save the results as JSON")
+    arg_parser.add_argument("--compare", help="JSON saved by --output to compare against")
+    arg_parser.add_argument("--verbose", action="store_true", help="show the pipelines' own output")
+    arg_parser.add_argument("--child", choices=TARGETS, help=argparse.SUPPRESS)
+    arg_parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    if args.child:
+        run_child(args.child, args.base_url, args.pages, args.depth, args.delay)
+    else:
+        run(args)
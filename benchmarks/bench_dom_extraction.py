@@ -0,0 +1,81 @@
+"""Compare per-element WebDriver extraction with the single-script payload.
+
+Run from the repository root (needs Chrome):
+
+    python -m benchmarks.bench_dom_extraction https://www.khanacademy.org/math
+"""
+import argparse
+import statistics
+import time
+
+from selenium.webdriver.common.by import By
+
+from dom_extract import extract_page
+from scrapper import setup_selenium
+
+
+def legacy_extract(driver):
+    """The old path: one find_elements per heading level, one call per element"""
+    headings = []
+    for level in range(1, 7):
+        for element in driver.find_elements(By.TAG_NAME, f"h{level}"):
+            text = element.text.strip()
+            if text:
+                headings.append({"level": level, "text": text})
+    links = []
+    for element in driver.find_elements(By.TAG_NAME, "a"):
+        href = element.get_attribute("href")
+        if href:
+            links.append(href)
+    return {"headings": headings, "links": links}
+
+
+def count_roundtrips(driver):
+    """Wrap driver.execute so every WebDriver command is counted"""
+    counter = {"calls": 0}
+    execute = driver.execute
+
+    def counting_execute(*args, **kwargs):
+        counter["calls"] += 1
+        return execute(*args, **kwargs)
+    driver.execute = counting_execute
+    return counter
+
+
+def run(urls, repeat):
+    driver = setup_selenium()
+    counter = count_roundtrips(driver)
+    modes = {"per-element": legacy_extract, "batched": extract_page}
+    stats = {mode: {"ms": [], "calls": []} for mode in modes}
+    try:
+        for url in urls:
+            driver.get(url)
+            time.sleep(2)  # Let the page settle so both modes see the same DOM
+            for _ in range(repeat):
+                for mode, extract in modes.items():
+                    counter["calls"] = 0
+                    start = time.perf_counter()
+                    page = extract(driver)
+                    stats[mode]["ms"].append((time.perf_counter() - start) * 1000)
+                    stats[mode]["calls"].append(counter["calls"])
+            print(f"{url}: {len(page['headings'])} headings, {len(page['links'])} links")
+    finally:
+        driver.quit()
+
+    print(f"\n{'mode':<12} {'roundtrips/page':>16} {'median ms':>10} {'p95 ms':>8}")
+    for mode, values in stats.items():
+        ms = sorted(values["ms"])
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        print(f"{mode:<12} {statistics.mean(values['calls']):>16.0f} "
+              f"{statistics.median(ms):>10.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("urls", nargs="*", default=[
+        "https://www.khanacademy.org/math",
+        "https://www.khanacademy.org/science"
+    ])
+    parser.add_argument("--repeat", type=int, default=5, help="extractions per page and mode")
+    args = parser.parse_args()
+    run(args.urls, args.repeat)
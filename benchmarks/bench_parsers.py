@@ -0,0 +1,82 @@
+"""Pages/sec of extract_titles parsing for each HTML backend.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parsers [--fixtures DIR] [--repeat N]
+
+"legacy" is the original html.parser + five soup.select passes; the other
+rows are title_parser.parse_titles with each installed backend. Every
+backend must return the same titles as legacy on every fixture.
+"""
+import argparse
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from title_parser import BACKENDS, parse_titles
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_titles(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    titles = []
+    for selector in ('a[data-test-id="nav-item"]', '.subject-title, .domain-title', '.course-title'):
+        titles.extend([e.text.strip() for e in soup.select(selector) if e.text.strip()])
+    if not titles:
+        titles.extend([h.text.strip() for h in soup.select('h1._1lrvdlvj, h2._14hvi6g8, h3.title') if h.text.strip()])
+    if not titles:
+        titles.extend([h.text.strip() for h in soup.find_all(['h1', 'h2', 'h3']) if h.text.strip()])
+    return titles
+
+
+def load_fixtures(directory):
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def pages_per_second(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages.values():
+            parse(html)
+    return repeat * len(pages) / (time.perf_counter() - start)
+
+
+def run(directory, repeat):
+    pages = load_fixtures(directory)
+    expected = {name: legacy_titles(html) for name, html in pages.items()}
+    size_kb = sum(len(html) for html in pages.values()) / 1024
+    print(f"{len(pages)} fixtures, {size_kb:.0f} KB total, {repeat} rounds\n")
+
+    runners = {"legacy": legacy_titles}
+    for backend in BACKENDS:
+        runners[backend] = lambda html, backend=backend: parse_titles(html, backend)
+
+    baseline = None
+    print(f"{'backend':<12} {'pages/sec':>10} {'speedup':>8}")
+    for name, parse in runners.items():
+        try:
+            for page, html in pages.items():
+                if parse(html) != expected[page]:
+                    print(f"{name:<12} MISMATCH on {page}")
+                    break
+            else:
+                rate = pages_per_second(parse, pages, repeat)
+                baseline = baseline or rate
+                print(f"{name:<12} {rate:>10.1f} {rate / baseline:>7.1f}x")
+        except ImportError as e:
+            print(f"{name:<12} {'skipped':>10} ({e})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the fixtures per backend")
+    args = parser.parse_args()
+    run(args.fixtures, args.repeat)
@@ -0,0 +1,74 @@
+"""Microseconds per can_fetch check: robots.RobotsPolicy vs urllib.robotparser.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_robots [--robots FILE] [--urls N]
+
+Without --robots a synthetic robots.txt with a few hundred rules is used.
+Both implementations are checked on the same URLs; URLs on which they
+disagree are counted (robotparser uses first-match, not longest-match, and
+knows no wildcards, so some disagreement is expected).
+"""
+import argparse
+import random
+import time
+from urllib import robotparser
+
+from robots import RobotsPolicy
+
+BASE_URL = "https://www.khanacademy.org"
+
+
+def synthetic_robots(rules=300):
+    rng = random.Random(0)
+    lines = ["User-agent: *"]
+    for i in range(rules):
+        kind = rng.choice(["Disallow", "Allow"])
+        lines.append(f"{kind}: /{rng.choice(['math', 'science', 'api', 'profile'])}/{i}/")
+    lines += ["Disallow: /*?lang=", "Disallow: /*.json$", "Crawl-delay: 1"]
+    return "\n".join(lines)
+
+
+def sample_urls(count):
+    rng = random.Random(1)
+    sections = ["math", "science", "api", "profile", "computing"]
+    return [f"{BASE_URL}/{rng.choice(sections)}/{rng.randrange(400)}/{rng.randrange(1000)}"
+            + rng.choice(["", "?lang=fr", ".json"]) for _ in range(count)]
+
+
+def microseconds_per_check(check, urls):
+    start = time.perf_counter()
+    for url in urls:
+        check(url)
+    return (time.perf_counter() - start) / len(urls) * 1e6
+
+
+def run(text, count):
+    urls = sample_urls(count)
+    policy = RobotsPolicy(text)
+    parser = robotparser.RobotFileParser()
+    parser.parse(text.splitlines())
+
+    runners = {
+        "robotparser": lambda url: parser.can_fetch("*", url),
+        "robots": policy.can_fetch
+    }
+    print(f"{len(text.splitlines())} robots.txt lines, {count} URLs\n")
+    print(f"{'engine':<12} {'us/check':>9}")
+    for name, check in runners.items():
+        print(f"{name:<12} {microseconds_per_check(check, urls):>9.2f}")
+    disagreements = sum(runners["robots"](url) != runners["robotparser"](url) for url in urls)
+    print(f"\n{disagreements} URLs decided differently")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--robots", help="robots.txt file to load instead of the synthetic one")
+    arg_parser.add_argument("--urls", type=int, default=100000, help="URLs to check")
+    args = arg_parser.parse_args()
+    if args.robots:
+        with open(args.robots, "r", encoding="utf-8") as f:
+            robots_text = f.read()
+    else:
+        robots_text = synthetic_robots()
+    run(robots_text, args.urls)
@@ -0,0 +1,227 @@
+"""Synthetic Khan Academy-like site served locally for crawler benchmarks.
+
+Serve it on its own with
+
+    python -m benchmarks.mock_site [--port 8800] [--pages 400] [--latency-ms 20]
+
+or start it from code with MockSite(...).start(). Every page, link and
+sitemap is derived from the page index, and injected latency from a hash
+of the path, so two runs with the same options see the same site.
+"""
+import argparse
+import gzip
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECTIONS = ["math", "science", "computing", "humanities"]
+LASTMOD = "2024-01-01"
+
+
+def page_paths(pages):
+    """Section pages first, then every page of a `pages`-page site in crawl order"""
+    per_section = max(1, pages // len(SECTIONS))
+    return ([f"/{section}" for section in SECTIONS]
+            + [f"/{section}/{n}" for n in range(per_section) for section in SECTIONS])
+
+
+class MockSite:
+    """Threaded HTTP server for a synthetic site.
+
+    `pages` pages are spread over SECTIONS as /<section>/<n>; each links
+    to `fanout` others in its section, so the section pages reach all of
+    them within a few levels. /sitemap.xml is an index of
+    `sitemap_children` child sitemaps (gzipped when `gzip_sitemaps`), each
+    listing `urls_per_sitemap` page URLs. A `js_fraction` of the pages
+    only build their headings and links in JavaScript, so they need a
+    browser. Every response waits `latency_ms` plus up to `jitter_ms`.
+    Requests served are counted in `counts`.
+    """
+
+    def __init__(self, pages=400, fanout=8, sitemap_children=100, urls_per_sitemap=500,
+                 gzip_sitemaps=True, latency_ms=20, jitter_ms=20, js_fraction=0.0,
+                 page_bytes=30000, host="127.0.0.1", port=0):
+        self.pages = pages
+        self.per_section = max(1, pages // len(SECTIONS))
+        self.fanout = fanout
+        self.sitemap_children = sitemap_children
+        self.urls_per_sitemap = urls_per_sitemap
+        self.gzip_sitemaps = gzip_sitemaps
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.js_fraction = js_fraction
+        self.page_bytes = page_bytes
+        self.counts = {"pages": 0, "sitemaps": 0, "other": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._sitemap = lru_cache(maxsize=1024)(self._sitemap)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self):
+        with self._lock:
+            for kind in self.counts:
+                self.counts[kind] = 0
+
+    def page_paths(self):
+        return page_paths(self.pages)
+
+    def _delay(self, path):
+        return self.latency + self.jitter * (zlib.crc32(path.encode()) % 1000) / 1000
+
+    def _links(self, section, n):
+        # Page n links to pages n*fanout+1 ... n*fanout+fanout (wrapping), like a tree
+        first = 0 if n is None else n * self.fanout + 1
+        return [f"/{section}/{(first + k) % self.per_section}" for k in range(self.fanout)]
+
+    def _is_js(self, path):
+        return zlib.crc32(path.encode()) % 1000 < self.js_fraction * 1000
+
+    def _page(self, section, n):
+        path = f"/{section}" + ("" if n is None else f"/{n}")
+        name = f"{section.title()} {'home' if n is None else f'lesson {n}'}"
+        headings = [(1, "_1lrvdlvj", name)] + [(2, "_14hvi6g8", f"{name} unit {u}") for u in range(3)]
+        links = self._links(section, n)
+        filler = []
+        size = 0
+        while size < self.page_bytes:
+            paragraph = f'<p class="_1b0fr5sp">Practice {len(filler)} skills in {name}. ' + "Lorem ipsum dolor sit amet. " * 20 + "</p>"
+            filler.append(paragraph)
+            size += len(paragraph)
+        if self._is_js(path):
+            body = ('<div id="app"></div><script>setTimeout(function () {'
+                    'var app = document.getElementById("app");'
+                    f'var headings = {[[level, cls, text] for level, cls, text in headings]};'
+                    f'var links = {links};'
+                    'headings.forEach(function (h) { var e = document.createElement("h" + h[0]);'
+                    ' e.className = h[1]; e.textContent = h[2]; app.appendChild(e); });'
+                    'links.forEach(function (href) { var a = document.createElement("a");'
+                    ' a.href = href; a.textContent = href; app.appendChild(a); });'
+                    '}, 50);</script>')
+        else:
+            body = ("".join(f'<h{level} class="{cls}">{text}</h{level}>' for level, cls, text in headings)
+                    + "".join(f'<div class="_1yok8f4"><span class="_1f0fvyce">{href}</span>'
+                              f'<a class="_dwmetq" href="{href}">Start</a></div>' for href in links))
+        return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+                f"<title>{name} | Mock Academy</title></head>"
+                f"<body><main>{body}{''.join(filler)}</main></body></html>").encode("utf-8")
+
+    def _sitemap(self, index):
+        if index is None:
+            ext = ".xml.gz" if self.gzip_sitemaps else ".xml"
+            entries = "".join(f"<sitemap><loc>{self.base_url}/sitemaps/{i}{ext}</loc></sitemap>"
+                              for i in range(self.sitemap_children))
+            return ('<?xml version="1.0" encoding="UTF-8"?>'
+                    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                    f"{entries}</sitemapindex>").encode("utf-8")
+        paths = self.page_paths()
+        entries = "".join(
+            f"<url><loc>{self.base_url}{paths[(index * self.urls_per_sitemap + j) % len(paths)]}</loc>"
+            f"<lastmod>{LASTMOD}</lastmod></url>"
+            for j in range(self.urls_per_sitemap))
+        xml = ('<?xml version="1.0" encoding="UTF-8"?>'
+               '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+               f"{entries}</urlset>").encode("utf-8")
+        return gzip.compress(xml, 6) if self.gzip_sitemaps else xml
+
+    def route(self, path):
+        """(kind, content type, body) for a path, or None for a 404"""
+        path = path.split("?", 1)[0]
+        parts = path.strip("/").split("/")
+        if path == "/robots.txt":
+            return "other", "text/plain", f"User-agent: *\nAllow: /\nSitemap: {self.base_url}/sitemap.xml\n".encode()
+        if path == "/":
+            links = "".join(f'<a href="/{section}">{section}</a>' for section in SECTIONS)
+            return "pages", "text/html; charset=utf-8", (
+                f"<html><head><title>Mock Academy</title></head><body><h1>Mock Academy</h1>{links}</body></html>").encode()
+        if path == "/sitemap.xml":
+            return "sitemaps", "application/xml", self._sitemap(None)
+        if parts[0] == "sitemaps" and len(parts) == 2:
+            index = parts[1].split(".", 1)[0]
+            if index.isdigit() and int(index) < self.sitemap_children:
+                content_type = "application/gzip" if self.gzip_sitemaps else "application/xml"
+                return "sitemaps", content_type, self._sitemap(int(index))
+        if parts[0] in SECTIONS:
+            if len(parts) == 1:
+                return "pages", "text/html; charset=utf-8", self._page(parts[0], None)
+            if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < self.per_section:
+                return "pages", "text/html; charset=utf-8", self._page(parts[0], int(parts[1]))
+        return None
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, as a real server would
+
+            def do_GET(self):
+                time.sleep(site._delay(self.path))
+                routed = site.route(self.path)
+                if routed is None:
+                    kind, content_type, body, status = "other", "text/plain", b"Not found", 404
+                else:
+                    (kind, content_type, body), status = routed, 200
+                with site._lock:
+                    site.counts[kind] += 1
+                    site.counts["bytes"] += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def add_site_arguments(parser):
+    """Command-line options shared by everything that starts a MockSite"""
+    parser.add_argument("--pages", type=int, default=400, help="pages on the site")
+    parser.add_argument("--fanout", type=int, default=8, help="links per page")
+    parser.add_argument("--sitemap-children", type=int, default=100,
+                        help="child sitemaps in the sitemap index (the real site has about 25000)")
+    parser.add_argument("--urls-per-sitemap", type=int, default=500, help="URLs in each child sitemap")
+    parser.add_argument("--plain-sitemaps", action="store_true", help="serve child sitemaps uncompressed")
+    parser.add_argument("--latency-ms", type=float, default=20, help="latency added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="extra latency, spread over paths")
+    parser.add_argument("--js-fraction", type=float, default=0.0,
+                        help="share of pages rendered by JavaScript (crawling them needs Chrome)")
+    parser.add_argument("--page-bytes", type=int, default=30000, help="approximate size of a page")
+
+
+def site_from_arguments(args, port=0):
+    return MockSite(pages=args.pages, fanout=args.fanout, sitemap_children=args.sitemap_children,
+                    urls_per_sitemap=args.urls_per_sitemap, gzip_sitemaps=not args.plain_sitemaps,
+                    latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, js_fraction=args.js_fraction,
+                    page_bytes=args.page_bytes, port=port)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--port", type=int, default=8800, help="port to listen on")
+    add_site_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    site = site_from_arguments(args, args.port)
+    print(f"Serving {site.pages} pages at {site.base_url} (Ctrl+C to stop)")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        site.stop()
@@ -0,0 +1,62 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+# Configuration
+CHECKPOINT_CONFIG = {
+    "path": "crawl_checkpoint.json",  # Where crawl state is saved
+    "interval": 30  # Seconds between two checkpoints
+}
+
+
+class CrawlCheckpoint:
+    """Durable crawl state, saved atomically every `interval` seconds.
+
+    `setup` holds what a run computed before crawling (robots rules,
+    sitemap analysis, sections) so a resumed run can skip it; `state` holds
+    the latest snapshot of the crawl itself (frontier, counters, politeness
+    timers, output offsets).
+    """
+
+    def __init__(self, path=None, interval=None, setup=None, state=None):
+        self.path = path or CHECKPOINT_CONFIG["path"]
+        self.interval = CHECKPOINT_CONFIG["interval"] if interval is None else interval
+        self.setup = setup or {}
+        self.state = state
+        self.saved = time.monotonic()
+
+    @classmethod
+    def load(cls, path=None, interval=None):
+        """The checkpoint left by an interrupted run, or None"""
+        path = path or CHECKPOINT_CONFIG["path"]
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(path, interval, data.get("setup"), data.get("state"))
+
+    def due(self):
+        return time.monotonic() - self.saved >= self.interval
+
+    def save(self, state=None):
+        """Write setup and `state` (or the last state) to disk atomically"""
+        if state is not None:
+            self.state = state
+        data = {
+            "saved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "setup": self.setup,
+            "state": self.state
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.saved = time.monotonic()
+
+    def clear(self):
+        """Remove the checkpoint once the crawl has finished"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,261 @@
+"""One entry point for the crawler's tools.
+
+    python cli.py robots [SEED ...] [--paths /math ...]
+    python cli.py sitemap [URL ...] [--expand] [--urls]
+    python cli.py crawl [--seeds URL ...] [--depth 2] [--resume] [--incremental] [--archive]
+    python cli.py extract [--seeds URL ...] [--sections /math ...] [--resume] [--archive]
+    python cli.py report [--dashboard]
+
+Every subcommand imports only the modules it uses, so robots and sitemap
+start without loading Selenium, aiohttp, numpy or the parsers.
+
+Options can also come from --config FILE (JSON, or TOML on Python 3.11+):
+top-level keys set the defaults of the flags of the same name, and a table
+named after a module updates that module's configuration dict, e.g.
+
+    seeds = ["https://www.khanacademy.org"]
+    depth = 1
+    [fetcher]
+    timeout = 10
+
+--set MODULE.KEY=VALUE does the same for single values (VALUE is JSON, or a
+plain string). Flags win over the config file.
+"""
+import argparse
+import json
+import os
+import sys
+from urllib.parse import urljoin
+
+# Configuration dict of every module that has one
+CONFIG_DICTS = {
+    "archive": "ARCHIVE_CONFIG",
+    "checkpoint": "CHECKPOINT_CONFIG",
+    "crawl_output": "OUTPUT_CONFIG",
+    "crawler": "CONFIG",
+    "dedup": "DEDUP_CONFIG",
+    "driver_pool": "POOL_CONFIG",
+    "fetcher": "FETCH_CONFIG",
+    "hybrid": "HYBRID_CONFIG",
+    "incremental": "INCREMENTAL_CONFIG",
+    "linkgraph": "LINKGRAPH_CONFIG",
+    "metrics": "METRICS_CONFIG",
+    "pipeline": "PIPELINE_CONFIG",
+    "readiness": "READY_CONFIG",
+    "robots": "ROBOTS_CONFIG",
+    "search_index": "INDEX_CONFIG",
+    "seenset": "SEEN_CONFIG",
+    "sitemap": "SITEMAP_CONFIG"
+}
+
+DEFAULT_SEEDS = ["https://www.khanacademy.org"]
+DEFAULT_PATHS = ["/math", "/science", "/computing", "/humanities"]  # As scrapper.TEST_PATHS
+RESULTS_PATH = "crawl_results.json"
+
+
+def load_config(path):
+    """Options and module overrides from a JSON or TOML file"""
+    if path.endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_setting(setting):
+    """("fetcher", "timeout", 10) from "fetcher.timeout=10" """
+    name, _, value = setting.partition("=")
+    module, _, key = name.partition(".")
+    if not key:
+        raise ValueError(f"expected MODULE.KEY=VALUE, got {setting!r}")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass  # A plain string
+    return module, key, value
+
+
+def apply_overrides(overrides):
+    """Update the configuration dicts of the modules the subcommand has loaded
+
+    Overrides for modules it never imported are skipped: they could not
+    affect the run, and importing them would cost startup time.
+    """
+    for module, settings in overrides.items():
+        if module not in sys.modules:
+            continue
+        config = getattr(sys.modules[module], CONFIG_DICTS[module])
+        unknown = set(settings) - set(config)
+        if unknown:
+            sys.exit(f"❌ Unknown {module} setting(s): {', '.join(sorted(unknown))}")
+        config.update(settings)
+
+
+def robots_command(args):
+    from robots import get_robots
+    apply_overrides(args.overrides)
+    robots = get_robots()
+    for seed in args.seeds:
+        policy = robots.policy(seed)
+        print(f"\n🤖 {policy.url} (status {policy.status})")
+        if policy.error is not None:
+            print(f"❌ {policy.error}")
+        print(f"Crawl delay: {robots.crawl_delay(seed)}")
+        print(f"Sitemaps: {', '.join(policy.sitemaps) or 'none'}")
+        for path in args.paths:
+            allowed = robots.can_fetch(urljoin(seed, path))
+            print(f"{'✅ Allowed' if allowed else '❌ Disallowed'}: {path}")
+
+
+def sitemap_command(args):
+    from robots import get_robots
+    from sitemap import analyze_sitemap, iter_sitemap_urls
+    apply_overrides(args.overrides)
+    sitemaps = args.urls
+    if not sitemaps:
+        sitemaps = [sitemap for seed in args.seeds for sitemap in get_robots().sitemaps(seed)]
+        if not sitemaps:
+            print("No sitemaps listed in robots.txt")
+    for sitemap in sitemaps:
+        if args.list_urls:
+            for entry in iter_sitemap_urls(sitemap, max_sitemaps=args.max_sitemaps):
+                print(entry["loc"])
+        else:
+            analysis = analyze_sitemap(sitemap, args.expand, args.max_sitemaps)
+            print(json.dumps({sitemap: analysis}, indent=2))
+
+
+def crawl_command(args):
+    import scrapper
+    scrapper.SEED_URLS = args.seeds
+    scrapper.TEST_PATHS = args.paths
+    scrapper.MAX_DEPTH = args.depth
+    scrapper.MAX_PAGES_PER_SECTION = args.max_pages
+    scrapper.CRAWL_DELAY = args.delay
+    scrapper.EXPAND_SITEMAPS = args.expand_sitemaps
+    scrapper.SITEMAP_SEED_LIMIT = args.sitemap_seeds
+    scrapper.COMPACT_TO_PARQUET = args.parquet
+    if args.archive:
+        args.overrides.setdefault("archive", {})["enabled"] = True
+    apply_overrides(args.overrides)
+    # Unset, it keeps scrapper.INCREMENTAL
+    scrapper.main(args.resume, scrapper.INCREMENTAL if args.incremental is None else args.incremental)
+
+
+def extract_command(args):
+    import crawler
+    crawler.CONFIG.update(seeds=args.seeds, sections=args.paths, delay=args.delay)
+    if args.archive:
+        args.overrides.setdefault("archive", {})["enabled"] = True
+    apply_overrides(args.overrides)
+    # Unset, crawler.main falls back to CONFIG["incremental"] (--config or --set crawler.incremental=true)
+    crawler.main(args.resume, args.incremental)
+
+
+def report_command(args):
+    if not os.path.exists(args.results):
+        print(f"❌ {args.results} not found. Please run the crawler first.")
+        return 1
+    with open(args.results, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    print(f"\n📊 {args.results}")
+    for key, value in {**results.get("crawl_config", {}), **results.get("crawl_stats", {})}.items():
+        if not isinstance(value, (dict, list)):
+            print(f"{key}: {value}")
+    for path, status in results.get("tested_paths", {}).items():
+        print(f"{'✅' if status == 'Allowed' else '❌'} {status}: {path}")
+    for sitemap, analysis in results.get("sitemaps", {}).get("analysis", {}).items():
+        print(f"📋 {sitemap}: {analysis.get('type')}, {analysis.get('count', 0)} entries")
+    if args.dashboard:
+        import subprocess
+        dashboard = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+        return subprocess.call([sys.executable, "-m", "streamlit", "run", dashboard])
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", help="JSON or TOML file with options and module settings")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="MODULE.KEY=VALUE",
+                        help="override one module setting, e.g. fetcher.timeout=10 (repeatable)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    robots = commands.add_parser("robots", help="robots.txt rules, crawl delay and sitemaps of each seed")
+    robots.add_argument("seeds", nargs="*", default=DEFAULT_SEEDS)
+    robots.add_argument("--paths", dest="paths", nargs="+", metavar="PATH", help="paths to check")
+    robots.set_defaults(run=robots_command, paths=DEFAULT_PATHS)
+
+    sitemap = commands.add_parser("sitemap", help="analyze sitemaps (those in robots.txt by default)")
+    sitemap.add_argument("urls", nargs="*")
+    sitemap.add_argument("--seeds", dest="seeds", nargs="+", metavar="URL",
+                         help="sites whose robots.txt lists the sitemaps")
+    sitemap.add_argument("--expand", action="store_true", help="also fetch the child sitemaps of an index")
+    sitemap.add_argument("--max-sitemaps", type=int, help="child sitemaps to expand per index")
+    sitemap.add_argument("--urls", dest="list_urls", action="store_true", help="print every URL entry instead")
+    sitemap.set_defaults(run=sitemap_command, seeds=DEFAULT_SEEDS)
+
+    crawl = commands.add_parser("crawl", help="render and crawl sections with browsers (scrapper.py)")
+    crawl.add_argument("--seeds", dest="seeds", nargs="+", metavar="URL", help="sites to crawl")
+    crawl.add_argument("--paths", dest="paths", nargs="+", metavar="PATH", help="sections to crawl")
+    crawl.add_argument("--depth", type=int, default=2, help="link depth from each section page")
+    crawl.add_argument("--max-pages", type=int, default=1, help="pages per section")
+    crawl.add_argument("--delay", type=float, default=2, help="starting delay between requests to a host")
+    crawl.add_argument("--expand-sitemaps", action="store_true", help="expand the children of sitemap indexes")
+    crawl.add_argument("--sitemap-seeds", type=int, default=0, help="sitemap URLs added to the frontier")
+    crawl.add_argument("--parquet", action="store_true", help="also write Parquet copies of the streams")
+    crawl.add_argument("--resume", action="store_true", help="continue an interrupted crawl")
+    crawl.add_argument("--incremental", action="store_true", default=None,
+                       help="only fetch new or changed pages")
+    crawl.add_argument("--archive", action="store_true", help="archive raw pages for reextract.py")
+    crawl.set_defaults(run=crawl_command, seeds=DEFAULT_SEEDS, paths=DEFAULT_PATHS)
+
+    extract = commands.add_parser("extract", help="fetch section pages and extract titles (crawler.py)")
+    extract.add_argument("--seeds", dest="seeds", nargs="+", metavar="URL", help="sites to check")
+    extract.add_argument("--sections", dest="paths", nargs="+", metavar="PATH", help="section pages")
+    extract.add_argument("--delay", type=float, default=1, help="delay between requests in seconds")
+    extract.add_argument("--resume", action="store_true", help="skip pages finished by an interrupted run")
+    extract.add_argument("--incremental", action="store_true", default=None,
+                         help="reuse titles of unchanged pages (default: crawler.incremental)")
+    extract.add_argument("--archive", action="store_true", help="archive raw pages for reextract.py")
+    extract.set_defaults(run=extract_command, seeds=DEFAULT_SEEDS, paths=DEFAULT_PATHS)
+
+    report = commands.add_parser("report", help="summarise the last crawl's results")
+    report.add_argument("--results", default=RESULTS_PATH)
+    report.add_argument("--dashboard", action="store_true", help="then open the Streamlit dashboard")
+    report.set_defaults(run=report_command)
+    return parser, commands.choices
+
+
+def main(argv=None):
+    parser, commands = build_parser()
+    pre_args, _ = parser.parse_known_args(argv)
+    overrides = {}
+    if pre_args.config:
+        try:
+            config = load_config(pre_args.config)
+        except Exception as e:
+            parser.error(f"cannot read {pre_args.config}: {e}")
+        options = {key: value for key, value in config.items() if not isinstance(value, dict)}
+        overrides = {key: value for key, value in config.items() if isinstance(value, dict)}
+        # Options only become defaults of the subcommands that have them
+        for command in commands.values():
+            known = {action.dest for action in command._actions}
+            command.set_defaults(**{key: value for key, value in options.items() if key in known})
+    args = parser.parse_args(argv)
+    try:
+        for setting in args.settings:
+            module, key, value = parse_setting(setting)
+            overrides.setdefault(module, {})[key] = value
+        unknown = set(overrides) - set(CONFIG_DICTS)
+        if unknown:
+            raise ValueError(f"unknown module(s): {', '.join(sorted(unknown))} "
+                             f"(one of: {', '.join(CONFIG_DICTS)})")
+    except ValueError as e:
+        parser.error(str(e))
+    args.overrides = overrides
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
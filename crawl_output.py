@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+# Configuration
+OUTPUT_CONFIG = {
+    "output_dir": ".",  # Where the NDJSON streams and Parquet files are written
+    "pages_file": "crawl_pages.ndjson",  # One record per crawled page
+    "sitemap_file": "sitemap_entries.ndjson",  # One record per sitemap entry
+    "parquet_batch": 10000  # Rows per Parquet row group during compaction
+}
+
+
+class NdjsonWriter:
+    """Append-only newline-delimited JSON stream, flushed after every record
+
+    When appending, `offset` first truncates the file back to a known
+    position (e.g. the one recorded in a checkpoint).
+    """
+
+    def __init__(self, path, append=False, offset=None):
+        self.path = path
+        self.count = 0
+        if append and offset is not None and os.path.exists(path):
+            os.truncate(path, offset)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+
+    def tell(self):
+        """Byte offset just past the last complete record"""
+        with self._lock:
+            return self._file.tell()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_ndjson(path):
+    """Yield the records of an NDJSON file, skipping a torn last line"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class CrawlWriter:
+    """Streams crawl results to disk as they arrive.
+
+    Pages and sitemap entries go to separate NDJSON files; `write_manifest`
+    writes the small JSON summary that points at them.
+    """
+
+    def __init__(self, output_dir=None, append=False, offsets=None):
+        self.output_dir = output_dir or OUTPUT_CONFIG["output_dir"]
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.files = {
+            "pages": OUTPUT_CONFIG["pages_file"],
+            "sitemap_entries": OUTPUT_CONFIG["sitemap_file"]
+        }
+        offsets = offsets or {}
+        self.pages = NdjsonWriter(self.path("pages"), append, offsets.get("pages"))
+        self.sitemap_entries = NdjsonWriter(self.path("sitemap_entries"), append,
+                                            offsets.get("sitemap_entries"))
+
+    def path(self, name):
+        return os.path.join(self.output_dir, self.files[name])
+
+    def offsets(self):
+        """Current end of each stream, to be stored in a checkpoint"""
+        return {"pages": self.pages.tell(), "sitemap_entries": self.sitemap_entries.tell()}
+
+    def write_page(self, section, url, headings, **fields):
+        self.pages.write({
+            "type": "page",
+            "section": section,
+            "url": url,
+            "crawled_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **fields,
+            "headings": headings
+        })
+
+    def write_sitemap_entry(self, sitemap_url, entry):
+        self.sitemap_entries.write({"sitemap": sitemap_url, **entry})
+
+    def write_manifest(self, path, summary):
+        """Write `summary` plus the output file paths as the crawl manifest
+
+        File paths are stored relative to the manifest's directory.
+        """
+        manifest_dir = os.path.dirname(os.path.abspath(path))
+        files = {name: os.path.relpath(os.path.join(self.output_dir, file_name), manifest_dir)
+                 for name, file_name in self.files.items()}
+        manifest = dict(summary, files=files)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    def compact(self):
+        """Add Parquet copies of both streams for analytics (needs pyarrow)"""
+        for name, to_rows, columns in (("pages", page_rows, PAGE_COLUMNS),
+                                       ("sitemap_entries", sitemap_rows, SITEMAP_COLUMNS)):
+            parquet_name = os.path.splitext(self.files[name])[0] + ".parquet"
+            compact(self.path(name), os.path.join(self.output_dir, parquet_name), to_rows, columns)
+            self.files[name + "_parquet"] = parquet_name
+
+    def close(self):
+        self.pages.close()
+        self.sitemap_entries.close()
+
+
+PAGE_COLUMNS = ("section", "url", "level", "text")
+SITEMAP_COLUMNS = ("sitemap", "type", "loc", "lastmod", "priority")
+
+
+def page_rows(record):
+    """Flatten a page record into one row per heading"""
+    for level, headings in record["headings"].items():
+        for heading in headings:
+            yield {"section": record["section"], "url": record["url"],
+                   "level": level, "text": heading["text"]}
+
+
+def sitemap_rows(record):
+    yield {key: record.get(key) for key in SITEMAP_COLUMNS}
+
+
+def compact(ndjson_path, parquet_path, to_rows, columns):
+    """Rewrite an NDJSON stream as a Parquet table of string `columns`
+
+    `to_rows(record)` yields the rows of one record. Needs pyarrow. Rows are
+    written in row groups of parquet_batch so the stream is never loaded
+    whole.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    batch = []
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        for record in read_ndjson(ndjson_path):
+            batch.extend(to_rows(record))
+            if len(batch) >= OUTPUT_CONFIG["parquet_batch"]:
+                writer.write_table(pa.Table.from_pylist(batch, schema))
+                batch.clear()
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema))
+    return parquet_path
+
+
+def load_results(path):
+    """Load crawl_results.json, rebuilding extracted_headings from the page stream
+
+    Older result files that embed extracted_headings are returned as-is.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "files" in data:
+        pages_path = os.path.join(os.path.dirname(path) or ".", data["files"]["pages"])
+        extracted_headings = {section: {} for section in data.get("tested_paths", {})
+                              if data["tested_paths"][section] == "Allowed"}
+        if os.path.exists(pages_path):
+            for record in read_ndjson(pages_path):
+                extracted_headings.setdefault(record["section"], {})[record["url"]] = record["headings"]
+        data["extracted_headings"] = extracted_headings
+    return data
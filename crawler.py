@@ -1,25 +1,39 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
-from urllib.parse import urljoin
-import time
+from urllib.parse import urljoin, urlparse
+from archive import ARCHIVE_CONFIG, get_archive
+from checkpoint import CrawlCheckpoint
+from incremental import PageState
+from robots import ROBOTS_CONFIG, get_robots
+from search_index import get_index
+from fetcher import fetch_many, fetch_url
+from metrics import get_metrics
+from pipeline import PIPELINE_CONFIG, ExtractionPipeline
+from title_parser import parse_titles
 
 # Configuration
 CONFIG = {
-    "base_url": "https://www.khanacademy.org",  # Change this to crawl a different site
+    "seeds": ["https://www.khanacademy.org"],  # Sites to crawl; add more to check several in one run
+    "sections": ["/math", "/science", "/computing", "/humanities"],  # Pages crawled on every site
     "max_pages": 1,  # Maximum number of pages to crawl
     "delay": 1,  # Delay between requests in seconds
-    "output_dir": "."  # Directory to save output files
+    "parser": "auto",  # HTML parser backend: "selectolax", "lxml", "html.parser" or "auto" (fastest installed)
+    "output_dir": ".",  # Directory to save output files
+    "checkpoint": "crawler_checkpoint.json",  # Finished pages, kept until the run completes
+    "incremental": False,  # Reuse titles of pages the server reports unchanged (HTTP 304)
+    "state_path": "title_state.sqlite",  # Titles and content hashes of the last incremental run
+    "diff_path": "title_diff.json"  # Pages whose titles changed since the last incremental run
 }
 
-def get_robots_txt():
-    """Fetch and analyze robots.txt"""
-    robots_url = urljoin(CONFIG["base_url"], "/robots.txt")
+def get_robots_txt(base_url):
+    """Fetch and analyze robots.txt (cached and compiled by the robots module)"""
     try:
-        response = requests.get(robots_url)
+        policy = get_robots().policy(base_url)
+        if policy.error is not None:
+            raise policy.error
         return {
             "status": "success",
-            "content": response.text
+            "content": policy.text
         }
     except Exception as e:
         return {
@@ -27,42 +41,19 @@ def get_robots_txt():
             "error": str(e)
         }
 
-def extract_titles(url):
-    """Extract titles from a page"""
+def extract_titles(url, response=None):
+    """Extract titles from a page, fetching it unless a response is passed in"""
     try:
-        print(f"Fetching content from {url}")
-        response = requests.get(url)
+        if response is None:
+            print(f"Fetching content from {url}")
+            response = fetch_url(url, delay=CONFIG["delay"])
         response.raise_for_status()  # Raise an exception for bad status codes
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Try multiple approaches to find titles
-        titles = []
-        
-        # Look for main navigation items
-        nav_items = soup.select('a[data-test-id="nav-item"]')
-        if nav_items:
-            titles.extend([item.text.strip() for item in nav_items if item.text.strip()])
-        
-        # Look for subject titles
-        subject_titles = soup.select('.subject-title, .domain-title')
-        if subject_titles:
-            titles.extend([title.text.strip() for title in subject_titles if title.text.strip()])
-        
-        # Look for course titles
-        course_titles = soup.select('.course-title')
-        if course_titles:
-            titles.extend([title.text.strip() for title in course_titles if title.text.strip()])
-        
-        # If still no titles found, try generic heading tags with specific classes
-        if not titles:
-            headings = soup.select('h1._1lrvdlvj, h2._14hvi6g8, h3.title')
-            titles.extend([h.text.strip() for h in headings if h.text.strip()])
-        
-        # If still nothing, try all headings
-        if not titles:
-            headings = soup.find_all(['h1', 'h2', 'h3'])
-            titles.extend([h.text.strip() for h in headings if h.text.strip()])
+        # Match all title rules in one pass over the page
+        metrics = get_metrics()
+        with metrics.timer("parse_seconds", extractor="extract_titles"):
+            titles = parse_titles(response.text, CONFIG["parser"])
+        metrics.inc("titles_found_total", len(titles))
         
         print(f"Found {len(titles)} titles")
         if not titles:
@@ -78,56 +69,126 @@ def extract_titles(url):
     except Exception as e:
         print(f"Error extracting titles from {url}: {e}")
         print("Response status code:", getattr(response, 'status_code', 'N/A'))
+        get_metrics().inc("extract_errors_total", extractor="extract_titles")
         return []
 
-def test_api():
+def test_api(base_url):
     """Test API accessibility"""
-    api_url = urljoin(CONFIG["base_url"], "/api/internal/_bb")
+    api_url = urljoin(base_url, "/api/internal/_bb")
     try:
-        response = requests.get(api_url)
+        response = fetch_url(api_url)
+        if response.error is not None:
+            raise response.error
         return f"[OK] Attempted API Access to: {api_url}\nStatus Code: {response.status_code}\n"
     except Exception as e:
         return f"[ERROR] API Test Failed: {e}"
 
-def main():
-    # Create crawlability summary
-    robots_info = get_robots_txt()
-    crawl_summary = {
-        "Base URL": CONFIG["base_url"],
-        "Robots.txt Status": robots_info["status"],
-        "Crawl Delay": "Not specified",  # You can parse this from robots.txt if needed
-        "Sitemaps": ["https://www.khanacademy.org/sitemap.xml"],  # Add sitemap parsing if needed
-        "Rules": {
-            "*": {
-                "/": "Allowed",
-                "/api/internal/_bb/": "Disallowed",
-                "/math/algebra": "Allowed"
+def pages_to_crawl():
+    """Every site's home page followed by its sections"""
+    pages = []
+    for base_url in CONFIG["seeds"]:
+        pages.append(base_url)
+        pages.extend(urljoin(base_url, section) for section in CONFIG["sections"])
+    return pages
+
+def main(resume=False, incremental=None):
+    # With --resume, reuse robots.txt and the titles of pages finished by an interrupted run
+    checkpoint = CrawlCheckpoint.load(CONFIG["checkpoint"], interval=0) if resume else None
+    if checkpoint:
+        robots_info = checkpoint.setup["robots_info"]
+        print(f"Resuming: {len(checkpoint.state['titles'])} pages already done")
+    else:
+        robots_info = {base_url: get_robots_txt(base_url) for base_url in CONFIG["seeds"]}
+        checkpoint = CrawlCheckpoint(CONFIG["checkpoint"], 0, {"robots_info": robots_info}, {"titles": {}})
+        checkpoint.save()
+    page_titles = checkpoint.state["titles"]
+    incremental = CONFIG["incremental"] if incremental is None else incremental
+    page_state = PageState(CONFIG["state_path"]) if incremental else None
+
+    # Create one crawlability summary per site from its robots.txt policy
+    robots = get_robots()
+    rule_paths = ["/", "/api/internal/_bb/", "/math/algebra"]
+    crawl_summary = []
+    host_delays = {}
+    for base_url in CONFIG["seeds"]:
+        crawl_delay = robots.crawl_delay(base_url)
+        if crawl_delay is not None:
+            host_delays[urlparse(base_url).netloc] = crawl_delay
+        crawl_summary.append({
+            "Base URL": base_url,
+            "Robots.txt Status": robots_info[base_url]["status"],
+            "Crawl Delay": crawl_delay or "Not specified",
+            "Sitemaps": robots.sitemaps(base_url),
+            "Rules": {
+                ROBOTS_CONFIG["user_agent"]: {
+                    path: "Allowed" if robots.can_fetch(urljoin(base_url, path)) else "Disallowed"
+                    for path in rule_paths
+                }
             }
-        }
-    }
-
-    # Extract titles from multiple important pages
-    all_titles = []
-    pages_to_crawl = [
-        CONFIG["base_url"],
-        urljoin(CONFIG["base_url"], "/math"),
-        urljoin(CONFIG["base_url"], "/science"),
-        urljoin(CONFIG["base_url"], "/computing"),
-        urljoin(CONFIG["base_url"], "/humanities")
-    ]
+        })
 
-    print("\nStarting title extraction...")
-    for page in pages_to_crawl:
+    # Extract titles from multiple important pages of every site
+    pages = pages_to_crawl()
+    archive = get_archive()
+    metrics = get_metrics()
+    index = get_index()
+    if index:
+        # Pages finished by an interrupted run may not have reached the index yet
+        for page, titles in page_titles.items():
+            index.add_page(page, urlparse(page).path, titles=titles, source="titles")
+
+    def store_titles(page, titles):
+        # Writer stage of the pipeline; titles is None if the page could not be parsed
         print(f"\nProcessing page: {page}")
-        page_titles = extract_titles(page)
-        all_titles.extend(page_titles)
-        time.sleep(CONFIG["delay"])  # Respect the delay between requests
+        if titles is None:
+            return  # Not checkpointed, so --resume fetches it again
+        print(f"Found {len(titles)} titles")
+        metrics.inc("titles_found_total", len(titles))
+        if page_state:
+            page_state.update(page, {"titles": titles})
+        seen = set()
+        page_titles[page] = [x for x in titles if not (x in seen or seen.add(x))]
+        if index:
+            index.add_page(page, urlparse(page).path, titles=page_titles[page], source="titles")
+        checkpoint.save()
+
+    def parse_response(response):
+        # Fetch stage: hand the raw page to the extractor processes
+        page = response.url
+        if archive and not response.from_cache:
+            archive.write_response(response)
+        previous = page_state.previous(page) if page_state else None
+        if previous and response.from_cache:
+            # Not modified since the last run: keep the titles extracted then
+            pipeline.skip(page, previous[0]["titles"])
+        elif response.ok:
+            pipeline.submit(page, response.content, response.encoding, (CONFIG["parser"],))
+        else:
+            print(f"Error extracting titles from {page}: {response.error or response.status_code}")
+            metrics.inc("extract_errors_total", extractor="parse_titles")
+            pipeline.skip(page, None)
+
+    print("\nStarting title extraction...")
+    # Fetch all pages concurrently (each host has its own delay, adapted to how it
+    # responds) while worker processes parse the pages that have arrived
+    remaining = [page for page in pages if page not in page_titles]
+    workers = min(PIPELINE_CONFIG["extract_workers"], len(remaining))
+    with ExtractionPipeline(parse_titles, store_titles, workers) as pipeline:
+        fetch_many(remaining, on_result=parse_response, delay=CONFIG["delay"], host_delays=host_delays)
+    print(f"\n📈 {pipeline.report()}")
+    all_titles = [title for page in pages for title in page_titles.get(page, [])]
 
     # Remove duplicates while preserving order
     seen = set()
     unique_titles = [x for x in all_titles if not (x in seen or seen.add(x))]
 
     print(f"\nTotal unique titles found: {len(unique_titles)}")
+    if page_state:
+        changes = page_state.counts()
+        page_state.write_diff(CONFIG["diff_path"])
+        page_state.close()
+        print(f"{changes['new']} new, {changes['changed']} changed and "
+              f"{changes['unchanged']} unchanged pages (see {CONFIG['diff_path']})")
 
     # Save results
     with open("crawlability_summary.json", "w", encoding="utf-8") as f:
@@ -137,7 +198,22 @@ def main():
         json.dump(unique_titles, f, indent=2)
 
     with open("api_test_output.txt", "w", encoding="utf-8") as f:
-        f.write(test_api())
+        f.write("".join(test_api(base_url) for base_url in CONFIG["seeds"]))
+
+    if index:
+        index.close()
+    checkpoint.clear()
+    metrics.close()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Check crawlability and extract titles")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip pages finished by an interrupted run")
+    parser.add_argument("--incremental", action="store_true", default=None,
+                        help="reuse titles of unchanged pages and write a diff of changed ones")
+    parser.add_argument("--archive", action="store_true",
+                        help="archive fetched pages for reextract.py")
+    args = parser.parse_args()
+    if args.archive:
+        ARCHIVE_CONFIG["enabled"] = True
+    main(args.resume, args.incremental) 
\ No newline at end of file
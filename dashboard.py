@@ -1,10 +1,12 @@
 import streamlit as st
-import json
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import networkx as nx
-from urllib.parse import urlparse
+import numpy as np
+import os
+import time
+from dashboard_data import LEVELS, CrawlData, results_version
+from search_index import INDEX_CONFIG, HeadingIndex
 
 # Page config
 st.set_page_config(
@@ -27,10 +29,21 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-def load_data():
+PAGES_PER_VIEW = 25  # Page expanders shown at once in a section tab
+SITEMAP_LOD_PAGES = 2000  # Past this many pages the sitemap opens as one cluster per section
+SITEMAP_LABEL_NODES = 200  # Node labels are drawn only when at most this many nodes are shown
+RESULTS_PATH = 'crawl_results.json'
+SEARCH_RESULTS = 50  # Matches listed for a search
+TOP_RANKED_PAGES = 25  # Pages listed by PageRank
+
+# Results stay in memory between reruns until the crawl files change
+@st.cache_resource(max_entries=2, show_spinner="Loading crawl results...")
+def load_crawl_data(path, version):
+    return CrawlData.load(path)
+
+def load_data(path=RESULTS_PATH):
     try:
-        with open('crawl_results.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_crawl_data(path, results_version(path))
     except FileNotFoundError:
         st.error("❌ crawl_results.json not found. Please run the crawler first.")
         return None
@@ -54,79 +67,135 @@ def calculate_crawlability_score(data):
     
     return min(100, max(0, score))
 
-def create_sitemap_visualization(data):
-    G = nx.Graph()
-    
-    # Create nodes and edges from the extracted headings
-    for section, pages in data['extracted_headings'].items():
-        section_name = section.split('/')[-1].upper()
-        G.add_node(section_name, size=20, color='#1f77b4')
-        
-        for page_url in pages.keys():
-            page_name = urlparse(page_url).path.split('/')[-1]
-            if page_name:
-                G.add_node(page_name, size=15, color='#2ca02c')
-                G.add_edge(section_name, page_name)
-    
-    # Get node positions using spring layout
-    pos = nx.spring_layout(G)
-    
-    # Create edges trace
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
-    
-    edges_trace = go.Scatter(
-        x=edge_x, y=edge_y,
-        line=dict(width=0.5, color='#888'),
-        hoverinfo='none',
-        mode='lines')
-    
-    # Create nodes trace
-    node_x = []
-    node_y = []
-    node_text = []
-    node_size = []
-    node_color = []
-    
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        node_text.append(node)
-        node_size.append(G.nodes[node]['size'])
-        node_color.append(G.nodes[node]['color'])
-    
-    nodes_trace = go.Scatter(
-        x=node_x, y=node_y,
-        mode='markers+text',
-        hoverinfo='text',
-        text=node_text,
-        textposition="bottom center",
-        marker=dict(
-            size=node_size,
-            color=node_color,
-            line_width=2))
-    
-    fig = go.Figure(data=[edges_trace, nodes_trace],
+def edge_coordinates(nodes, edges):
+    """x and y of every edge as line segments separated by NaN gaps"""
+    x = np.full(len(edges) * 3, np.nan)
+    y = np.full(len(edges) * 3, np.nan)
+    for i in (0, 1):
+        x[i::3] = nodes['x'].values[edges[:, i]]
+        y[i::3] = nodes['y'].values[edges[:, i]]
+    return x, y
+
+def create_sitemap_visualization(data, detail=None):
+    """WebGL map of the crawl from its cached layout
+
+    Large crawls start as one cluster per section over plain page dots;
+    with `detail` set to a section, that section's pages and links are
+    drawn in full. With a link graph, edges are the links found between
+    pages and pages are sized and coloured by PageRank; otherwise edges
+    join each page to its parent path.
+    """
+    nodes, edges = data.sitemap_layout()
+    links = data.link_analysis()
+    if links is not None:
+        scores, edges = links
+        page_color = np.log10(scores['rank'].clip(lower=0.01))
+    hubs = nodes[nodes['hub']]
+    pages = nodes[~nodes['hub']]
+    
+    if detail is None and len(pages) > SITEMAP_LOD_PAGES:
+        # Level of detail: no edges or per-page hover text, one marker per section
+        counts = pages.groupby('section').size()
+        largest = max(counts.max(), 1)
+        hub_counts = [int(counts.get(section, 0)) for section in hubs['section']]
+        traces = [
+            go.Scattergl(
+                x=pages['x'], y=pages['y'],
+                mode='markers',
+                hoverinfo='skip',
+                marker=dict(size=2, opacity=0.4,
+                            color='#2ca02c' if links is None else page_color[~nodes['hub']],
+                            colorscale='Viridis')),
+            go.Scattergl(
+                x=hubs['x'], y=hubs['y'],
+                mode='markers+text',
+                text=hubs['label'],
+                hovertext=[f"{section}: {count} pages" for section, count in zip(hubs['section'], hub_counts)],
+                hoverinfo='text',
+                textposition="bottom center",
+                marker=dict(
+                    size=[20 + 40 * (count / largest) ** 0.5 for count in hub_counts],
+                    color='#1f77b4',
+                    line_width=2))
+        ]
+    else:
+        if detail is not None:
+            shown = (nodes['section'] == detail).values
+            edges = edges[shown[edges[:, 0]] & shown[edges[:, 1]]]
+        else:
+            shown = np.ones(len(nodes), dtype=bool)
+        edge_x, edge_y = edge_coordinates(nodes, edges)
+        few = shown.sum() <= SITEMAP_LABEL_NODES
+        # With a link graph, pages get their own trace below, coloured by PageRank
+        visible = nodes[shown if links is None else shown & nodes['hub'].values]
+        traces = [
+            go.Scattergl(
+                x=edge_x, y=edge_y,
+                line=dict(width=0.5, color='#888'),
+                hoverinfo='none',
+                mode='lines'),
+            go.Scattergl(
+                x=visible['x'], y=visible['y'],
+                mode='markers+text' if few else 'markers',
+                hoverinfo='text',
+                text=visible['label'] if few else None,
+                hovertext=visible['url'],
+                textposition="bottom center",
+                marker=dict(
+                    size=np.where(visible['hub'], 20, 15 if few else 5),
+                    color=np.where(visible['hub'], '#1f77b4', '#2ca02c'),
+                    line_width=2 if few else 0))
+        ]
+        if links is not None:
+            # Page area grows with PageRank
+            ranked = shown & ~nodes['hub'].values
+            page_scores = scores[ranked]
+            traces.append(go.Scattergl(
+                x=nodes['x'][ranked], y=nodes['y'][ranked],
+                mode='markers+text' if few else 'markers',
+                text=nodes['label'][ranked] if few else None,
+                textposition="bottom center",
+                hoverinfo='text',
+                hovertext=[f"{url}<br>PageRank {rank:.2f}× average, {in_links} in-links" for url, rank, in_links
+                           in zip(nodes['url'][ranked], page_scores['rank'], page_scores['in_links'])],
+                marker=dict(
+                    size=(8 if few else 4) * np.sqrt(page_scores['rank'].clip(0.25, 16)),
+                    color=page_color[ranked],
+                    colorscale='Viridis',
+                    colorbar=dict(title='log₁₀ PageRank', thickness=12),
+                    line_width=0)))
+    
+    fig = go.Figure(data=traces,
                    layout=go.Layout(
                        showlegend=False,
                        hovermode='closest',
                        margin=dict(b=20,l=5,r=5,t=40),
                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                       yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
+                       yaxis=dict(showgrid=False, zeroline=False, showticklabels=False,
+                                  scaleanchor='x'))
                    )
     
     return fig
 
+# The index connection is reopened only when the index files change
+@st.cache_resource(max_entries=1)
+def load_search_index(path, version):
+    return HeadingIndex(path)
+
+def index_version(path):
+    return tuple(os.stat(path + suffix).st_mtime_ns for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+# Figures are rebuilt only for a new crawl or another level of detail
+@st.cache_resource(max_entries=8, show_spinner="Drawing sitemap...")
+def sitemap_figure(path, version, detail):
+    return create_sitemap_visualization(load_crawl_data(path, version), detail)
+
 # Load data
 data = load_data()
 
 if data:
+    summary = data.summary
+    
     # Title
     st.title("🕷️ Khan Academy Crawler Dashboard")
     st.markdown("---")
@@ -135,14 +204,14 @@ if data:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        crawlability_score = calculate_crawlability_score(data)
+        crawlability_score = calculate_crawlability_score(summary)
         st.metric("Crawlability Score", f"{crawlability_score}/100")
     
     with col2:
-        st.metric("Pages Crawled", data['crawl_stats']['total_pages'])
+        st.metric("Pages Crawled", summary['crawl_stats']['total_pages'])
     
     with col3:
-        st.metric("Sections Analyzed", data['crawl_stats']['sections_crawled'])
+        st.metric("Sections Analyzed", summary['crawl_stats']['sections_crawled'])
     
     # Configuration and Stats
     st.markdown("### 📊 Crawl Configuration")
@@ -150,39 +219,60 @@ if data:
     
     with config_col1:
         st.info(f"""
-        - Max Depth: {data['crawl_config']['max_depth']}
-        - Max Pages per Section: {data['crawl_config']['max_pages_per_section']}
-        - Crawl Delay: {data['crawl_config']['crawl_delay']} seconds
+        - Max Depth: {summary['crawl_config']['max_depth']}
+        - Max Pages per Section: {summary['crawl_config']['max_pages_per_section']}
+        - Crawl Delay: {summary['crawl_config']['crawl_delay']} seconds
         """)
     
     with config_col2:
         st.info(f"""
-        - Sitemaps Found: {len(data['sitemaps']['urls'])}
-        - Sections Crawled: {data['crawl_stats']['sections_crawled']}
-        - Total Pages: {data['crawl_stats']['total_pages']}
+        - Sitemaps Found: {len(summary['sitemaps']['urls'])}
+        - Sections Crawled: {summary['crawl_stats']['sections_crawled']}
+        - Total Pages: {summary['crawl_stats']['total_pages']}
         """)
     
     # Sitemap Visualization
     st.markdown("### 🗺️ Visual Sitemap")
-    fig = create_sitemap_visualization(data)
+    detail = None
+    if len(data.pages) > SITEMAP_LOD_PAGES:
+        choice = st.selectbox("Detail", ["All sections"] + data.sections,
+                              help="Draw every page and link of one section")
+        detail = None if choice == "All sections" else choice
+    fig = sitemap_figure(RESULTS_PATH, results_version(RESULTS_PATH), detail)
     st.plotly_chart(fig, use_container_width=True)
     
+    # Link structure, when the crawl saved its link graph
+    links = data.link_analysis()
+    if links is not None:
+        st.markdown("### 🔗 Link Analysis")
+        scores, _ = links
+        nodes, _ = data.sitemap_layout()
+        ranked = nodes.join(scores)[~nodes['hub']]
+        st.caption(f"{len(data.link_graph)} pages and {data.link_graph.edge_count()} distinct links "
+                   "(PageRank is relative to the average page)")
+        top_col, matrix_col = st.columns(2)
+        with top_col:
+            st.dataframe(ranked.nlargest(TOP_RANKED_PAGES, 'rank')[['label', 'section', 'rank', 'in_links']],
+                         hide_index=True,
+                         column_config={'label': 'Page', 'rank': st.column_config.NumberColumn('PageRank', format='%.2f'),
+                                        'in_links': 'In-links'})
+        with matrix_col:
+            sections, counts = data.link_graph.section_matrix()
+            fig = px.imshow(counts, x=sections, y=sections, text_auto=True,
+                            labels=dict(x='Links to', y='Links from', color='Links'),
+                            color_continuous_scale='Blues', title='Links between sections')
+            st.plotly_chart(fig, use_container_width=True)
+    
     # Extracted Headings Analysis
     st.markdown("### 📑 Content Analysis")
     
     # Create tabs for each section
-    tabs = st.tabs(list(data['extracted_headings'].keys()))
+    tabs = st.tabs(data.sections)
     
-    for tab, (section, pages) in zip(tabs, data['extracted_headings'].items()):
+    for tab, section in zip(tabs, data.sections):
         with tab:
-            # Count headings by level for this section
-            heading_counts = {f"h{i}": 0 for i in range(1, 7)}
-            for page_data in pages.values():
-                for level, headings in page_data.items():
-                    heading_counts[level] += len(headings)
-            
-            # Create bar chart of heading distribution
-            df = pd.DataFrame(list(heading_counts.items()), columns=['Level', 'Count'])
+            # Heading counts by level were aggregated when the results were loaded
+            df = pd.DataFrame({'Level': LEVELS, 'Count': data.level_counts(section).tolist()})
             fig = px.bar(df, x='Level', y='Count', 
                         title=f'Heading Distribution in {section}',
                         color='Count',
@@ -191,13 +281,48 @@ if data:
             
             # Show sample headings
             st.markdown("#### Sample Content")
-            for page_url, page_data in pages.items():
-                with st.expander(f"📄 {urlparse(page_url).path}"):
-                    for level, headings in page_data.items():
-                        if headings:
-                            st.markdown(f"**{level.upper()}**")
-                            for heading in headings:
-                                st.markdown(f"- {heading['text']}")
+            pages = data.section_frame(section)
+            duplicates = pages['duplicate_of'].notna().sum()
+            if duplicates:
+                st.caption(f"♊ {duplicates} of {len(pages)} pages are near-duplicates of another page")
+            st.dataframe(pages[['path', *LEVELS, 'headings', 'duplicate_of']], hide_index=True)
+            views = max(1, -(-len(pages) // PAGES_PER_VIEW))
+            view = st.number_input(f"Pages (of {views})", 1, views, key=f"view-{section}") if views > 1 else 1
+            start = (view - 1) * PAGES_PER_VIEW
+            for page in pages.iloc[start:start + PAGES_PER_VIEW].itertuples():
+                # Heading text is only read once an expander is opened
+                expander = st.expander(f"📄 {page.path}", key=f"page-{section}-{page.url}", on_change="rerun")
+                with expander:
+                    if expander.open:
+                        for level, headings in data.headings(section, page.url, page.offset).items():
+                            if headings:
+                                st.markdown(f"**{level.upper()}**")
+                                for heading in headings:
+                                    st.markdown(f"- {heading['text']}")
+    
+    # Full-text search over headings and titles
+    st.markdown("### 🔎 Search Headings")
+    index_path = INDEX_CONFIG["path"]
+    if not os.path.exists(index_path):
+        st.info("No search index yet. It is built while crawling, or run `python search_index.py build`.")
+    else:
+        search_col, section_col = st.columns([3, 1])
+        with search_col:
+            query = st.text_input("Search", placeholder='linear equations, "unit circle"',
+                                  label_visibility="collapsed")
+        with section_col:
+            scope = st.selectbox("Section", ["All sections"] + data.sections, label_visibility="collapsed")
+        if query:
+            index = load_search_index(index_path, index_version(index_path))
+            start = time.perf_counter()
+            matches = index.search(query, SEARCH_RESULTS, None if scope == "All sections" else scope)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            st.caption(f"{len(matches)} matches in {elapsed_ms:.1f} ms")
+            if matches:
+                results_df = pd.DataFrame(matches)
+                results_df['level'] = results_df['level'].map(lambda level: f"h{level}" if level else "title")
+                st.dataframe(results_df[['text', 'level', 'section', 'url', 'score']], hide_index=True,
+                             column_config={'url': st.column_config.LinkColumn('url')})
     
     # Recommendations
     st.markdown("### 💡 Recommendations")
@@ -206,9 +331,9 @@ if data:
         {
             "title": "Crawling Strategy",
             "content": f"""
-            - Current crawl delay is {data['crawl_config']['crawl_delay']}s - {'consider increasing for less server load' if data['crawl_config']['crawl_delay'] < 2 else 'good balance'}
-            - {'Using sitemaps is recommended for better coverage' if not data['sitemaps']['urls'] else 'Good use of sitemaps for navigation'}
-            - {'Consider increasing depth for more content' if data['crawl_config']['max_depth'] < 2 else 'Good depth coverage'}
+            - Current crawl delay is {summary['crawl_config']['crawl_delay']}s - {'consider increasing for less server load' if summary['crawl_config']['crawl_delay'] < 2 else 'good balance'}
+            - {'Using sitemaps is recommended for better coverage' if not summary['sitemaps']['urls'] else 'Good use of sitemaps for navigation'}
+            - {'Consider increasing depth for more content' if summary['crawl_config']['max_depth'] < 2 else 'Good depth coverage'}
             """
         },
         {
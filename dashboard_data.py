@@ -0,0 +1,243 @@
+import importlib.util
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from frontier import canonicalize
+from linkgraph import LinkGraph
+
+try:
+    from orjson import loads as json_loads  # Optional, parses page records several times faster
+except ImportError:
+    json_loads = json.loads
+
+LEVELS = [f"h{level}" for level in range(1, 7)]
+# Arrow-backed strings take a fraction of the memory of Python objects (pyarrow is optional)
+STRING_DTYPE = "string[pyarrow]" if importlib.util.find_spec("pyarrow") else "string"
+
+
+def pages_path_of(path, summary):
+    """Path of the NDJSON page stream a crawl manifest points at, or None"""
+    files = summary.get("files")
+    if not files:
+        return None
+    return os.path.join(os.path.dirname(path) or ".", files["pages"])
+
+
+def results_version(path):
+    """Modification times of a manifest and the page stream it points at, for cache invalidation"""
+    version = [os.stat(path).st_mtime_ns]
+    try:
+        with open(path, "rb") as f:
+            pages_path = pages_path_of(path, json_loads(f.read()))
+    except ValueError:
+        pages_path = None  # Caught mid-write; its new mtime invalidates the cache next time
+    if pages_path and os.path.exists(pages_path):
+        version.append(os.stat(pages_path).st_mtime_ns)
+    return tuple(version)
+
+
+def link_graph_of(path, summary):
+    """The crawl's saved linkgraph.LinkGraph, or None"""
+    saved = summary.get("crawl_stats", {}).get("link_graph")
+    if not saved:
+        return None
+    graph_path = os.path.join(os.path.dirname(path) or ".", saved["path"])
+    return LinkGraph.load(graph_path) if os.path.exists(graph_path) else None
+
+
+def read_record(pages_path, offset):
+    """The page record starting at byte `offset` of an NDJSON page stream"""
+    with open(pages_path, "rb") as f:
+        f.seek(offset)
+        return json_loads(f.readline())
+
+
+def _slim(summary):
+    # Child sitemap lists can hold tens of thousands of URLs the dashboard never shows
+    for analysis in summary.get("sitemaps", {}).get("analysis", {}).values():
+        analysis.pop("sitemaps", None)
+    return summary
+
+
+def _url_path(url):
+    # Path segments of a canonical URL (host first), without the query
+    rest = url.split("://", 1)[-1].split("?", 1)[0]
+    return tuple(segment for segment in rest.split("/") if segment)
+
+
+def sitemap_layout(pages, sections):
+    """Radial tree layout of the crawled pages, computed in O(n log n)
+
+    Every section gets a sector of the circle sized by its page count and a
+    hub node inside it. Its pages are sorted by URL path, spread evenly over
+    the sector and placed on rings by path depth, so pages under the same
+    path sit together. Each page hangs off its nearest crawled ancestor
+    URL in the section, or the hub. Nodes are keyed by canonical URL.
+    Returns (nodes, edges): nodes has url, label, section, hub, x and y;
+    edges is an (n, 2) array of node positions in `nodes`.
+    """
+    canonical = pages["url"].astype(str).map(canonicalize)
+    frame = pd.DataFrame({"url": canonical, "section": pages["section"].astype(str)})
+    frame = frame.drop_duplicates("url")
+    counts = frame.groupby("section", sort=False).size()
+    sizes = np.array([max(counts.get(section, 0), 1) for section in sections], dtype=float)
+    widths = 2 * np.pi * sizes / sizes.sum()
+    starts = np.concatenate([[0.0], np.cumsum(widths)[:-1]])
+
+    urls, labels, node_sections, hubs, xs, ys, edges = [], [], [], [], [], [], []
+    for section, start, width in zip(sections, starts, widths):
+        hub = len(urls)
+        angle = start + width / 2
+        urls.append(canonicalize(section) if "://" in section else section)
+        labels.append(section.rstrip("/").rsplit("/", 1)[-1].upper() or section)
+        node_sections.append(section)
+        hubs.append(True)
+        xs.append(0.5 * np.cos(angle))
+        ys.append(0.5 * np.sin(angle))
+        members = sorted(frame.loc[frame["section"] == section, "url"], key=_url_path)
+        if not members:
+            continue
+        paths = [_url_path(url) for url in members]
+        base = min(len(path) for path in paths)
+        angles = start + (np.arange(len(members)) + 0.5) / len(members) * width
+        radii = 1 + np.array([len(path) - base for path in paths], dtype=float)
+        first = len(urls)
+        index = {path: first + i for i, path in enumerate(paths)}
+        for path in paths:
+            parent = hub
+            for depth in range(len(path) - 1, 0, -1):
+                if path[:depth] in index:
+                    parent = index[path[:depth]]
+                    break
+            edges.append((parent, index[path]))
+        urls.extend(members)
+        labels.extend("/" + "/".join(path[1:]) for path in paths)
+        node_sections.extend([section] * len(members))
+        hubs.extend([False] * len(members))
+        xs.extend(radii * np.cos(angles))
+        ys.extend(radii * np.sin(angles))
+    nodes = pd.DataFrame({"url": urls, "label": labels, "section": node_sections,
+                          "hub": hubs, "x": xs, "y": ys})
+    return nodes, np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def _pages_frame(rows):
+    frame = pd.DataFrame(rows, columns=["section", "url", "offset", "duplicate_of", *LEVELS])
+    frame = frame.drop_duplicates(["section", "url"], keep="last")  # A re-crawled page keeps its last record
+    frame["section"] = frame["section"].astype("category")
+    frame["url"] = frame["url"].astype(STRING_DTYPE)
+    frame["path"] = frame["url"].str.split("/", n=3).str[3].fillna("").radd("/").astype(STRING_DTYPE)
+    frame["duplicate_of"] = frame["duplicate_of"].astype(STRING_DTYPE)
+    frame[LEVELS] = frame[LEVELS].astype("int32")
+    frame["headings"] = frame[LEVELS].sum(axis=1)
+    return frame.reset_index(drop=True)
+
+
+class CrawlData:
+    """A crawl's results, loaded once and pre-aggregated for the dashboard.
+
+    `summary` is the manifest without extracted headings or child sitemap
+    lists, `pages` has one row per page (section, url, path, heading counts
+    per level, the page it nearly duplicates if any and the byte offset of
+    its NDJSON record), and
+    `section_levels` the heading counts per section and level. Heading text
+    is only read, record by record, through `headings`. `link_graph` is
+    the crawl's link graph, if it saved one.
+    """
+
+    def __init__(self, summary, pages, pages_path=None, legacy_headings=None, link_graph=None):
+        self.summary = summary
+        self.pages = pages
+        self.pages_path = pages_path
+        self.link_graph = link_graph
+        self._legacy_headings = legacy_headings  # section -> url -> headings of old manifests
+        self._layout = None
+        self._links = None
+        self.section_levels = pages.groupby("section", observed=True)[LEVELS].sum()
+        self.section_pages = pages.groupby("section", observed=True).size()
+        allowed = [section for section, status in summary.get("tested_paths", {}).items()
+                   if status == "Allowed"]
+        self.sections = allowed + [section for section in self.section_pages.index if section not in allowed]
+
+    @classmethod
+    def load(cls, path):
+        """Load crawl_results.json and its page stream, or an old manifest with embedded headings"""
+        with open(path, "r", encoding="utf-8") as f:
+            summary = _slim(json.load(f))
+        legacy_headings = summary.pop("extracted_headings", None)
+        pages_path = pages_path_of(path, summary)
+        rows = []
+        if legacy_headings is not None:
+            for section, pages in legacy_headings.items():
+                for url, headings in pages.items():
+                    rows.append((section, url, -1, None, *(len(headings.get(level, ())) for level in LEVELS)))
+        elif pages_path and os.path.exists(pages_path):
+            offset = 0
+            with open(pages_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json_loads(line)
+                    except json.JSONDecodeError:
+                        offset += len(line)
+                        continue
+                    headings = record["headings"]
+                    rows.append((record["section"], record["url"], offset, record.get("duplicate_of"),
+                                 *(len(headings.get(level, ())) for level in LEVELS)))
+                    offset += len(line)
+        return cls(summary, _pages_frame(rows), pages_path, legacy_headings, link_graph_of(path, summary))
+
+    def sitemap_layout(self):
+        """sitemap_layout of the crawl, computed on first use"""
+        if self._layout is None:
+            self._layout = sitemap_layout(self.pages, self.sections)
+        return self._layout
+
+    def link_analysis(self):
+        """PageRank and links of the sitemap_layout nodes, computed on first use
+
+        Returns (scores, edges) or None without a link graph: scores has
+        rank (PageRank relative to the average page) and in_links per
+        layout node, 0 for nodes outside the graph such as section hubs;
+        edges is an (n, 2) array of layout node positions, one row per
+        distinct link between two pages in the layout.
+        """
+        if self.link_graph is None:
+            return None
+        if self._links is None:
+            nodes, _ = self.sitemap_layout()
+            graph = self.link_graph
+            ranks = graph.pagerank() * len(graph)
+            in_links = graph.in_degree()
+            node_ids = nodes["url"].map(graph.ids).fillna(-1).astype(np.int64).values
+            known = node_ids >= 0
+            scores = pd.DataFrame({"rank": 0.0, "in_links": 0}, index=nodes.index)
+            scores.loc[known, "rank"] = ranks[node_ids[known]]
+            scores.loc[known, "in_links"] = in_links[node_ids[known]]
+            # Graph id -> layout position, for both ends of every link
+            positions = np.full(len(graph), -1, dtype=np.int64)
+            positions[node_ids[known]] = np.flatnonzero(known)
+            indptr, indices = graph.csr()
+            sources = positions[np.repeat(np.arange(len(graph)), np.diff(indptr))]
+            targets = positions[indices]
+            shown = (sources >= 0) & (targets >= 0)
+            self._links = scores, np.column_stack([sources[shown], targets[shown]])
+        return self._links
+
+    def section_frame(self, section):
+        """The pages of one section"""
+        return self.pages[self.pages["section"] == section]
+
+    def level_counts(self, section):
+        """Heading count per level (h1..h6) for one section"""
+        if section not in self.section_levels.index:
+            return pd.Series(0, index=LEVELS)
+        return self.section_levels.loc[section]
+
+    def headings(self, section, url, offset):
+        """Heading text of one page, by level"""
+        if self._legacy_headings is not None:
+            return self._legacy_headings[section][url]
+        return read_record(self.pages_path, offset)["headings"]
@@ -0,0 +1,37 @@
+# Collects headings, links, title and metadata in one WebDriver roundtrip.
+# Headings that are not rendered (no client rects) are skipped, matching
+# what WebElement.text returns for hidden elements.
+EXTRACT_SCRIPT = """
+var headings = [];
+document.querySelectorAll('h1, h2, h3, h4, h5, h6').forEach(function (el) {
+    if (!el.getClientRects().length) return;
+    var text = el.innerText.trim();
+    if (text) headings.push({level: Number(el.tagName.charAt(1)), text: text});
+});
+var links = [];
+document.querySelectorAll('a[href]').forEach(function (a) {
+    links.push(a.href);
+});
+var meta = {};
+document.querySelectorAll('meta[name], meta[property]').forEach(function (m) {
+    meta[m.getAttribute('name') || m.getAttribute('property')] = m.getAttribute('content');
+});
+return {
+    url: location.href,
+    title: document.title,
+    lang: document.documentElement.lang,
+    meta: meta,
+    headings: headings,
+    links: links
+};
+"""
+
+
+def empty_page(url=None):
+    """Payload used when a page could not be extracted"""
+    return {"url": url, "title": "", "lang": "", "meta": {}, "headings": [], "links": []}
+
+
+def extract_page(driver):
+    """Extract the current page with a single execute_script call"""
+    return driver.execute_script(EXTRACT_SCRIPT)
@@ -0,0 +1,111 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+# Configuration
+POOL_CONFIG = {
+    "size": os.cpu_count() or 2,  # Browsers running at the same time
+    "max_pages": 50  # Pages a browser serves before it is restarted to free memory
+}
+
+
+class DriverPool:
+    """Reusable pool of WebDriver instances.
+
+    Drivers are started lazily up to `size`, health-checked before each
+    loan, and quit and replaced after `max_pages` pages so long crawls do
+    not accumulate browser memory.
+    """
+
+    def __init__(self, factory, size=None, max_pages=None):
+        self.factory = factory
+        self.size = size or POOL_CONFIG["size"]
+        self.max_pages = max_pages or POOL_CONFIG["max_pages"]
+        self.idle = queue.Queue()
+        self.pages = {}  # driver -> pages served since it was started
+        self.started = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        driver = self.factory()
+        with self._lock:
+            self.pages[driver] = 0
+        return driver
+
+    def _replace(self):
+        """Start a driver in a slot that is already counted as started"""
+        try:
+            return self._start()
+        except Exception:
+            self.idle.put(None)  # Hand the slot to the next borrower
+            raise
+
+    def _discard(self, driver):
+        with self._lock:
+            self.pages.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _healthy(driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Borrow a driver, starting one if the pool is not full yet"""
+        with self._lock:
+            start_new = self.idle.empty() and self.started < self.size
+            if start_new:
+                self.started += 1
+        if start_new:
+            try:
+                return self._start()
+            except Exception:
+                with self._lock:
+                    self.started -= 1
+                raise
+        driver = self.idle.get()
+        if driver is None:  # Slot freed by a recycled browser
+            return self._replace()
+        if not self._healthy(driver):
+            print("♻️ Replacing unresponsive browser")
+            self._discard(driver)
+            driver = self._replace()
+        return driver
+
+    def release(self, driver):
+        """Return a driver after one page; recycle it once it has served max_pages"""
+        with self._lock:
+            self.pages[driver] = self.pages.get(driver, 0) + 1
+            worn_out = self.pages[driver] >= self.max_pages
+        if worn_out:
+            self._discard(driver)
+            driver = None  # The next borrower starts a fresh browser
+        self.idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Quit every browser the pool has started"""
+        with self._lock:
+            drivers = list(self.pages)
+            self.pages.clear()
+            self.started = 0
+        while not self.idle.empty():
+            self.idle.get_nowait()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
@@ -0,0 +1,593 @@
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from metrics import get_metrics
+
+# Configuration
+FETCH_CONFIG = {
+    "delay": 1,  # Minimum seconds between two requests to the same host
+    "burst": 1,  # Requests a host may receive back-to-back before the delay applies
+    "max_connections": 100,  # Total open connections across all hosts
+    "max_per_host": 4,  # Open connections to a single host
+    "connect_timeout": 10,  # Seconds allowed to open a connection
+    "timeout": 30,  # Total seconds allowed per request
+    "retries": 3,  # Extra attempts for connection errors and retryable statuses
+    "backoff": 0.5,  # Retry n waits backoff * 2**n seconds (or the server's Retry-After)
+    "adaptive": True,  # Tune each host's delay to its latency and 429/503 responses
+    "min_delay": 0.5,  # Fastest a healthy host is crawled (unless robots.txt asks for more)
+    "max_delay": 60,  # Slowest a struggling host is crawled
+    "speedup": 0.05,  # Seconds taken off a host's delay after each healthy response
+    "slowdown": 2,  # Delay multiplier after a 429/503 or failed request (its root after a slow one)
+    "slow_latency": 2.0,  # Seconds above which a response counts as a sign of load
+    "cache_path": "http_cache.sqlite"  # ETag/Last-Modified store; None disables conditional GETs
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class FetchError(Exception):
+    """Raised by FetchResult.raise_for_status for failed fetches"""
+
+
+class FetchResult:
+    """Response of a single fetch, shaped like a requests.Response"""
+
+    def __init__(self, url, status_code=None, content=b"", headers=None,
+                 encoding=None, elapsed=0.0, error=None, from_cache=False, timings=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.encoding = encoding or "utf-8"
+        self.elapsed = elapsed
+        self.error = error
+        self.from_cache = from_cache  # True when a 304 was answered from the local cache
+        self.timings = timings or {}  # Seconds per phase: dns, connect, ttfb, download
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    @property
+    def ok(self):
+        return self.error is None and self.status_code is not None and self.status_code < 400
+
+    def raise_for_status(self):
+        if self.error is not None:
+            raise FetchError(f"{self.url}: {self.error}")
+        if self.status_code is None:
+            raise FetchError(f"No response for url: {self.url}")
+        if self.status_code >= 400:
+            raise FetchError(f"{self.status_code} Error for url: {self.url}")
+
+
+class HttpCache:
+    """ETag/Last-Modified validators and last bodies per URL, kept in SQLite.
+
+    Re-crawls send If-None-Match/If-Modified-Since; a 304 is then answered
+    from the stored body so callers still see the page content.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, encoding TEXT, body BLOB)"
+        )
+
+    def conditional_headers(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified FROM validators WHERE url = ?", (url,)
+            ).fetchone()
+        headers = {}
+        if row:
+            if row[0]:
+                headers["If-None-Match"] = row[0]
+            if row[1]:
+                headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def store(self, result):
+        """Remember validators and body of a 200 response that carries any"""
+        etag = result.headers.get("ETag")
+        last_modified = result.headers.get("Last-Modified")
+        if result.status_code != 200 or not (etag or last_modified):
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?)",
+                (result.url, etag, last_modified, result.encoding, zlib.compress(result.content))
+            )
+
+    def fill(self, result):
+        """Give a 304 result the body stored from the previous download"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT encoding, body FROM validators WHERE url = ?", (result.url,)
+            ).fetchone()
+        if row:
+            result.encoding = row[0]
+            result.content = zlib.decompress(row[1])
+            result.from_cache = True
+        return result
+
+
+_cache = None
+_session = None
+
+
+def get_cache():
+    """Shared HttpCache, or None when FETCH_CONFIG["cache_path"] is unset"""
+    global _cache
+    if _cache is None and FETCH_CONFIG["cache_path"]:
+        _cache = HttpCache(FETCH_CONFIG["cache_path"])
+    return _cache
+
+
+def retry_delay(attempt, headers=None):
+    """Seconds to wait before retry `attempt`, honouring a numeric Retry-After"""
+    retry_after = (headers or {}).get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return FETCH_CONFIG["backoff"] * 2 ** attempt
+
+
+def adapt_delay(delay, result, floor=0.0):
+    """Next delay for a host after one response (additive decrease, multiplicative increase)
+
+    A 429/503 or failed request multiplies the delay by `slowdown` (or
+    jumps to a longer Retry-After), a response slower than `slow_latency`
+    by the square root of it, and a healthy response lowers it by
+    `speedup`. The result stays between `floor` and `max_delay`.
+    """
+    if result.error is not None or result.status_code in (429, 503):
+        delay = max(delay, FETCH_CONFIG["min_delay"]) * FETCH_CONFIG["slowdown"]
+        retry_after = result.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+    elif result.elapsed > FETCH_CONFIG["slow_latency"]:
+        delay = max(delay, FETCH_CONFIG["min_delay"]) * FETCH_CONFIG["slowdown"] ** 0.5
+    else:
+        delay -= FETCH_CONFIG["speedup"]
+    return min(FETCH_CONFIG["max_delay"], max(floor, delay))
+
+
+def record_fetch(result, size=None):
+    """Report one request's status, bytes and phase timings to the shared metrics
+
+    `size` is the body length when it was streamed instead of kept in the result.
+    """
+    metrics = get_metrics()
+    host = urlparse(result.url).netloc
+    status = "error" if result.error is not None else result.status_code
+    metrics.inc("fetch_responses_total", host=host, status=status)
+    metrics.inc("fetch_bytes_total", len(result.content) if size is None else size, host=host)
+    metrics.observe("fetch_seconds", result.elapsed, host=host)
+    for phase, seconds in result.timings.items():
+        metrics.observe("fetch_phase_seconds", seconds, phase=phase)
+
+
+def get_session():
+    """Shared keep-alive requests.Session with pooled connections
+
+    It does not retry: `get` and `iter_content` do, so every attempt goes
+    through the caller's HostThrottle and is counted in the metrics.
+    """
+    global _session
+    if _session is None:
+        adapter = HTTPAdapter(pool_connections=FETCH_CONFIG["max_connections"],
+                              pool_maxsize=FETCH_CONFIG["max_per_host"])
+        _session = requests.Session()
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+def _request(url, throttle=None, **kwargs):
+    """session.get that retries connection errors and RETRY_STATUSES.
+
+    Returns the response and the monotonic time its request was sent.
+    Retry n waits retry_delay(n) (or the server's Retry-After) and then,
+    with a `throttle`, for the host's next slot; every failed attempt is
+    reported to the metrics and the throttle, which slows the host down.
+    The caller has already waited for the first attempt's slot.
+    """
+    for attempt in range(FETCH_CONFIG["retries"] + 1):
+        last_attempt = attempt == FETCH_CONFIG["retries"]
+        start = time.monotonic()
+        try:
+            response = get_session().get(
+                url, timeout=(FETCH_CONFIG["connect_timeout"], FETCH_CONFIG["timeout"]), **kwargs
+            )
+        except Exception as e:
+            failed = FetchResult(url, error=e, elapsed=time.monotonic() - start)
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response, start
+            response.close()
+            failed = FetchResult(url, status_code=response.status_code, headers=response.headers,
+                                 elapsed=time.monotonic() - start)
+        record_fetch(failed)
+        if throttle:
+            throttle.record(failed)
+        time.sleep(retry_delay(attempt, failed.headers))
+        if throttle:
+            throttle.wait(url)
+
+
+def get(url, conditional=True, throttle=None):
+    """Blocking GET through the shared session, returning a FetchResult.
+
+    Sends validators from earlier downloads when `conditional` is set.
+    Responses, retries included, are reported to `throttle` (a
+    HostThrottle) so it can adapt the host's delay.
+    """
+    cache = get_cache() if conditional else None
+    headers = cache.conditional_headers(url) if cache else {}
+    start = time.monotonic()
+    try:
+        response, start = _request(url, throttle, headers=headers)
+    except Exception as e:
+        result = FetchResult(url, error=e, elapsed=time.monotonic() - start)
+        record_fetch(result)
+        if throttle:
+            throttle.record(result)
+        return result
+    elapsed = time.monotonic() - start
+    # requests exposes no DNS/connect hooks; elapsed runs until the headers were parsed
+    ttfb = min(response.elapsed.total_seconds(), elapsed)
+    result = FetchResult(
+        url,
+        status_code=response.status_code,
+        content=response.content,
+        headers=response.headers,
+        encoding=response.encoding,
+        elapsed=elapsed,
+        timings={"ttfb": ttfb, "download": elapsed - ttfb}
+    )
+    record_fetch(result)
+    if throttle:
+        throttle.record(result)
+    if cache:
+        if result.status_code == 304 and not cache.fill(result).from_cache:
+            # Validators but no stored body (or a server answering 304 unasked)
+            if throttle:
+                throttle.wait(url)
+            result = get(url, conditional=False, throttle=throttle)
+        if result.status_code != 304:
+            cache.store(result)
+    return result
+
+
+def iter_content(url, chunk_size=64 * 1024, throttle=None):
+    """Stream a body through the shared session without buffering it whole.
+
+    Transport compression (Content-Encoding) is undone; gzip files are
+    yielded as-is. Failed statuses are retried like in `get` before the
+    body starts. The request is reported to the metrics like `get` once
+    the body is read (or the caller stops early).
+    """
+    start = time.monotonic()
+    try:
+        response, start = _request(url, throttle, stream=True)
+    except Exception as e:
+        record_fetch(FetchResult(url, error=e, elapsed=time.monotonic() - start))
+        raise
+    ttfb = time.monotonic() - start
+    size = 0
+    error = None
+    with response:
+        try:
+            response.raise_for_status()
+            for chunk in response.raw.stream(chunk_size, decode_content=True):
+                size += len(chunk)
+                yield chunk
+        except requests.HTTPError:
+            raise  # Reported by its status code
+        except Exception as e:
+            error = e  # The connection broke mid-body
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            result = FetchResult(url, status_code=response.status_code, headers=response.headers,
+                                 elapsed=elapsed, error=error,
+                                 timings={"ttfb": ttfb, "download": elapsed - ttfb})
+            record_fetch(result, size)
+            if throttle:
+                throttle.record(result)
+
+
+class HostThrottle:
+    """Thread-safe per-host spacing for blocking callers (threads, Selenium)
+
+    Every host starts `delay` seconds apart. With `adaptive`, `record`
+    tunes each host's delay from its responses (see adapt_delay), never
+    below the floor given by `set_delay` (e.g. a robots.txt crawl-delay).
+    """
+
+    def __init__(self, delay, adaptive=None):
+        self.delay = delay
+        self.adaptive = FETCH_CONFIG["adaptive"] if adaptive is None else adaptive
+        self.delays = {}  # host -> current delay
+        self.floors = {}  # host -> lowest delay allowed
+        self.next_allowed = {}
+        self._lock = threading.Lock()
+
+    def set_delay(self, host, delay):
+        """Never space requests to `host` less than `delay` seconds apart"""
+        with self._lock:
+            self.floors[host] = delay
+            self.delays[host] = max(self.delays.get(host, self.delay), delay)
+
+    def ready_at(self, host):
+        """Monotonic time from which `host` may get its next request"""
+        return self.next_allowed.get(host, 0.0)
+
+    def reserve(self, host):
+        """Claim the next request slot of `host`; returns its monotonic time"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_allowed.get(host, now))
+            self.next_allowed[host] = slot + self.delays.get(host, self.delay)
+        return slot
+
+    def wait(self, url):
+        slot = self.reserve(urlparse(url).netloc)
+        now = time.monotonic()
+        if slot > now:
+            time.sleep(slot - now)
+
+    def record(self, result):
+        """Adapt the delay of the result's host to how it responded
+
+        The host's next slot moves with it, so a retry after a 429 already
+        waits the longer delay.
+        """
+        if not self.adaptive:
+            return
+        host = urlparse(result.url).netloc
+        with self._lock:
+            floor = self.floors.get(host, min(self.delay, FETCH_CONFIG["min_delay"]))
+            delay = self.delays.get(host, self.delay)
+            self.delays[host] = adapt_delay(delay, result, floor)
+            if host in self.next_allowed:
+                self.next_allowed[host] += self.delays[host] - delay
+
+    def snapshot(self):
+        """Per-host delays, and next allowed request times as wall-clock timestamps"""
+        with self._lock:
+            offset = time.time() - time.monotonic()
+            return {
+                "next_allowed": {host: slot + offset for host, slot in self.next_allowed.items()},
+                "delays": dict(self.delays)
+            }
+
+    def restore(self, state):
+        with self._lock:
+            offset = time.monotonic() - time.time()
+            for host, slot in state["next_allowed"].items():
+                self.next_allowed[host] = slot + offset
+            self.delays.update(state["delays"])
+
+
+class TokenBucket:
+    """Per-host politeness limiter: `rate` requests per second, `capacity` burst"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = None  # asyncio.Lock, made on the first acquire
+
+    async def acquire(self):
+        # asyncio is imported on first use: the blocking helpers (robots, sitemap) never need it
+        import asyncio
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # The lock queues waiters for this host so they are released one per token
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _trace_config():
+    # Stamps the monotonic time of each connection phase into the request's marks
+    import aiohttp
+    trace = aiohttp.TraceConfig()
+
+    def mark(name):
+        async def callback(session, context, params):
+            context.trace_request_ctx[name] = time.monotonic()
+        return callback
+
+    trace.on_dns_resolvehost_start.append(mark("dns_start"))
+    trace.on_dns_resolvehost_end.append(mark("dns_end"))
+    trace.on_connection_create_start.append(mark("connect_start"))
+    trace.on_connection_create_end.append(mark("connect_end"))
+    return trace
+
+
+def _phase_timings(marks, headers_at, end):
+    """DNS, connect (after DNS), TTFB (connection ready to headers) and download seconds"""
+    timings = {}
+    dns = 0.0
+    if "dns_end" in marks:
+        dns = timings["dns"] = marks["dns_end"] - marks["dns_start"]
+    if "connect_end" in marks:
+        timings["connect"] = max(0.0, marks["connect_end"] - marks["connect_start"] - dns)
+    timings["ttfb"] = headers_at - marks.get("connect_end", marks["start"])
+    timings["download"] = end - headers_at
+    return timings
+
+
+class FetchEngine:
+    """Connection-pooled asyncio fetcher with a token bucket per host.
+
+    Requests to different hosts run concurrently; requests to the same host
+    are spaced by that host's crawl delay, which `adaptive` tunes to the
+    host's responses (see adapt_delay). Failed requests are retried with
+    backoff, and re-crawls are sent as conditional GETs.
+    """
+
+    def __init__(self, delay=None, burst=None, max_connections=None,
+                 max_per_host=None, timeout=None, retries=None, conditional=True, adaptive=None,
+                 host_delays=None):
+        self.delay = FETCH_CONFIG["delay"] if delay is None else delay
+        self.burst = burst or FETCH_CONFIG["burst"]
+        self.max_connections = max_connections or FETCH_CONFIG["max_connections"]
+        self.max_per_host = max_per_host or FETCH_CONFIG["max_per_host"]
+        self.timeout = timeout or FETCH_CONFIG["timeout"]
+        self.retries = FETCH_CONFIG["retries"] if retries is None else retries
+        self.cache = get_cache() if conditional else None
+        self.adaptive = FETCH_CONFIG["adaptive"] if adaptive is None else adaptive
+        self.buckets = {}
+        self.floors = {}  # host -> lowest delay allowed
+        for host, host_delay in (host_delays or {}).items():
+            self.set_delay(host, host_delay)
+        self.session = None
+
+    async def __aenter__(self):
+        import aiohttp  # Only the concurrent fetcher needs it, and it is slow to import
+        connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                         limit_per_host=self.max_per_host)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout,
+                                          connect=FETCH_CONFIG["connect_timeout"]),
+            trace_configs=[_trace_config()]
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def set_delay(self, host, delay):
+        """Override the crawl delay for one host (e.g. from its robots.txt)"""
+        self.floors[host] = delay
+        self.buckets[host] = self._make_bucket(delay)
+
+    def _make_bucket(self, delay):
+        rate = 1 / delay if delay else float("inf")
+        return TokenBucket(rate, self.burst)
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = self._make_bucket(self.delay)
+        return self.buckets[host]
+
+    async def fetch(self, url):
+        """Fetch one URL, waiting for its host's token before every attempt"""
+        headers = self.cache.conditional_headers(url) if self.cache else {}
+        result = await self._attempts(url, headers)
+        if self.cache and result.error is None:
+            if result.status_code == 304 and not self.cache.fill(result).from_cache:
+                # Validators but no stored body (or a server answering 304 unasked)
+                result = await self._attempts(url, {})
+            if result.status_code != 304:
+                self.cache.store(result)
+        return result
+
+    async def _attempts(self, url, headers):
+        import asyncio
+        for attempt in range(self.retries + 1):
+            await self._bucket(url).acquire()
+            result = await self._get(url, headers)
+            record_fetch(result)
+            if self.adaptive:
+                self._adapt(url, result)
+            last_attempt = attempt == self.retries
+            if result.error is not None and not last_attempt:
+                await asyncio.sleep(retry_delay(attempt))
+            elif result.status_code in RETRY_STATUSES and not last_attempt:
+                await asyncio.sleep(retry_delay(attempt, result.headers))
+            else:
+                break
+        return result
+
+    def _adapt(self, url, result):
+        host = urlparse(url).netloc
+        bucket = self._bucket(url)
+        delay = 1 / bucket.rate if bucket.rate != float("inf") else 0.0
+        floor = self.floors.get(host, min(self.delay, FETCH_CONFIG["min_delay"]))
+        delay = adapt_delay(delay, result, floor)
+        bucket.rate = 1 / delay if delay else float("inf")
+
+    async def _get(self, url, headers):
+        start = time.monotonic()
+        marks = {"start": start}  # Filled in by the trace callbacks
+        try:
+            async with self.session.get(url, headers=headers, trace_request_ctx=marks) as response:
+                headers_at = time.monotonic()
+                content = await response.read()
+                end = time.monotonic()
+                return FetchResult(
+                    url,
+                    status_code=response.status,
+                    content=content,
+                    headers=response.headers,
+                    encoding=response.charset,
+                    elapsed=end - start,
+                    timings=_phase_timings(marks, headers_at, end)
+                )
+        except Exception as e:
+            return FetchResult(url, error=e, elapsed=time.monotonic() - start)
+
+    async def fetch_all(self, urls, on_result=None):
+        """Fetch many URLs concurrently, returning results in input order
+
+        `on_result(result)` is called as each fetch completes, one result at
+        a time in a separate thread, so slow work there (disk writes, a full
+        queue) never stalls the event loop. At most max_connections results
+        are being fetched or waiting for it: if it blocks, fetching pauses.
+        """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        loop = asyncio.get_running_loop()
+        handoff = ThreadPoolExecutor(1, thread_name_prefix="on_result") if on_result else None
+        slots = asyncio.Semaphore(self.max_connections)
+
+        async def fetch_one(url):
+            async with slots:
+                result = await self.fetch(url)
+                if handoff:
+                    await loop.run_in_executor(handoff, on_result, result)
+            return result
+        try:
+            return await asyncio.gather(*(fetch_one(url) for url in urls))
+        finally:
+            if handoff:
+                handoff.shutdown()
+
+
+def fetch_many(urls, on_result=None, **engine_options):
+    """Blocking helper: fetch `urls` concurrently and return their results"""
+    import asyncio
+
+    async def run():
+        async with FetchEngine(**engine_options) as engine:
+            return await engine.fetch_all(urls, on_result)
+    return asyncio.run(run())
+
+
+def fetch_url(url, **engine_options):
+    """Blocking helper: fetch a single URL through the engine"""
+    return fetch_many([url], **engine_options)[0]
@@ -0,0 +1,183 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from seenset import MemorySeenSet
+
+# Query parameters that only track campaigns/clicks and never change the page
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src", "_ga"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize(url):
+    """Normalise a URL so that trivially different spellings dedup together
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters (utm_* and TRACKING_PARAMS), sorts the remaining query and
+    strips trailing slashes from non-root paths. Query parameters are
+    sorted as written, never re-encoded (so "?foo" stays "?foo"), and
+    user credentials are kept.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    userinfo, at, _ = parts.netloc.rpartition("@")
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    params = []
+    for param in parts.query.split("&"):
+        key, _, value = param.partition("=")
+        name = unquote_plus(key).lower()
+        if param and not name.startswith("utm_") and name not in TRACKING_PARAMS:
+            params.append((key, value, param))
+    query = "&".join(param for _, _, param in sorted(params))
+    return urlunsplit((scheme, userinfo + at + host, path, query, ""))
+
+
+def freshness(lastmod):
+    """Sitemap <lastmod> as a POSIX timestamp (0 when missing or unparsable)"""
+    if not lastmod:
+        return 0.0
+    try:
+        return datetime.fromisoformat(lastmod.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class Frontier:
+    """Thread-safe URL frontier shared by all crawl workers.
+
+    URLs are canonicalised and deduplicated across every section and kept
+    in one queue per host, each served shallowest first, then by sitemap
+    priority, then by link rank (an item's "rank", such as its PageRank),
+    then most recently modified. `pop` blocks while other
+    workers may still add URLs and returns None once nothing is queued or
+    in flight. `seen` is any seenset store (in-memory by default).
+
+    With a fetcher.HostThrottle, `pop` serves the host whose next request
+    slot comes first and claims that slot, so workers move on to other
+    hosts instead of sleeping through one host's delay.
+    """
+
+    def __init__(self, seen=None, throttle=None):
+        self.queues = {}  # host -> heap of (key, item)
+        self.size = 0
+        self.seen = seen if seen is not None else MemorySeenSet()
+        self.throttle = throttle
+        self.active = {}  # url -> item handed out by pop() and not done yet
+        self.closed = False
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def push(self, url, depth=0, priority=0.5, lastmod=None, **meta):
+        """Queue a URL unless its canonical form was seen before; returns True if queued"""
+        url = canonicalize(url)
+        with self._cond:
+            if self.closed or not self.seen.add(url):
+                return False
+            self._push(dict(meta, url=url, depth=depth, priority=priority, lastmod=lastmod))
+            return True
+
+    @staticmethod
+    def _key(item, sequence):
+        return (item["depth"], -float(item["priority"] or 0), -float(item.get("rank") or 0),
+                -freshness(item["lastmod"]), sequence)
+
+    def _push(self, item):
+        key = self._key(item, next(self._counter))
+        heapq.heappush(self.queues.setdefault(urlsplit(item["url"]).netloc, []), (key, item))
+        self.size += 1
+        self._cond.notify_all()
+
+    def _next_host(self, now):
+        # Earliest request slot first; among hosts ready now, the best queued URL
+        best = None
+        for host, heap in self.queues.items():
+            ready = self.throttle.ready_at(host) if self.throttle else now
+            rank = (max(ready, now), heap[0][0])
+            if best is None or rank < best[0]:
+                best = (rank, host)
+        return best[1], best[0][0] - now
+
+    def pop(self):
+        """Take the best URL of the next available host, or None when the crawl is finished
+
+        With a throttle, returns once the host's request slot has come.
+        """
+        with self._cond:
+            while True:
+                if self.closed or not (self.size or self.active):
+                    return None
+                if not self.size:
+                    self._cond.wait()
+                    continue
+                host, wait = self._next_host(time.monotonic())
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+            heap = self.queues[host]
+            item = heapq.heappop(heap)[1]
+            if not heap:
+                del self.queues[host]
+            self.size -= 1
+            self.active[item["url"]] = item
+            if self.throttle:
+                slot = self.throttle.reserve(host)
+                while not self.closed:
+                    remaining = slot - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            return item
+
+    def done(self, item):
+        """Mark a popped item finished (after its out-links were pushed); repeated calls are harmless"""
+        with self._cond:
+            self.active.pop(item["url"], None)
+            if not self.active:
+                self._cond.notify_all()
+
+    def join(self):
+        """Wait until the frontier is empty and no item is in flight"""
+        with self._cond:
+            while self.size or self.active:
+                self._cond.wait()
+
+    def snapshot(self):
+        """Every unfinished item, queued or in flight, for a checkpoint"""
+        with self._cond:
+            queued = [item for heap in self.queues.values() for _, item in heap]
+            return queued + list(self.active.values())
+
+    def restore(self, items):
+        """Queue checkpointed items again, marking them seen"""
+        with self._cond:
+            for item in items:
+                self.seen.add(item["url"])
+                self._push(item)
+
+    def rerank(self, rank):
+        """Set every queued item's "rank" to rank(url) and reorder the queues"""
+        with self._cond:
+            for host, heap in self.queues.items():
+                for _, item in heap:
+                    item["rank"] = rank(item["url"])
+                self.queues[host] = [(self._key(item, key[-1]), item) for key, item in heap]
+                heapq.heapify(self.queues[host])
+            self._cond.notify_all()
+
+    def close(self):
+        """Stop serving URLs and release every waiting worker"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return self.size
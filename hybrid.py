@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+from urllib.parse import urljoin, urlparse
+
+import fetcher
+from dom_extract import empty_page
+from title_parser import ATTRIBUTES, BACKENDS, resolve_backend
+
+# Configuration
+HYBRID_CONFIG = {
+    "enabled": True,  # Try a plain HTTP fetch before rendering a page in Chrome
+    "parser": "auto",  # title_parser backend for static extraction ("auto": fastest installed)
+    "min_headings": 3,  # Static HTML with fewer headings than this needs the browser
+    "min_links": 5,  # ... and the same for links
+    "prefix_depth": 2,  # Path segments that group URLs for routing decisions (/math/algebra)
+    "min_samples": 3,  # Static attempts under a prefix before its decision is trusted
+    "browser_ratio": 0.8,  # Failure share above which a prefix goes straight to the browser
+    "static_workers": 8,  # Threads doing static fetches
+    "decisions_path": "render_decisions.json"  # Where per-prefix decisions are kept between runs
+}
+
+
+def static_extract(html, url, backend=None):
+    """Build a dom_extract-style payload from server-rendered HTML
+
+    Parsed in one pass with a title_parser backend (HYBRID_CONFIG["parser"]
+    by default).
+    """
+    backend = resolve_backend(backend or HYBRID_CONFIG["parser"])
+    iter_elements, text_of = BACKENDS[backend]
+    attribute = ATTRIBUTES[backend]
+    page = empty_page(url)
+    title = None
+    for tag, _, _, element in iter_elements(html):
+        if tag == "title" and title is None:
+            title = page["title"] = text_of(element).strip()
+        elif tag == "html" and attribute(element, "lang"):
+            page["lang"] = attribute(element, "lang")
+        elif tag == "meta":
+            name = attribute(element, "name") or attribute(element, "property")
+            if name:
+                page["meta"][name] = attribute(element, "content")
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            text = " ".join(text_of(element).split())
+            if text:
+                page["headings"].append({"level": int(tag[1]), "text": text})
+        elif tag == "a" and attribute(element, "href") is not None:
+            page["links"].append(urljoin(url, attribute(element, "href")))
+    return page
+
+
+def is_sufficient(page):
+    """Whether a statically extracted page carries enough content to skip the browser"""
+    return (len(page["headings"]) >= HYBRID_CONFIG["min_headings"]
+            and len(page["links"]) >= HYBRID_CONFIG["min_links"])
+
+
+def path_prefix(url):
+    """Routing key of a URL: host plus its first `prefix_depth` path segments"""
+    parsed = urlparse(url)
+    segments = [segment for segment in parsed.path.split("/") if segment]
+    return parsed.netloc + "/" + "/".join(segments[:HYBRID_CONFIG["prefix_depth"]])
+
+
+class HybridFetcher:
+    """Static-first page fetcher that learns which URL prefixes need Chrome.
+
+    Callers `download` a page, extract it (static_extract, possibly in
+    another process) and pass the result to `accept`. Every static attempt
+    is recorded against the URL's path prefix. Once a prefix has enough
+    samples and static extraction keeps failing there, its pages are
+    routed to the browser without a wasted HTTP fetch.
+    Responses are reported to `throttle` (a fetcher.HostThrottle) so it can
+    adapt each host's delay.
+    """
+
+    def __init__(self, decisions_path=None, throttle=None):
+        self.decisions_path = decisions_path or HYBRID_CONFIG["decisions_path"]
+        self.throttle = throttle
+        self.decisions = {}  # prefix -> [static successes, static failures]
+        self._lock = threading.Lock()
+        if self.decisions_path and os.path.exists(self.decisions_path):
+            with open(self.decisions_path, "r", encoding="utf-8") as f:
+                self.decisions = json.load(f)
+
+    def needs_browser(self, url):
+        """Whether past attempts show static extraction does not work for this URL"""
+        with self._lock:
+            ok, failed = self.decisions.get(path_prefix(url), (0, 0))
+        attempts = ok + failed
+        return attempts >= HYBRID_CONFIG["min_samples"] and failed / attempts >= HYBRID_CONFIG["browser_ratio"]
+
+    def record(self, url, sufficient):
+        with self._lock:
+            counts = self.decisions.setdefault(path_prefix(url), [0, 0])
+            counts[0 if sufficient else 1] += 1
+
+    def download(self, url):
+        """Fetch a page's HTML, retries spaced and responses reported by the throttle"""
+        return fetcher.get(url, throttle=self.throttle)
+
+    def accept(self, url, page):
+        """Record how static extraction did for `url`; the page if it suffices, else None"""
+        sufficient = is_sufficient(page)
+        self.record(url, sufficient)
+        return page if sufficient else None
+
+    def save(self):
+        if not self.decisions_path:
+            return
+        with self._lock:
+            data = json.dumps(self.decisions, indent=2)
+        tmp_path = self.decisions_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.decisions_path)
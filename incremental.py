@@ -0,0 +1,157 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from frontier import canonicalize, freshness
+
+# Configuration
+INCREMENTAL_CONFIG = {
+    "state_path": "page_state.sqlite",  # Lastmod, content hash and content of every crawled page
+    "diff_path": "crawl_diff.json",  # Which pages changed in the last incremental run, and how
+    "diff_samples": 20  # Added/removed items listed per changed page
+}
+
+
+def content_hash(content):
+    """Stable hash of extracted content (a JSON-serialisable dict)"""
+    data = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _label(item):
+    if isinstance(item, dict) and "level" in item and "text" in item:
+        return f"h{item['level']} {item['text']}"
+    return item if isinstance(item, str) else json.dumps(item, sort_keys=True)
+
+
+def content_diff(old, new):
+    """What changed between two versions of a page's content, field by field
+
+    List fields report the items added and removed; other fields report
+    the old and new value.
+    """
+    diff = {}
+    for key in sorted(set(old) | set(new)):
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if isinstance(before, list) or isinstance(after, list):
+            before = [_label(item) for item in before or []]
+            after = [_label(item) for item in after or []]
+            limit = INCREMENTAL_CONFIG["diff_samples"]
+            diff[key] = {
+                "added": [item for item in after if item not in before][:limit],
+                "removed": [item for item in before if item not in after][:limit]
+            }
+        else:
+            diff[key] = {"old": before, "new": after}
+    return diff
+
+
+class PageState:
+    """What the previous crawls saw of each page, kept in SQLite.
+
+    Stores the sitemap <lastmod> of every URL and, per crawled page, the
+    lastmod it was crawled at plus its extracted content and content hash.
+    A page whose sitemap lastmod has not moved since it was crawled can be
+    reused without fetching; a re-fetched page is compared by hash and
+    every change is collected for `write_diff`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or INCREMENTAL_CONFIG["state_path"]
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sitemap_lastmod (url TEXT PRIMARY KEY, lastmod TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, lastmod TEXT, hash TEXT, content TEXT, links TEXT, crawled_at TEXT)"
+        )
+        self.changes = {"new": [], "changed": [], "unchanged": [], "skipped": []}
+
+    def note_lastmod(self, url, lastmod):
+        """Remember a sitemap entry's lastmod (committed by `flush`)"""
+        if lastmod:
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO sitemap_lastmod VALUES (?, ?)",
+                                 (canonicalize(url), lastmod))
+
+    def flush(self):
+        with self._lock:
+            self._db.commit()
+
+    def lastmod(self, url):
+        """The sitemap lastmod of a URL, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT lastmod FROM sitemap_lastmod WHERE url = ?",
+                                   (canonicalize(url),)).fetchone()
+        return row[0] if row else None
+
+    def previous(self, url):
+        """(content, links, lastmod) from the last crawl of `url`, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT content, links, lastmod FROM pages WHERE url = ?",
+                                   (canonicalize(url),)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1] or "[]"), row[2]
+
+    def unchanged(self, url, lastmod):
+        """(content, links) of a page whose `lastmod` is no newer than when it was crawled
+
+        Returns None when the page must be fetched: it is new, or either
+        lastmod is unknown, or the sitemap reports a newer one.
+        """
+        previous = self.previous(url)
+        if previous is None or not lastmod or not previous[2]:
+            return None
+        if freshness(lastmod) > freshness(previous[2]):
+            return None
+        with self._lock:
+            self.changes["skipped"].append(url)
+        return previous[0], previous[1]
+
+    def update(self, url, content, links=(), lastmod=None):
+        """Store a freshly extracted page and record whether it is new or changed"""
+        key = canonicalize(url)
+        digest = content_hash(content)
+        with self._lock:
+            row = self._db.execute("SELECT hash, content FROM pages WHERE url = ?", (key,)).fetchone()
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, lastmod, digest, json.dumps(content, ensure_ascii=False), json.dumps(list(links)),
+                     datetime.now(timezone.utc).isoformat(timespec="seconds"))
+                )
+            if row is None:
+                self.changes["new"].append(url)
+            elif row[0] == digest:
+                self.changes["unchanged"].append(url)
+            else:
+                self.changes["changed"].append({"url": url, "diff": content_diff(json.loads(row[1]), content)})
+
+    def counts(self):
+        with self._lock:
+            return {status: len(urls) for status, urls in self.changes.items()}
+
+    def write_diff(self, path=None):
+        """Write the pages that are new or changed since the previous run"""
+        path = path or INCREMENTAL_CONFIG["diff_path"]
+        with self._lock:
+            diff = {
+                "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "counts": {status: len(urls) for status, urls in self.changes.items()},
+                "new": self.changes["new"],
+                "changed": self.changes["changed"]
+            }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(diff, f, indent=2, ensure_ascii=False)
+        return path
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,220 @@
+"""Link graph of a crawl: interned URLs, CSR adjacency and PageRank.
+
+Summarise a saved graph from the command line:
+
+    python linkgraph.py [link_graph.npz] [--top 20]
+"""
+import argparse
+import os
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from frontier import canonicalize
+
+try:
+    from scipy import sparse  # Optional, sparse matrix-vector products make PageRank several times faster
+except ImportError:
+    sparse = None
+
+# Configuration
+LINKGRAPH_CONFIG = {
+    "enabled": True,  # Record the out-links of every crawled page
+    "path": "link_graph.npz",  # Saved with every checkpoint and at the end of the crawl
+    "damping": 0.85,  # PageRank damping factor
+    "tolerance": 1e-8,  # PageRank stops once the scores change less than this (L1) in an iteration
+    "max_iterations": 100,  # ... or after this many iterations
+    "rerank_pages": 500  # Recompute PageRank and reorder the frontier every this many pages (0 = never)
+}
+
+
+def _join(strings):
+    # Newline-separated UTF-8 in a uint8 array: compact and loadable without pickle
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _split(data):
+    text = data.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+
+class LinkGraph:
+    """Directed graph of the links between crawled pages.
+
+    URLs are canonicalised and interned: each gets an integer id in order
+    of first sight. Edges are appended to two int32 arrays of source and
+    target ids (COO); `csr` turns them into a deduplicated compressed
+    sparse row adjacency, from which `pagerank` and `in_degree` are
+    computed with vectorised numpy (or scipy.sparse, when installed).
+    Crawled pages also record their section, for `section_matrix`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or LINKGRAPH_CONFIG["path"]
+        self.urls = []  # id -> canonical URL
+        self.ids = {}  # canonical URL -> id
+        self.sections = []  # Section names, by section id
+        self.node_sections = array("i")  # id -> section id of a crawled page, -1 if only linked to
+        self.sources = array("i")  # Edge source ids
+        self.targets = array("i")  # Edge target ids
+        self.scores = None  # Last computed PageRank, by id
+        self._csr = None
+        self._lock = threading.Lock()
+
+    def _intern(self, url):
+        node = self.ids.get(url)
+        if node is None:
+            node = self.ids[url] = len(self.urls)
+            self.urls.append(url)
+            self.node_sections.append(-1)
+        return node
+
+    def add_page(self, url, section, links):
+        """Record a crawled page's section and its out-links"""
+        with self._lock:
+            source = self._intern(canonicalize(url))
+            if section not in self.sections:
+                self.sections.append(section)
+            self.node_sections[source] = self.sections.index(section)
+            targets = [self._intern(canonicalize(link)) for link in links]
+            self.sources.extend([source] * len(targets))
+            self.targets.extend(targets)
+            self._csr = None
+
+    def __len__(self):
+        return len(self.urls)
+
+    def _array(self, values, dtype=np.int64):
+        # A copy: a view would keep the array.array from growing
+        return np.frombuffer(values, dtype=np.int32).astype(dtype)
+
+    def csr(self):
+        """(indptr, indices) of the adjacency, without duplicate edges or self-links"""
+        with self._lock:
+            if self._csr is None:
+                n = len(self.urls)
+                sources = self._array(self.sources)
+                targets = self._array(self.targets)
+                keys = np.sort((sources * n + targets)[sources != targets])
+                keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+                indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+                self._csr = indptr, (keys % n).astype(np.int32)
+            return self._csr
+
+    def edge_count(self):
+        return len(self.csr()[1])
+
+    def in_degree(self):
+        """Number of distinct pages linking to each node"""
+        return np.bincount(self.csr()[1], minlength=len(self.urls))
+
+    def pagerank(self, damping=None, tolerance=None, max_iterations=None):
+        """PageRank of every node by power iteration; the scores sum to 1
+
+        Nodes without out-links (including pages only linked to, never
+        crawled) spread their score evenly over all nodes.
+        """
+        damping = LINKGRAPH_CONFIG["damping"] if damping is None else damping
+        tolerance = tolerance or LINKGRAPH_CONFIG["tolerance"]
+        max_iterations = max_iterations or LINKGRAPH_CONFIG["max_iterations"]
+        indptr, indices = self.csr()
+        n = len(indptr) - 1
+        if not n:
+            self.scores = np.zeros(0)
+            return self.scores
+        out_degree = np.diff(indptr)
+        dangling = out_degree == 0
+        inverse = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+        if sparse is not None:
+            # Transposed adjacency: column j holds the out-links of node j
+            matrix = sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n, n)).T.tocsr()
+            spread = matrix.dot
+        else:
+            sources = np.repeat(np.arange(n), out_degree)
+
+            def spread(weights):
+                return np.bincount(indices, weights=weights[sources], minlength=n)
+        scores = np.full(n, 1.0 / n)
+        for _ in range(max_iterations):
+            updated = damping * spread(scores * inverse)
+            updated += (1 - damping + damping * scores[dangling].sum()) / n
+            change = np.abs(updated - scores).sum()
+            scores = updated
+            if change < tolerance:
+                break
+        self.scores = scores
+        return scores
+
+    def rank(self, url):
+        """Last computed PageRank of a URL relative to the average node (1.0), 0 if unknown"""
+        node = self.ids.get(url)
+        if node is None:
+            node = self.ids.get(canonicalize(url))
+        if self.scores is None or node is None or node >= len(self.scores):
+            return 0.0
+        return float(self.scores[node] * len(self.scores))
+
+    def section_matrix(self):
+        """(section names, counts[i, j] of distinct links from pages in section i to pages in section j)"""
+        indptr, indices = self.csr()
+        with self._lock:
+            node_sections = self._array(self.node_sections)[:len(indptr) - 1]
+            sections = list(self.sections)
+        sources = np.repeat(node_sections, np.diff(indptr))
+        targets = node_sections[indices]
+        known = (sources >= 0) & (targets >= 0)
+        size = len(sections)
+        counts = np.bincount(sources[known] * size + targets[known], minlength=size * size)
+        return sections, counts.reshape(size, size)
+
+    def save(self, path=None):
+        """Write the graph as an .npz file (uncompressed: checkpoints save it often)"""
+        path = path or self.path
+        with self._lock:
+            arrays = {
+                "urls": _join(self.urls),
+                "sections": _join(self.sections),
+                "node_sections": self._array(self.node_sections, np.int32),
+                "sources": self._array(self.sources, np.int32),
+                "targets": self._array(self.targets, np.int32)
+            }
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=None):
+        graph = cls(path)
+        with np.load(graph.path) as saved:
+            graph.urls = _split(saved["urls"])
+            graph.sections = _split(saved["sections"])
+            graph.node_sections = array("i", saved["node_sections"].tobytes())
+            graph.sources = array("i", saved["sources"].tobytes())
+            graph.targets = array("i", saved["targets"].tobytes())
+        graph.ids = {url: node for node, url in enumerate(graph.urls)}
+        return graph
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default=LINKGRAPH_CONFIG["path"])
+    parser.add_argument("--top", type=int, default=20, help="pages listed by PageRank")
+    args = parser.parse_args()
+    graph = LinkGraph.load(args.path)
+    start = time.perf_counter()
+    scores = graph.pagerank()
+    in_degree = graph.in_degree()
+    print(f"{len(graph)} pages, {graph.edge_count()} links, "
+          f"PageRank in {time.perf_counter() - start:.2f}s ({'scipy' if sparse else 'numpy'})\n")
+    for node in np.argsort(-scores)[:args.top]:
+        print(f"{scores[node] * len(scores):8.2f} {in_degree[node]:7d} in  {graph.urls[node]}")
+    sections, counts = graph.section_matrix()
+    if sections:
+        print("\nLinks between sections (rows link to columns):")
+        width = max(len(section) for section in sections)
+        print(" " * width + "".join(f"{section[:10]:>12}" for section in sections))
+        for section, row in zip(sections, counts):
+            print(f"{section:<{width}}" + "".join(f"{count:>12}" for count in row))
@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configuration
+METRICS_CONFIG = {
+    "sinks": ["stats"],  # Any of "stats" (in-process), "jsonl" and "prometheus"
+    "jsonl_path": "crawl_metrics.jsonl",  # One JSON line per recorded value
+    "prometheus_host": "127.0.0.1",  # Where the Prometheus text endpoint listens
+    "prometheus_port": 9108,  # ... served at /metrics
+    "prefix": "crawler_",  # Prepended to every Prometheus metric name
+    "buckets": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # Histogram bounds (seconds)
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{str(value)}"' for name, value in labels) + "}"
+
+
+class StatsSink:
+    """In-process aggregate of every metric: counters, gauges and histograms"""
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or METRICS_CONFIG["buckets"])
+        self.counters = {}  # (name, labels) -> total
+        self.gauges = {}  # (name, labels) -> last value
+        self.histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        key = _key(record["name"], record["labels"])
+        value = record["value"]
+        with self._lock:
+            if record["kind"] == "counter":
+                self.counters[key] = self.counters.get(key, 0) + value
+            elif record["kind"] == "gauge":
+                self.gauges[key] = value
+            else:
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+                for i, bound in enumerate(self.buckets):
+                    if value <= bound:
+                        histogram[i] += 1
+                histogram[-2] += 1
+                histogram[-1] += value
+
+    def snapshot(self):
+        """Plain-dict copy of every metric, keyed by name{labels}"""
+        with self._lock:
+            histograms = {}
+            for (name, labels), values in self.histograms.items():
+                count, total = values[-2], values[-1]
+                histograms[name + _label_text(labels)] = {
+                    "count": count,
+                    "sum": round(total, 6),
+                    "avg": round(total / count, 6) if count else 0.0
+                }
+            return {
+                "counters": {name + _label_text(labels): value for (name, labels), value in self.counters.items()},
+                "gauges": {name + _label_text(labels): value for (name, labels), value in self.gauges.items()},
+                "histograms": histograms
+            }
+
+    def render_prometheus(self, prefix=None):
+        """Every metric in the Prometheus text exposition format"""
+        prefix = METRICS_CONFIG["prefix"] if prefix is None else prefix
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {prefix}{name} {kind}")
+                    for (metric, labels), value in metrics.items():
+                        if metric == name:
+                            lines.append(f"{prefix}{name}{_label_text(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for (metric, labels), values in self.histograms.items():
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets + ("+Inf",), values):
+                        lines.append(f"{prefix}{name}_bucket{_label_text(labels + (('le', bound),))} {count}")
+                    lines.append(f"{prefix}{name}_sum{_label_text(labels)} {values[-1]}")
+                    lines.append(f"{prefix}{name}_count{_label_text(labels)} {values[-2]}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """Appends every recorded value to a JSONL file"""
+
+    def __init__(self, path=None):
+        self.path = path or METRICS_CONFIG["jsonl_path"]
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusSink:
+    """Aggregates like StatsSink and serves the result at http://host:port/metrics"""
+
+    def __init__(self, host=None, port=None):
+        self.stats = StatsSink()
+        stats = self.stats
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = stats.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host or METRICS_CONFIG["prometheus_host"],
+                                           METRICS_CONFIG["prometheus_port"] if port is None else port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def emit(self, record):
+        self.stats.emit(record)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+SINKS = {"stats": StatsSink, "jsonl": JsonlSink, "prometheus": PrometheusSink}
+
+
+class Metrics:
+    """Records counters, gauges and histogram observations to every sink.
+
+    A sink is any object with emit(record) and close(); a record is
+    {"ts", "kind", "name", "value", "labels"}. With no sinks every call
+    returns at once.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def _emit(self, kind, name, value, labels):
+        if not self.sinks:
+            return
+        record = {"ts": round(time.time(), 3), "kind": kind, "name": name, "value": value, "labels": labels}
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def inc(self, name, value=1, **labels):
+        self._emit("counter", name, value, labels)
+
+    def set(self, name, value, **labels):
+        self._emit("gauge", name, value, labels)
+
+    def observe(self, name, value, **labels):
+        self._emit("histogram", name, value, labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the seconds spent in the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @property
+    def stats(self):
+        """The in-process StatsSink, if one is configured"""
+        for sink in self.sinks:
+            if isinstance(sink, StatsSink):
+                return sink
+            if isinstance(sink, PrometheusSink):
+                return sink.stats
+        return None
+
+    def snapshot(self):
+        return self.stats.snapshot() if self.stats else {}
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+_metrics = None
+
+
+def get_metrics():
+    """Shared Metrics with the sinks named in METRICS_CONFIG["sinks"]"""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics(SINKS[name]() for name in METRICS_CONFIG["sinks"])
+    return _metrics
@@ -0,0 +1,200 @@
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import get_metrics
+
+# Configuration
+PIPELINE_CONFIG = {
+    "extract_workers": os.cpu_count() or 1,  # Extractor processes (0 = extract in a thread, no pool)
+    "queue_size": 64,  # Compressed pages waiting for an extractor before fetchers block
+    "in_flight": None,  # Pages being extracted or waiting to be written (None = 2 per worker)
+    "compress_level": 1,  # zlib level for HTML handed between stages
+    "report_interval": 10  # Seconds between throughput reports (0 = only at the end)
+}
+
+_DONE = object()
+
+
+def _extract(extract, payload, encoding, args):
+    # Runs in an extractor process: decompress, parse, time it
+    start = time.perf_counter()
+    html = zlib.decompress(payload).decode(encoding or "utf-8", errors="replace")
+    return extract(html, *args), time.perf_counter() - start
+
+
+class StageStats:
+    """Throughput counters of one pipeline stage"""
+
+    def __init__(self):
+        self.items = 0
+        self.bytes = 0
+        self.busy = 0.0  # Seconds spent doing the stage's work
+        self.errors = 0
+
+    def as_dict(self, elapsed):
+        return {
+            "items": self.items,
+            "bytes": self.bytes,
+            "busy_s": round(self.busy, 3),
+            "errors": self.errors,
+            "per_sec": round(self.items / elapsed, 2) if elapsed else 0.0
+        }
+
+
+class ExtractionPipeline:
+    """Fetch -> extract -> write stages joined by bounded queues.
+
+    Fetch threads call `submit` with raw HTML, which is compressed and put
+    on a bounded queue (fetchers block while it is full). A dispatcher
+    hands pages to a ProcessPoolExecutor running `extract(html, *args)`,
+    and one writer thread calls `write(meta, result)` in completion order
+    (result is None if extraction failed). At most `in_flight` pages are
+    being extracted or waiting to be written, so memory stays bounded
+    whatever the relative speed of the stages. `meta` never leaves this
+    process. Throughput per stage is kept in `stats` and printed every
+    report_interval seconds.
+    """
+
+    def __init__(self, extract, write, workers=None, queue_size=None, in_flight=None):
+        self.extract = extract
+        self.write = write
+        workers = PIPELINE_CONFIG["extract_workers"] if workers is None else workers
+        self.executor = ProcessPoolExecutor(workers) if workers else None
+        self.raw = queue.Queue(queue_size or PIPELINE_CONFIG["queue_size"])
+        self.parsed = queue.Queue()
+        limit = in_flight or PIPELINE_CONFIG["in_flight"] or 2 * max(workers, 1)
+        self._slots = threading.BoundedSemaphore(limit)
+        self._owed = 0  # Pages dispatched or skipped but not written yet
+        self.stats = {"fetch": StageStats(), "extract": StageStats(), "write": StageStats()}
+        self._lock = threading.Lock()
+        self.metrics = get_metrics()
+        self.started = time.monotonic()
+        self._threads = [threading.Thread(target=self._dispatch, daemon=True),
+                         threading.Thread(target=self._write_loop, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, meta, content, encoding=None, args=()):
+        """Queue a fetched page (bytes) for extraction; blocks while the queue is full"""
+        payload = zlib.compress(content, PIPELINE_CONFIG["compress_level"])
+        with self._lock:
+            self.stats["fetch"].items += 1
+            self.stats["fetch"].bytes += len(content)
+        self.raw.put((meta, payload, encoding, tuple(args)))
+
+    def skip(self, meta, result):
+        """Send a result that needs no extraction (e.g. reused content) straight to the writer"""
+        self._acquire()
+        self.parsed.put((meta, result, None))
+
+    def _acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            self._owed += 1
+
+    def _dispatch(self):
+        while True:
+            task = self.raw.get()
+            if task is _DONE:
+                self.parsed.put(_DONE)
+                return
+            meta, payload, encoding, args = task
+            self._acquire()
+            if self.executor is None:
+                try:
+                    result, busy = _extract(self.extract, payload, encoding, args)
+                    self.parsed.put((meta, result, busy))
+                except Exception as e:
+                    self.parsed.put((meta, e, None))
+                continue
+            future = self.executor.submit(_extract, self.extract, payload, encoding, args)
+            future.add_done_callback(lambda future, meta=meta: self._collect(meta, future))
+
+    def _collect(self, meta, future):
+        try:
+            result, busy = future.result()
+            self.parsed.put((meta, result, busy))
+        except Exception as e:
+            self.parsed.put((meta, e, None))
+
+    def _write_loop(self):
+        done = False  # The dispatcher has finished; stop once nothing is owed
+        last_report = time.monotonic()
+        interval = PIPELINE_CONFIG["report_interval"]
+        while True:
+            with self._lock:
+                if done and not self._owed:
+                    return
+            try:
+                entry = self.parsed.get(timeout=interval or None)
+            except queue.Empty:
+                entry = None
+            if entry is _DONE:
+                done = True
+            elif entry is not None:
+                self._write(*entry)
+            if interval and time.monotonic() - last_report >= interval:
+                print(f"\n📈 {self.report()}")
+                last_report = time.monotonic()
+
+    def _write(self, meta, result, busy):
+        extract_stats, write_stats = self.stats["extract"], self.stats["write"]
+        if isinstance(result, Exception):
+            print(f"Extraction failed for {meta}: {result}")
+            with self._lock:
+                extract_stats.errors += 1
+            result = None
+        elif busy is not None:
+            with self._lock:
+                extract_stats.items += 1
+                extract_stats.busy += busy
+            self.metrics.observe("parse_seconds", busy, extractor=self.extract.__name__)
+        start = time.perf_counter()
+        try:
+            self.write(meta, result)
+        except Exception as e:
+            print(f"Writing failed for {meta}: {e}")
+            with self._lock:
+                write_stats.errors += 1
+        finally:
+            self._slots.release()
+        with self._lock:
+            self._owed -= 1
+            write_stats.items += 1
+            write_stats.busy += time.perf_counter() - start
+            owed = self._owed
+        self.metrics.set("queue_depth", self.raw.qsize(), queue="extract")
+        self.metrics.set("queue_depth", owed, queue="in_flight")
+
+    def counters(self):
+        """Per-stage counters plus current queue depths"""
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            counters = {stage: stats.as_dict(elapsed) for stage, stats in self.stats.items()}
+            counters["in_flight"] = self._owed
+        counters["queued"] = self.raw.qsize()
+        return counters
+
+    def report(self):
+        counters = self.counters()
+        stages = " → ".join(f"{stage} {counters[stage]['items']} ({counters[stage]['per_sec']}/s)"
+                            for stage in ("fetch", "extract", "write"))
+        return f"{stages} | queued {counters['queued']}, in flight {counters['in_flight']}"
+
+    def close(self):
+        """Wait until every submitted page is written, then stop the stages"""
+        self.raw.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+        if self.executor:
+            self.executor.shutdown()
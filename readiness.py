@@ -0,0 +1,92 @@
+import time
+
+# Configuration
+READY_CONFIG = {
+    "strategy": "dom_quiet",  # "network_idle", "dom_quiet", "selector" or "fixed"
+    "timeout": 10,  # Give up waiting after this many seconds and extract anyway
+    "quiet_period": 0.5,  # Seconds without DOM mutations / new requests that count as ready
+    "poll_interval": 0.1,  # Seconds between readiness checks
+    "fixed_delay": 2  # Sleep used by the "fixed" strategy
+}
+
+# Seconds since the last DOM mutation, installing a MutationObserver on first call
+DOM_QUIET_SCRIPT = """
+if (window.__crawlerLastMutation === undefined) {
+    window.__crawlerLastMutation = performance.now();
+    new MutationObserver(function () {
+        window.__crawlerLastMutation = performance.now();
+    }).observe(document, {subtree: true, childList: true, characterData: true, attributes: true});
+}
+return [document.readyState, (performance.now() - window.__crawlerLastMutation) / 1000];
+"""
+
+# Number of resources requested so far, from the Resource Timing API
+NETWORK_SCRIPT = """
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+
+def _poll(driver, check, timeout):
+    """Call `check(driver)` until it returns True or `timeout` runs out"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check(driver):
+            return True
+        time.sleep(READY_CONFIG["poll_interval"])
+    return False
+
+
+def _dom_quiet(driver, timeout):
+    quiet = READY_CONFIG["quiet_period"]
+
+    def check(driver):
+        state, idle = driver.execute_script(DOM_QUIET_SCRIPT)
+        return state == "complete" and idle >= quiet
+    return _poll(driver, check, timeout)
+
+
+def _network_idle(driver, timeout):
+    quiet = READY_CONFIG["quiet_period"]
+    last = {"count": -1, "since": time.monotonic()}
+
+    def check(driver):
+        state, count = driver.execute_script(NETWORK_SCRIPT)
+        now = time.monotonic()
+        if count != last["count"]:
+            last["count"], last["since"] = count, now
+        return state == "complete" and now - last["since"] >= quiet
+    return _poll(driver, check, timeout)
+
+
+def _selector(driver, timeout, selector):
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    try:
+        WebDriverWait(driver, timeout, READY_CONFIG["poll_interval"]).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_until_ready(driver, strategy=None, selector=None, timeout=None):
+    """Block until the loaded page looks fully rendered.
+
+    A `selector` switches to the "selector" strategy. Returns False if the
+    page was still changing when `timeout` ran out.
+    """
+    timeout = READY_CONFIG["timeout"] if timeout is None else timeout
+    strategy = "selector" if selector else strategy or READY_CONFIG["strategy"]
+    if strategy == "selector":
+        return _selector(driver, timeout, selector)
+    if strategy == "dom_quiet":
+        return _dom_quiet(driver, timeout)
+    if strategy == "network_idle":
+        return _network_idle(driver, timeout)
+    if strategy == "fixed":
+        time.sleep(READY_CONFIG["fixed_delay"])
+        return True
+    raise ValueError(f"Unknown readiness strategy: {strategy}")
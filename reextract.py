@@ -0,0 +1,103 @@
+"""Re-run the extractors over archived pages instead of fetching them again.
+
+Run from the repository root after a crawl run with --archive (or
+archive.ARCHIVE_CONFIG["enabled"]):
+
+    python reextract.py titles [--parser auto] [--output extracted_titles.json]
+    python reextract.py headings [--parser auto] [--pages crawl_pages.ndjson]
+
+"titles" rebuilds crawler.py's extracted_titles.json from the archived
+responses of its pages. "headings" re-extracts the title and headings of
+every page in the NDJSON page stream from its archived rendered DOM (or
+response when it was never rendered) and rewrites the stream in place.
+Records are read through an mmap in worker processes, so nothing touches
+the network.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from archive import ARCHIVE_CONFIG, ArchiveReader
+from crawl_output import OUTPUT_CONFIG, read_ndjson
+from hybrid import static_extract
+from pipeline import PIPELINE_CONFIG
+from title_parser import parse_titles
+
+_reader = None
+
+
+def _run(extract, paths, args, entry):
+    # Each worker process maps the archive once
+    global _reader
+    if _reader is None:
+        _reader = ArchiveReader(*paths)
+    return entry["url"], extract(_reader.html(entry), entry["url"], *args)
+
+
+def titles_of(html, url, backend="auto"):
+    return parse_titles(html, backend)
+
+
+def headings_of(html, url, backend="auto"):
+    page = static_extract(html, url, backend)
+    headings = {f"h{level}": [] for level in range(1, 7)}
+    for heading in page["headings"]:
+        headings[f"h{heading['level']}"].append({"text": heading["text"], "level": heading["level"]})
+    return {"title": page["title"], "headings": headings}
+
+
+def reextract(extract, urls=None, kinds=("rendered", "response"), args=(), workers=None,
+              archive_path=None, index_path=None):
+    """Yield (url, extract(html, url, *args)) for the newest archived record of each URL
+
+    Only successful records of the given kinds are used, preferring kinds
+    listed first; `urls` restricts the URLs replayed.
+    """
+    paths = (archive_path or ARCHIVE_CONFIG["path"], index_path or ARCHIVE_CONFIG["index_path"])
+    reader = ArchiveReader(*paths)
+    entries = [entry for entry in reader.latest(kinds)
+               if entry["status"] < 400 and (urls is None or entry["url"] in urls)]
+    reader.close()
+    workers = workers or PIPELINE_CONFIG["extract_workers"]
+    with ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(partial(_run, extract, paths, tuple(args)), entries, chunksize=32)
+
+
+def reextract_titles(backend="auto", output="extracted_titles.json"):
+    from crawler import pages_to_crawl
+    pages = pages_to_crawl()
+    found = dict(reextract(titles_of, set(pages), kinds=("response",), args=(backend,)))
+    seen = set()
+    unique_titles = [title for page in pages for title in found.get(page, [])
+                     if not (title in seen or seen.add(title))]
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(unique_titles, f, indent=2)
+    print(f"Re-extracted {len(unique_titles)} unique titles from {len(found)} archived pages into '{output}'")
+
+
+def reextract_headings(pages_path, backend="auto"):
+    urls = {record["url"] for record in read_ndjson(pages_path)}
+    found = dict(reextract(headings_of, urls, args=(backend,)))
+    tmp_path = pages_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in read_ndjson(pages_path):
+            record.update(found.get(record["url"], {}))
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, pages_path)
+    print(f"Re-extracted {len(found)} of {len(urls)} pages in '{pages_path}' from the archive")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", choices=["titles", "headings"])
+    parser.add_argument("--parser", default="auto", help="HTML parser backend")
+    parser.add_argument("--output", default="extracted_titles.json", help="where titles are written")
+    parser.add_argument("--pages", default=os.path.join(OUTPUT_CONFIG["output_dir"], OUTPUT_CONFIG["pages_file"]),
+                        help="NDJSON page stream to update with re-extracted headings")
+    args = parser.parse_args()
+    if args.target == "titles":
+        reextract_titles(args.parser, args.output)
+    else:
+        reextract_headings(args.pages, args.parser)
@@ -0,0 +1,217 @@
+import re
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import fetcher
+
+# Configuration
+ROBOTS_CONFIG = {
+    "user_agent": "*",  # Product token matched against robots.txt user-agent lines
+    "ttl": 24 * 60 * 60,  # Seconds a fetched robots.txt stays cached (RFC 9309 caps this at 24h)
+    "max_bytes": 500 * 1024  # Only this much of a robots.txt is parsed (RFC 9309 minimum)
+}
+
+_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
+
+
+def normalize_path(path):
+    """Percent-encode a path (or rule pattern) the same way on both sides
+
+    Non-ASCII characters are UTF-8 percent-encoded and existing escapes are
+    uppercased, so /caf%c3%a9 and /café compare equal.
+    """
+    if path.isascii() and "%" not in path:
+        return path
+    path = quote(path, safe="/?=&;:@!$'()*+,~%-._")
+    return _ESCAPE.sub(lambda match: match.group(0).upper(), path)
+
+
+def _agent_token(value):
+    # "Googlebot/2.1 (+http://...)" -> "googlebot"
+    return value.split("/")[0].split()[0].lower() if value.strip() else ""
+
+
+class RobotsRules:
+    """Allow/Disallow rules of one user-agent, compiled for fast lookups.
+
+    Wildcard-free rules live in one set per pattern length, so the longest
+    matching prefix is found with a handful of set lookups, longest length
+    first. Rules with * or $ are compiled to regexes and only tried when
+    they are longer than the best prefix match. Follows RFC 9309: the
+    longest pattern wins and Allow wins a tie.
+    """
+
+    def __init__(self, rules=()):
+        prefixes = {}  # length -> {pattern: allowed}
+        wildcards = {}  # pattern -> allowed
+        for allowed, pattern in rules:
+            pattern = normalize_path(pattern)
+            target = wildcards if "*" in pattern or pattern.endswith("$") else \
+                prefixes.setdefault(len(pattern), {})
+            target[pattern] = target.get(pattern, False) or allowed
+        self.prefixes = sorted(prefixes.items(), reverse=True)
+        self.wildcards = sorted(
+            ((len(pattern), self._compile(pattern), allowed) for pattern, allowed in wildcards.items()),
+            key=lambda rule: rule[0], reverse=True
+        )
+
+    @staticmethod
+    def _compile(pattern):
+        anchored = pattern.endswith("$")
+        body = pattern[:-1] if anchored else pattern
+        regex = ".*".join(re.escape(part) for part in body.split("*"))
+        return re.compile(regex + ("$" if anchored else ""))
+
+    def allowed(self, path):
+        """Whether a normalised path (with query) may be fetched"""
+        best_length, verdict = -1, True
+        for length, patterns in self.prefixes:
+            allowed = patterns.get(path[:length]) if length <= len(path) else None
+            if allowed is not None:
+                best_length, verdict = length, allowed
+                break
+        for length, regex, allowed in self.wildcards:
+            if length < best_length or (length == best_length and verdict):
+                break
+            if regex.match(path):
+                best_length, verdict = length, allowed
+        return verdict
+
+
+class RobotsPolicy:
+    """A parsed robots.txt: groups per user-agent, crawl-delays and sitemaps.
+
+    Consecutive user-agent lines share one group, every group naming the
+    user-agent is merged, and the * groups apply when none names it.
+    """
+
+    def __init__(self, text="", url=None, status=None, error=None):
+        self.url = url
+        self.status = status  # HTTP status of the robots.txt fetch
+        self.error = error  # Exception if it could not be fetched
+        self.text = text
+        self.sitemaps = []
+        self.groups = {}  # agent token -> {"rules": [(allowed, pattern)], "crawl_delay": float}
+        self._compiled = {}
+        self._lock = threading.Lock()
+        self._parse(text.encode("utf-8")[:ROBOTS_CONFIG["max_bytes"]].decode("utf-8", "ignore"))
+
+    @classmethod
+    def disallow_all(cls, url=None, status=None, error=None):
+        """Policy for an unreachable robots.txt (server errors): nothing may be crawled"""
+        return cls("User-agent: *\nDisallow: /\n", url, status, error)
+
+    def _parse(self, text):
+        agents, in_rules = [], False
+        for line in text.lstrip("\ufeff").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+            key, value = (part.strip() for part in line.split(":", 1))
+            key = key.lower()
+            if key == "sitemap":
+                if value:
+                    self.sitemaps.append(value)
+            elif key == "user-agent":
+                if in_rules:
+                    agents, in_rules = [], False
+                token = _agent_token(value)
+                if token:
+                    agents.append(self.groups.setdefault(token, {"rules": [], "crawl_delay": None}))
+            elif key in ("allow", "disallow", "crawl-delay") and agents:
+                in_rules = True
+                for group in agents:
+                    if key == "crawl-delay":
+                        try:
+                            group["crawl_delay"] = float(value)
+                        except ValueError:
+                            pass
+                    elif value:  # An empty Disallow allows everything
+                        group["rules"].append((key == "allow", value))
+
+    def group(self, user_agent=None):
+        token = _agent_token(user_agent or ROBOTS_CONFIG["user_agent"])
+        return self.groups.get(token) or self.groups.get("*") or {"rules": [], "crawl_delay": None}
+
+    def rules(self, user_agent=None):
+        """Compiled RobotsRules for a user-agent, built once"""
+        user_agent = user_agent or ROBOTS_CONFIG["user_agent"]
+        compiled = self._compiled.get(user_agent)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.setdefault(user_agent, RobotsRules(self.group(user_agent)["rules"]))
+        return compiled
+
+    def can_fetch(self, url, user_agent=None):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if path == "/robots.txt":
+            return True
+        if parts.query:
+            path += "?" + parts.query
+        return self.rules(user_agent).allowed(normalize_path(path))
+
+    def crawl_delay(self, user_agent=None):
+        """Crawl-delay in seconds for a user-agent, or None"""
+        return self.group(user_agent)["crawl_delay"]
+
+
+class RobotsCache:
+    """Fetches robots.txt once per scheme and host and keeps it for `ttl` seconds.
+
+    A missing robots.txt (4xx) allows everything; a server error or an
+    unreachable host disallows everything until the entry expires.
+    """
+
+    def __init__(self, ttl=None, user_agent=None):
+        self.ttl = ROBOTS_CONFIG["ttl"] if ttl is None else ttl
+        self.user_agent = user_agent or ROBOTS_CONFIG["user_agent"]
+        self.policies = {}  # "scheme://host" -> (policy, expires)
+        self._lock = threading.Lock()
+        self._host_locks = {}
+
+    def policy(self, url):
+        """The RobotsPolicy that applies to `url`, fetching robots.txt if needed"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        cached = self.policies.get(origin)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        with self._lock:
+            host_lock = self._host_locks.setdefault(origin, threading.Lock())
+        with host_lock:
+            cached = self.policies.get(origin)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            policy = self._fetch(origin + "/robots.txt")
+            self.policies[origin] = (policy, time.monotonic() + self.ttl)
+            return policy
+
+    def _fetch(self, robots_url):
+        response = fetcher.get(robots_url)
+        if response.error is not None or response.status_code >= 500:
+            return RobotsPolicy.disallow_all(robots_url, response.status_code, response.error)
+        if response.status_code >= 400:
+            return RobotsPolicy("", robots_url, response.status_code)
+        return RobotsPolicy(response.text, robots_url, response.status_code)
+
+    def can_fetch(self, url):
+        return self.policy(url).can_fetch(url, self.user_agent)
+
+    def crawl_delay(self, url):
+        return self.policy(url).crawl_delay(self.user_agent)
+
+    def sitemaps(self, url):
+        return self.policy(url).sitemaps
+
+
+_robots = None
+
+
+def get_robots():
+    """Shared RobotsCache for the configured user-agent"""
+    global _robots
+    if _robots is None:
+        _robots = RobotsCache()
+    return _robots
@@ -1,24 +1,47 @@
-from urllib import robotparser
-import requests
-import json
-from bs4 import BeautifulSoup
-import gzip
-from io import BytesIO
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+import argparse
+import os
 import time
+import queue
+import threading
+from itertools import islice
 from urllib.parse import urljoin, urlparse
+import fetcher
+from driver_pool import DriverPool
+from readiness import wait_until_ready
+from dom_extract import empty_page, extract_page
+from hybrid import HYBRID_CONFIG, HybridFetcher, static_extract
+from pipeline import ExtractionPipeline
+from frontier import Frontier
+from seenset import make_seen_set
+from crawl_output import CrawlWriter, read_ndjson
+from dedup import DEDUP_CONFIG, NearDuplicates, heading_text
+from checkpoint import CrawlCheckpoint
+from archive import ARCHIVE_CONFIG, get_archive
+from incremental import PageState
+from linkgraph import LINKGRAPH_CONFIG, LinkGraph
+from metrics import get_metrics
+from robots import get_robots
+from search_index import get_index
+from sitemap import analyze_sitemap, iter_sitemap_urls
 
 # Configuration
 MAX_DEPTH = 2  # How deep to crawl (0 = just main page, 1 = main + sub-pages, 2 = main + sub + sub-sub)
 MAX_PAGES_PER_SECTION = 1  # Maximum pages to crawl per section
-CRAWL_DELAY = 2  # Default delay between requests
+CRAWL_DELAY = 2  # Starting delay between requests to a host (adapted per host while crawling)
+SEED_URLS = ["https://www.khanacademy.org"]  # Sites to crawl; every test path is crawled on each
+TEST_PATHS = ["/math", "/science", "/computing", "/humanities"]  # Sections checked against robots.txt and crawled
+EXPAND_SITEMAPS = False  # Also fetch the child sitemaps of a sitemap index
+MAX_CHILD_SITEMAPS = 10  # Child sitemaps to expand per index (None = all)
+SITEMAP_SEED_LIMIT = 0  # Sitemap URLs used to seed the crawl frontier (0 = only the section pages)
+COMPACT_TO_PARQUET = False  # Also write Parquet copies of the NDJSON streams (needs pyarrow)
+SECTION_READY_SELECTORS = {}  # Section path -> CSS selector that marks a rendered page, e.g. {"/math": "h2"}
+INCREMENTAL = False  # Skip pages unchanged since the last run (see incremental.INCREMENTAL_CONFIG)
 
 def setup_selenium():
     """Setup Selenium WebDriver with Chrome"""
+    # Imported here so crawls that never need a browser run without Selenium or Chrome
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run in headless mode
     chrome_options.add_argument("--disable-gpu")
@@ -26,13 +49,62 @@ def setup_selenium():
     chrome_options.add_argument("--disable-dev-shm-usage")
     return webdriver.Chrome(options=chrome_options)
 
-def extract_headings(url, driver=None):
-    """Extract all heading tags using Selenium"""
-    should_quit = False
-    if driver is None:
-        driver = setup_selenium()
-        should_quit = True
-        
+_driver_pool = None
+
+def get_driver_pool():
+    """Shared pool of headless browsers, started on first use"""
+    global _driver_pool
+    if _driver_pool is None:
+        _driver_pool = DriverPool(setup_selenium)
+    return _driver_pool
+
+def render_page(url, driver, ready_selector=None, timings=None, archive=None):
+    """Load a page, wait until it is ready and extract it in one script call
+
+    Waits for the page to become ready (see readiness.READY_CONFIG, or
+    `ready_selector` if given) and stores the load-to-ready time in
+    milliseconds under `timings[url]`. With an archive.PageArchive the
+    rendered DOM is archived too. Returns the dom_extract payload.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    print(f"\n🔍 Extracting headings from {url}")
+    start = time.monotonic()
+    driver.get(url)
+    
+    # Wait for content to load
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    
+    # Wait for dynamic content to settle instead of sleeping a fixed time
+    ready = wait_until_ready(driver, selector=ready_selector)
+    ready_ms = round((time.monotonic() - start) * 1000)
+    if timings is not None:
+        timings[url] = ready_ms
+    print(f"Page ready in {ready_ms} ms" + ("" if ready else " (timed out)"))
+    metrics = get_metrics()
+    metrics.observe("render_seconds", ready_ms / 1000, ready=ready)
+    if archive:
+        archive.write_rendered(url, driver.page_source)
+    
+    with metrics.timer("parse_seconds", extractor="extract_page"):
+        return extract_page(driver)
+
+def page_content(page):
+    """The part of an extracted page that incremental crawls hash and diff"""
+    return {"title": page["title"], "headings": page["headings"]}
+
+def stored_page(url, content, links):
+    """Rebuild a dom_extract payload from what incremental.PageState kept"""
+    page = empty_page(url)
+    page.update(content)
+    page["links"] = links
+    return page
+
+def headings_from_page(page):
+    """Group the headings of an extracted page by level"""
     headings_data = {
         'h1': [],
         'h2': [],
@@ -42,204 +114,478 @@ def extract_headings(url, driver=None):
         'h6': []
     }
     
-    try:
-        print(f"\n🔍 Extracting headings from {url}")
-        driver.get(url)
-        
-        # Wait for content to load
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        # Give extra time for dynamic content
-        time.sleep(2)
-        
-        # Extract all heading levels
-        for level in range(1, 7):
-            tag = f"h{level}"
-            elements = driver.find_elements(By.TAG_NAME, tag)
-            
-            for element in elements:
-                heading_text = element.text.strip()
-                if heading_text:  # Only add non-empty headings
-                    headings_data[tag].append({
-                        'text': heading_text,
-                        'level': level
-                    })
-            
-            count = len(headings_data[tag])
-            print(f"Found {count} {tag} headings")
+    for heading in page["headings"]:
+        headings_data[f"h{heading['level']}"].append({
+            'text': heading['text'],
+            'level': heading['level']
+        })
     
-    except Exception as e:
-        print(f"Error extracting headings: {e}")
-    
-    finally:
-        if should_quit:
-            driver.quit()
+    for tag, headings in headings_data.items():
+        print(f"Found {len(headings)} {tag} headings")
     
     return headings_data
 
-def get_page_links(driver, base_url):
-    """Extract links from the current page"""
-    links = set()
-    try:
-        elements = driver.find_elements(By.TAG_NAME, "a")
-        for element in elements:
-            try:
-                href = element.get_attribute("href")
-                if href and href.startswith(base_url):
-                    links.add(href)
-            except:
-                continue
-    except Exception as e:
-        print(f"Error extracting links: {e}")
-    return links
-
-def crawl_section(base_url, section_path, max_depth=MAX_DEPTH):
-    """Crawl a section of the website with specified depth"""
-    driver = setup_selenium()
-    visited = set()
-    section_data = {}
-    pages_crawled = 0
+def extract_headings(url, driver=None, ready_selector=None, timings=None):
+    """Extract all heading tags using Selenium"""
+    if driver is None:
+        with get_driver_pool().driver() as driver:
+            return extract_headings(url, driver, ready_selector, timings)
     
     try:
-        def crawl_recursive(url, depth=0):
-            nonlocal pages_crawled
-            
-            if pages_crawled >= MAX_PAGES_PER_SECTION:
-                return
-            
-            if url in visited:
-                return
-                
-            visited.add(url)
-            pages_crawled += 1
-            
-            print(f"\nCrawling page {pages_crawled} (depth {depth}): {url}")
-            
-            # Extract headings from current page
-            section_data[url] = extract_headings(url, driver)
-            
-            # If we haven't reached max depth, get links and continue crawling
-            if depth < max_depth:
-                links = get_page_links(driver, base_url)
-                # Filter links to stay within the current section
-                section_links = {link for link in links if section_path in link}
-                
-                for link in section_links:
-                    if pages_crawled < MAX_PAGES_PER_SECTION:
-                        time.sleep(CRAWL_DELAY)
-                        crawl_recursive(link, depth + 1)
-        
-        # Start crawling from the section URL
-        start_url = urljoin(base_url, section_path)
-        crawl_recursive(start_url)
-        
+        page = render_page(url, driver, ready_selector, timings)
     except Exception as e:
-        print(f"Error during crawling: {e}")
-    
-    finally:
-        driver.quit()
+        print(f"Error extracting headings: {e}")
+        get_metrics().inc("extract_errors_total", extractor="extract_headings")
+        page = empty_page(url)
     
-    return section_data
+    return headings_from_page(page)
 
-def analyze_sitemap(sitemap_url):
-    """Analyze a sitemap and return its contents"""
+def get_page_links(driver, base_url, page=None):
+    """Extract links from the current page (or from an already extracted one)"""
+    metrics = get_metrics()
     try:
-        response = requests.get(sitemap_url)
-        
-        # Handle gzipped sitemaps
-        if sitemap_url.endswith('.gz'):
-            content = gzip.decompress(response.content)
-        else:
-            content = response.content
-            
-        soup = BeautifulSoup(content, 'xml')
-        
-        # Check if this is a sitemap index
-        sitemaps = soup.find_all('sitemap')
-        if sitemaps:
-            return {
-                "type": "sitemap_index",
-                "count": len(sitemaps),
-                "sitemaps": [loc.text for loc in soup.find_all('loc')]
-            }
-        
-        # Regular sitemap
-        urls = soup.find_all('url')
-        return {
-            "type": "sitemap",
-            "count": len(urls),
-            "sample_urls": [url.loc.text for url in urls[:5]] if urls else []
-        }
+        with metrics.timer("links_seconds"):
+            if page is None:
+                page = extract_page(driver)
+            links = {href for href in page["links"] if href.startswith(base_url)}
+        metrics.inc("links_found_total", len(links))
+        return links
     except Exception as e:
+        print(f"Error extracting links: {e}")
+        metrics.inc("extract_errors_total", extractor="get_page_links")
+        return set()
+
+def in_section(url, section_path):
+    """Whether a URL lies under a section: a path such as /math, or a full URL for a given host"""
+    parsed = urlparse(url)
+    if "://" in section_path:
+        section = urlparse(section_path)
+        if parsed.netloc != section.netloc:
+            return False
+        section_path = section.path or "/"
+    path = parsed.path
+    return path == section_path or path.startswith(section_path.rstrip("/") + "/")
+
+def section_starts(base_urls, section_paths):
+    """Section key -> start URL for every seed host and section path
+
+    With one seed the keys are the section paths (/math); with several
+    they are the full start URLs, so each host keeps its own sections.
+    """
+    base_urls = [base_urls] if isinstance(base_urls, str) else list(base_urls)
+    starts = {}
+    for base_url in base_urls:
+        for section_path in section_paths:
+            start = urljoin(base_url, section_path)
+            starts[section_path if len(base_urls) == 1 else start] = start
+    return starts
+
+def crawl_sections(base_url, section_paths, max_depth=MAX_DEPTH, pool=None, timings=None,
+                   stats=None, sitemap_entries=(), writer=None, checkpoint=None, page_state=None):
+    """Crawl several sections at once from one shared URL frontier
+
+    `base_url` is one seed URL or a list of them; every section path is
+    crawled on every seed host (see section_starts for the section keys).
+    All sections feed one Frontier, which canonicalises URLs, deduplicates
+    them across sections and serves them breadth-first, then by sitemap
+    priority and freshness. `sitemap_entries` (from sitemap.iter_sitemap_urls)
+    can seed it next to the section start pages.
+
+    Frontier workers first fetch each page as plain HTML (see
+    hybrid.HYBRID_CONFIG); only pages whose static content is insufficient
+    are handed to the browser workers, one per pooled browser. Each section
+    keeps its page budget and URLs robots.txt disallows are never queued.
+    Each host has its own queue and delay, starting at CRAWL_DELAY (or its
+    robots.txt crawl-delay, which is also the floor) and adapted to its
+    latency and 429/503 responses; workers take the host whose turn comes
+    first. The final delay per host is reported in stats["host_delays"].
+
+    Frontier workers only fetch: static HTML goes, compressed, through a
+    pipeline.ExtractionPipeline whose worker processes parse it on every
+    core, and its writer stage stores the page or hands it to a browser.
+    Its per-stage counters end up in stats["pipeline"]. With --archive,
+    fetched responses and rendered DOMs go to the archive so reextract.py
+    can replay the extraction without fetching.
+    Page ready times are collected in `timings` and the number of
+    static/browser pages in `stats` when given.
+
+    Returns {section: {url: headings}}. With a crawl_output.CrawlWriter,
+    each page is streamed to it as soon as it is done and only the page
+    count per section is kept and returned.
+
+    With a checkpoint.CrawlCheckpoint (which needs a writer) the frontier,
+    counters, politeness timers and output offsets are saved every
+    checkpoint interval; if the checkpoint already holds crawl state, the
+    crawl continues from it instead of starting at the section pages.
+
+    With an incremental.PageState, pages whose sitemap lastmod is no newer
+    than at their last crawl are not fetched; their stored content is
+    reused (counted as "unchanged_pages"). Every page that is fetched is
+    hashed and compared with its previous version.
+
+    Headings and titles are added to the search index (see
+    search_index.INDEX_CONFIG) as pages finish.
+
+    Each page's heading text is fingerprinted (see dedup.DEDUP_CONFIG);
+    near-duplicates of an earlier page are written with `duplicate_of` and
+    `similarity`, counted as "duplicate_pages", and their out-links are
+    queued behind the others or not followed.
+
+    Every page's out-links go into a linkgraph.LinkGraph, saved with each
+    checkpoint and at the end (its size is in stats["link_graph"]). Every
+    LINKGRAPH_CONFIG["rerank_pages"] pages its PageRank is recomputed and
+    the frontier reordered by it, among URLs of equal depth and priority.
+    """
+    pool = pool or get_driver_pool()
+    throttle = fetcher.HostThrottle(CRAWL_DELAY)
+    hybrid = HybridFetcher(throttle=throttle) if HYBRID_CONFIG["enabled"] else None
+    robots = get_robots()
+    archive = get_archive()
+    index = get_index()
+    near_duplicates = NearDuplicates() if DEDUP_CONFIG["enabled"] else None
+    graph = LinkGraph() if LINKGRAPH_CONFIG["enabled"] else None
+    resuming = bool(checkpoint and checkpoint.state)
+    # A resumed crawl reads back the persistent seen-set (see seenset.SEEN_CONFIG), which is
+    # flushed with every checkpoint and, while checkpointing, only then
+    frontier = Frontier(make_seen_set(reset=not resuming, batch=0 if checkpoint else None), throttle)
+    browser_tasks = queue.Queue()
+    lock = threading.Lock()
+    starts = section_starts(base_url, section_paths)
+    for start in starts.values():
+        crawl_delay = robots.crawl_delay(start)
+        if crawl_delay is not None:
+            throttle.set_delay(urlparse(start).netloc, crawl_delay)
+    scheduled = {section: 0 for section in starts}
+    results = {section: 0 if writer else {} for section in starts}
+    ready_times = timings if timings is not None else {}
+    stats = stats if stats is not None else {}
+    stats.setdefault("static_pages", 0)
+    stats.setdefault("browser_pages", 0)
+    stats.setdefault("unchanged_pages", 0)
+    stats.setdefault("duplicate_pages", 0)
+    stats.setdefault("ready_ms_total", 0)
+    metrics = get_metrics()
+
+    def schedule(section_path, url, depth, priority=1.0, lastmod=None, rank=0.0):
+        # Reserves one of the section's page slots; callers hold the lock
+        if scheduled[section_path] >= MAX_PAGES_PER_SECTION or not robots.can_fetch(url):
+            return
+        if frontier.push(url, depth, priority, lastmod, section=section_path, rank=rank):
+            scheduled[section_path] += 1
+
+    def finish(item, page, renderer):
+        try:
+            store(item, page, renderer)
+        except Exception as e:
+            print(f"Error storing {item['url']}: {e}")
+        finally:
+            # Even after an error, or frontier.join() would wait for the item forever
+            frontier.done(item)
+
+    def store(item, page, renderer):
+        section_path, url, depth = item["section"], item["url"], item["depth"]
+        headings = headings_from_page(page)
+        duplicate = None
+        if near_duplicates and not page.get("error"):
+            duplicate = near_duplicates.check(url, heading_text(headings))
+        link_priority = 0.5
+        if duplicate:
+            print(f"♊ Near-duplicate of {duplicate[0]} ({duplicate[1]:.0%} similar): {url}")
+            metrics.inc("duplicate_pages_total")
+            if DEDUP_CONFIG["duplicate_links"] == "deprioritise":
+                link_priority = DEDUP_CONFIG["duplicate_priority"]
+        links = set()
+        # Links go into the link graph, and are followed until max depth
+        follow = depth < max_depth and not (duplicate and DEDUP_CONFIG["duplicate_links"] == "skip")
+        if follow or graph is not None:
+            links = get_page_links(None, urljoin(url, "/"), page)
+        if graph is not None and not page.get("error"):
+            graph.add_page(url, section_path, links)
+        ready_ms = ready_times.get(url) if timings is not None else ready_times.pop(url, None)
+        if page_state and renderer != "unchanged" and not page.get("error"):
+            page_state.update(url, page_content(page), page["links"],
+                              item["lastmod"] or page_state.lastmod(url))
+        if index and not page.get("error"):
+            index.add_page(url, section_path, headings, [page["title"]])
+        with lock:
+            if writer:
+                flags = {"duplicate_of": duplicate[0], "similarity": duplicate[1]} if duplicate else {}
+                writer.write_page(section_path, url, headings, depth=depth, renderer=renderer,
+                                  ready_ms=ready_ms, title=page["title"], **flags)
+                results[section_path] += 1
+            else:
+                results[section_path][url] = headings
+            stats[f"{renderer}_pages"] += 1
+            if duplicate:
+                stats["duplicate_pages"] += 1
+            stats["ready_ms_total"] += ready_ms or 0
+            metrics.inc("pages_total", renderer=renderer)
+            # Filter links to stay within the current section
+            if follow:
+                for link in links:
+                    if in_section(link, section_path):
+                        schedule(section_path, link, depth + 1, priority=link_priority,
+                                 rank=graph.rank(link) if graph is not None else 0.0)
+            # Before the checkpoint below, so its snapshot does not queue the page again
+            frontier.done(item)
+            done = stats["static_pages"] + stats["browser_pages"] + stats["unchanged_pages"]
+            rerank_pages = LINKGRAPH_CONFIG["rerank_pages"]
+            if graph is not None and rerank_pages and done % rerank_pages == 0:
+                graph.pagerank()
+                frontier.rerank(graph.rank)
+            metrics.set("queue_depth", len(frontier), queue="frontier")
+            metrics.set("queue_depth", browser_tasks.qsize(), queue="browser")
+            if checkpoint and checkpoint.due():
+                checkpoint.save(snapshot())
+                frontier.seen.flush()
+                if index:
+                    index.flush()
+                if graph is not None:
+                    graph.save()
+                if hybrid:
+                    hybrid.save()
+
+    def frontier_worker():
+        while True:
+            item = frontier.pop()
+            if item is None:
+                return
+            url = item["url"]
+            print(f"\nCrawling page (section {item['section']}, depth {item['depth']}): {url}")
+            page = None
+            previous = None
+            unchanged = None
+            if page_state:
+                try:
+                    unchanged = page_state.unchanged(url, item["lastmod"] or page_state.lastmod(url))
+                    previous = None if unchanged else page_state.previous(url)
+                except Exception as e:
+                    print(f"Stored state unavailable for {url}: {e}")
+            if unchanged:
+                # Outside the try: a failure while storing it must not fetch the page again
+                print(f"⏭️ Unchanged since last crawl: {url}")
+                finish(item, stored_page(url, *unchanged), "unchanged")
+                continue
+            try:
+                if hybrid and not hybrid.needs_browser(url):
+                    # pop() already claimed this host's request slot
+                    item["fetched"] = True
+                    response = hybrid.download(url)
+                    if archive and not response.from_cache:
+                        archive.write_response(response)
+                    if response.ok and response.from_cache and previous:
+                        page = stored_page(url, *previous[:2])
+                    elif response.ok:
+                        pipeline.submit(item, response.content, response.encoding,
+                                        (url, HYBRID_CONFIG["parser"]))
+                        continue
+                    else:
+                        # The browser would get the same answer; only needs_browser sends pages there
+                        page = empty_page(url)
+                        page["error"] = str(response.error or f"{response.status_code} Error for url: {url}")
+            except Exception as e:
+                print(f"Static fetch failed for {url}: {e}")
+            if page is None:
+                browser_tasks.put(item)
+            elif page.get("error"):
+                print(f"❌ Static fetch failed for {url}: {page['error']}")
+                finish(item, page, "static")
+            else:
+                print(f"⚡ Extracted without browser: {url}")
+                finish(item, page, "static")
+
+    def extracted(item, page):
+        # Writer stage of the pipeline: keep the page or send it to a browser
+        try:
+            if page is not None:
+                page = hybrid.accept(item["url"], page)
+        except Exception as e:
+            print(f"Static extraction rejected for {item['url']}: {e}")
+            page = None
+        if page is None:
+            browser_tasks.put(item)
+        else:
+            print(f"⚡ Extracted without browser: {item['url']}")
+            finish(item, page, "static")
+
+    def browser_worker():
+        while True:
+            item = browser_tasks.get()
+            if item is None:
+                return
+            url = item["url"]
+            try:
+                if item.get("fetched"):
+                    throttle.wait(url)
+                with pool.driver() as driver:
+                    page = render_page(url, driver, SECTION_READY_SELECTORS.get(item["section"]),
+                                       ready_times, archive)
+            except Exception as e:
+                print(f"Error extracting headings: {e}")
+                page = empty_page(url)
+                page["error"] = str(e)
+            finish(item, page, "browser")
+
+    def snapshot():
+        # Callers hold the lock, so pages, frontier and offsets agree
         return {
-            "type": "error",
-            "error": str(e)
+            "frontier": frontier.snapshot(),
+            "scheduled": scheduled,
+            "results": results,
+            "stats": stats,
+            "throttle": throttle.snapshot(),
+            "offsets": writer.offsets()
         }
 
-# Main execution
-if __name__ == "__main__":
-    base_url = "https://www.khanacademy.org"
-    robots_url = f"{base_url}/robots.txt"
-
-    # Initialize robotparser
-    rp = robotparser.RobotFileParser()
-    rp.set_url(robots_url)
-    rp.read()
-
-    # Download raw robots.txt
-    robots_txt = requests.get(robots_url).text
-    lines = robots_txt.splitlines()
-
-    # Extract sitemap(s)
-    sitemaps = [line.split(": ", 1)[1] for line in lines if line.lower().startswith("sitemap:")]
-
-    # Analyze sitemaps
-    sitemap_analysis = {}
-    if sitemaps:
-        print("\n📋 Analyzing sitemaps...")
-        for sitemap in sitemaps:
-            print(f"Analyzing {sitemap}...")
-            sitemap_analysis[sitemap] = analyze_sitemap(sitemap)
-
-    # Extract crawl-delay
-    crawl_delay_manual = None
-    recording = False
-    for line in lines:
-        if line.lower().startswith("user-agent: *"):
-            recording = True
-        elif line.lower().startswith("user-agent:") and not line.lower().startswith("user-agent: *"):
-            recording = False
-        if recording and line.lower().startswith("crawl-delay:"):
-            crawl_delay_manual = line.split(":")[1].strip()
-            break
-
-    crawl_delay = crawl_delay_manual or rp.crawl_delay("*") or "Not specified"
-    if crawl_delay != "Not specified":
-        CRAWL_DELAY = float(crawl_delay)
-
-    # Test paths and extract headings from allowed paths
-    test_paths = [
-        "/math",
-        "/science",
-        "/computing",
-        "/humanities"
-    ]
-    
-    results = {}
-    extracted_headings = {}
-    
+    if resuming:
+        # Resume: pages already written are seen, unfinished items are queued again
+        state = checkpoint.state
+        scheduled.update(state["scheduled"])
+        results.update(state["results"])
+        stats.update(state["stats"])
+        throttle.restore(state["throttle"])
+        if graph is not None and os.path.exists(graph.path):
+            graph = LinkGraph.load()
+        # An in-memory seen-set (or a lost file) is rebuilt from the page stream
+        rebuild_seen = not len(frontier.seen)
+        for record in read_ndjson(writer.path("pages")):
+            if rebuild_seen:
+                frontier.seen.add(record["url"])
+            if near_duplicates and "duplicate_of" not in record:
+                near_duplicates.check(record["url"], heading_text(record["headings"]))
+        frontier.restore(state["frontier"])
+        print(f"\n⏯️ Resuming with {len(frontier)} queued pages, "
+              f"{sum(results.values())} already crawled")
+    else:
+        # Start crawling from the section URLs, then any sitemap URLs under them
+        with lock:
+            for section_path, start in starts.items():
+                schedule(section_path, start, 0)
+            for entry in sitemap_entries:
+                for section_path, start in starts.items():
+                    if in_section(entry["loc"], start):
+                        schedule(section_path, entry["loc"], 1,
+                                 float(entry.get("priority") or 0.5), entry.get("lastmod"))
+                        break
+
+    pipeline = ExtractionPipeline(static_extract, extracted) if hybrid else None
+    frontier_workers = [threading.Thread(target=frontier_worker, daemon=True)
+                        for _ in range(HYBRID_CONFIG["static_workers"])]
+    browser_workers = [threading.Thread(target=browser_worker, daemon=True) for _ in range(pool.size)]
+    for thread in frontier_workers + browser_workers:
+        thread.start()
+    frontier.join()
+    frontier.close()
+    for _ in browser_workers:
+        browser_tasks.put(None)
+    for thread in frontier_workers + browser_workers:
+        thread.join()
+    if pipeline:
+        pipeline.close()
+        print(f"\n📈 {pipeline.report()}")
+        stats["pipeline"] = pipeline.counters()
+    frontier.seen.close()
+    if graph is not None:
+        graph.save()
+        stats["link_graph"] = {"path": graph.path, "pages": len(graph), "links": graph.edge_count()}
+        print(f"\n🔗 Link graph: {len(graph)} pages and {graph.edge_count()} links saved to '{graph.path}'")
+    stats["host_delays"] = {host: round(delay, 2) for host, delay in throttle.snapshot()["delays"].items()}
+
+    if hybrid:
+        hybrid.save()
+        print(f"\n⚡ {stats['static_pages']} pages extracted statically, "
+              f"{stats['browser_pages']} rendered in the browser")
+    return results
+
+def crawl_section(base_url, section_path, max_depth=MAX_DEPTH, pool=None):
+    """Crawl a section of the website with specified depth
+
+    A `pool` passed in stays open for the caller; otherwise the browsers
+    started for this section are quit when it is done.
+    """
+    try:
+        return crawl_sections(base_url, [section_path], max_depth, pool)[section_path]
+    finally:
+        if pool is None:
+            get_driver_pool().close()
+
+def main(resume=False, incremental=INCREMENTAL):
+    """Check robots.txt and sitemaps of every seed, then crawl its sections"""
+    page_state = PageState() if incremental else None
+
+    checkpoint = CrawlCheckpoint.load() if resume else None
+    if checkpoint:
+        # Robots rules and sitemaps were already analysed by the interrupted run
+        print(f"\n⏯️ Resuming from '{checkpoint.path}'")
+        sitemaps = checkpoint.setup["sitemaps"]
+        sitemap_analysis = checkpoint.setup["sitemap_analysis"]
+        results = checkpoint.setup["tested_paths"]
+        allowed_paths = checkpoint.setup["allowed_paths"]
+        sitemap_entries = checkpoint.setup["sitemap_entries"]
+        # Drop pages written after the last snapshot; they will be crawled again
+        offsets = checkpoint.state["offsets"] if checkpoint.state else {"pages": 0}
+        writer = CrawlWriter(append=True, offsets=offsets)
+    else:
+        if resume:
+            print("\nNo checkpoint found, starting a new crawl")
+
+        # Fetch robots.txt once per site; the crawl reuses the cached, compiled policies
+        robots = get_robots()
+        sitemaps = [sitemap for seed in SEED_URLS for sitemap in robots.sitemaps(seed)]
+
+        # Results are streamed to NDJSON files as they arrive
+        writer = CrawlWriter()
+
+        # Analyze sitemaps
+        sitemap_analysis = {}
+        if sitemaps:
+            print("\n📋 Analyzing sitemaps...")
+            for sitemap in sitemaps:
+                print(f"Analyzing {sitemap}...")
+                sitemap_analysis[sitemap] = analyze_sitemap(sitemap, EXPAND_SITEMAPS, MAX_CHILD_SITEMAPS,
+                                                            writer, page_state)
+
+        results = {}
+        allowed_paths = []
+
+        # Sections are keyed by path for one site and by start URL for several
+        for path, full_url in section_starts(SEED_URLS, TEST_PATHS).items():
+            allowed = robots.can_fetch(full_url)
+            results[path] = "Allowed" if allowed else "Disallowed"
+
+            if allowed:
+                allowed_paths.append(path)
+
+        sitemap_entries = []
+        if SITEMAP_SEED_LIMIT:
+            for sitemap in sitemaps:
+                entries = iter_sitemap_urls(sitemap, max_sitemaps=MAX_CHILD_SITEMAPS)
+                sitemap_entries.extend(islice(entries, SITEMAP_SEED_LIMIT - len(sitemap_entries)))
+                entries.close()
+
+        # Everything a resumed run needs to skip the steps above
+        checkpoint = CrawlCheckpoint(setup={
+            "sitemaps": sitemaps,
+            "sitemap_analysis": sitemap_analysis,
+            "tested_paths": results,
+            "allowed_paths": allowed_paths,
+            "sitemap_entries": sitemap_entries
+        })
+        checkpoint.save()
+
     print(f"\n🌐 Crawling with depth {MAX_DEPTH} (max {MAX_PAGES_PER_SECTION} pages per section)")
-    
-    for path in test_paths:
-        full_url = f"{base_url}{path}"
-        allowed = rp.can_fetch("*", full_url)
-        results[path] = "Allowed" if allowed else "Disallowed"
-        
-        if allowed:
-            print(f"\n📚 Starting section: {path}")
-            extracted_headings[path] = crawl_section(base_url, path)
+
+    # All sections share one pool of browsers and one work queue
+    print(f"\n📚 Starting sections: {', '.join(allowed_paths)}")
+
+    render_stats = {}
+    try:
+        pages_per_section = crawl_sections(SEED_URLS, allowed_paths, MAX_DEPTH, stats=render_stats,
+                                           sitemap_entries=sitemap_entries, writer=writer,
+                                           checkpoint=checkpoint, page_state=page_state)
+    finally:
+        get_driver_pool().close()
+        writer.close()
 
     # Print summary
     print("\n📊 Crawl Summary")
@@ -249,13 +595,25 @@ if __name__ == "__main__":
     
     print("\nSection Analysis:")
     total_pages = 0
-    for path in test_paths:
-        if path in extracted_headings:
-            pages = len(extracted_headings[path])
+    for path in results:
+        if path in pages_per_section:
+            pages = pages_per_section[path]
             total_pages += pages
             print(f"  {path:30} → {pages} pages crawled")
     
     print(f"\nTotal pages crawled: {total_pages}")
+    ready_ms_total = render_stats.pop("ready_ms_total")
+    if render_stats["browser_pages"]:
+        render_stats["avg_ready_ms"] = round(ready_ms_total / render_stats["browser_pages"])
+        print(f"Average time to ready: {render_stats['avg_ready_ms']} ms")
+    if render_stats["duplicate_pages"]:
+        print(f"Near-duplicate pages: {render_stats['duplicate_pages']} (flagged with duplicate_of)")
+    if page_state:
+        changes = page_state.counts()
+        diff_path = page_state.write_diff()
+        page_state.close()
+        print(f"Incremental: {changes['new']} new, {changes['changed']} changed, "
+              f"{changes['unchanged']} unchanged, {changes['skipped']} skipped (diff in '{diff_path}')")
 
     # Save results
     summary = {
@@ -266,17 +624,45 @@ if __name__ == "__main__":
         },
         "crawl_stats": {
             "total_pages": total_pages,
-            "sections_crawled": len(extracted_headings)
+            "sections_crawled": len(pages_per_section),
+            **render_stats
         },
         "sitemaps": {
             "urls": sitemaps,
             "analysis": sitemap_analysis
         },
-        "tested_paths": results,
-        "extracted_headings": extracted_headings
+        "tested_paths": results
     }
+    if page_state:
+        summary["incremental"] = changes
+    index = get_index()
+    if index:
+        index.flush()
+        print(f"Search index: {index.counts()['docs']} headings and titles in '{index.path}'")
+        index.close()
+    metrics = get_metrics()
+    if metrics.stats:
+        summary["metrics"] = metrics.snapshot()
+    metrics.close()
+
+    if COMPACT_TO_PARQUET:
+        writer.compact()
+    # crawl_results.json is now a small manifest pointing at the NDJSON streams
+    writer.write_manifest("crawl_results.json", summary)
+    checkpoint.clear()
 
-    with open("crawl_results.json", "w", encoding='utf-8') as f:
-        json.dump(summary, f, indent=2)
+    print(f"\n✅ Results saved to 'crawl_results.json' ({total_pages} pages in '{writer.files['pages']}')")
 
-    print("\n✅ Results saved to 'crawl_results.json'")
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl Khan Academy sections")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted crawl from its checkpoint")
+    parser.add_argument("--incremental", action="store_true", default=INCREMENTAL,
+                        help="only fetch pages that are new or changed since the last run")
+    parser.add_argument("--archive", action="store_true",
+                        help="archive fetched and rendered pages for reextract.py")
+    args = parser.parse_args()
+    if args.archive:
+        ARCHIVE_CONFIG["enabled"] = True
+    main(args.resume, args.incremental)
@@ -0,0 +1,423 @@
+"""Full-text search over extracted headings and titles.
+
+The index is kept in SQLite and grows as pages are extracted (scrapper.py
+and crawler.py feed it while crawling). To (re)build it from existing
+output or query it from the command line:
+
+    python search_index.py build [--pages crawl_pages.ndjson]
+    python search_index.py query 'linear equations' [--limit 10] [--section /math]
+    python search_index.py query '"unit circle"'
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from crawl_output import OUTPUT_CONFIG, read_ndjson
+
+# Configuration
+INDEX_CONFIG = {
+    "enabled": True,  # Index headings and titles as pages are extracted
+    "path": "search_index.sqlite",  # Documents, terms and compressed postings
+    "flush_docs": 20000,  # Documents buffered in memory before a new postings block is written
+    "k1": 1.2,  # BM25 term-frequency saturation
+    "b": 0.75,  # BM25 length normalisation
+    "level_boost": {0: 2.0, 1: 1.8, 2: 1.5, 3: 1.3, 4: 1.15, 5: 1.05, 6: 1.0}  # Title (0) and h1-h6 score multipliers
+}
+
+TOKEN_RE = re.compile(r"\w+")
+PHRASE_RE = re.compile(r'"([^"]+)"')
+POSITION_BITS = 20  # Phrase matching packs (doc id, position) into one int64
+
+
+def tokenize(text):
+    """Lowercased word tokens with accents removed"""
+    text = text.casefold()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return TOKEN_RE.findall(text)
+
+
+def encode_varints(values):
+    """Unsigned LEB128 encoding of non-negative integers"""
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varints(data):
+    """Vectorised inverse of encode_varints, as an int64 array"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = 7 * (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1))
+    values = (raw & 0x7F).astype(np.int64) << shifts
+    return np.add.reduceat(values, starts)
+
+
+def _encode_block(postings):
+    # postings: [(doc_id, positions, length, level)] in increasing doc_id order
+    doc_ids = [posting[0] for posting in postings]
+    gaps = [doc_ids[0]] + [b - a for a, b in zip(doc_ids, doc_ids[1:])]
+    tfs = [len(posting[1]) for posting in postings]
+    positions = []
+    for _, doc_positions, _, _ in postings:
+        positions.extend([doc_positions[0]] + [b - a for a, b in zip(doc_positions, doc_positions[1:])])
+    norms = bytes(min(posting[2], 255) for posting in postings)
+    levels = bytes(posting[3] for posting in postings)
+    return encode_varints(gaps), encode_varints(tfs), encode_varints(positions), norms, levels
+
+
+class _Postings:
+    """Decoded postings of one term across all of its blocks"""
+
+    def __init__(self, blocks):
+        doc_ids, tfs, positions, norms, levels = [], [], [], [], []
+        for docs, tf, pos, norm, level in blocks:
+            doc_ids.append(np.cumsum(decode_varints(docs)))
+            tfs.append(decode_varints(tf))
+            positions.append(pos)
+            norms.append(np.frombuffer(norm, dtype=np.uint8))
+            levels.append(np.frombuffer(level, dtype=np.uint8))
+        self.doc_ids = np.concatenate(doc_ids) if doc_ids else np.zeros(0, dtype=np.int64)
+        self.tfs = np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.int64)
+        self.norms = np.concatenate(norms).astype(np.float64) if norms else np.zeros(0)
+        self.levels = np.concatenate(levels) if levels else np.zeros(0, dtype=np.uint8)
+        self._positions = positions
+
+    def positions(self):
+        """(doc id per occurrence, token position per occurrence), decoded on demand"""
+        if not len(self.doc_ids):
+            return self.doc_ids, self.doc_ids
+        gaps = np.concatenate([decode_varints(pos) for pos in self._positions])
+        starts = np.concatenate(([0], np.cumsum(self.tfs)[:-1]))
+        running = np.cumsum(gaps)
+        # Gaps restart at every document: subtract the running total before its first position
+        base = running[starts] - gaps[starts]
+        return np.repeat(self.doc_ids, self.tfs), running - np.repeat(base, self.tfs)
+
+
+class HeadingIndex:
+    """On-disk inverted index of headings and titles with BM25 ranking.
+
+    Every heading or title is a document with its page URL, section and
+    level (0 for titles). Postings are positional and stored per term in
+    blocks: doc-id gaps, term frequencies and position gaps as varints,
+    plus per-document length and level bytes, so scoring never touches the
+    documents table. `add_page` buffers documents and every `flush` (or
+    flush_docs documents) appends one block per term; `optimize` merges
+    each term's blocks and drops replaced documents. Re-adding a page from
+    the same source replaces its previous documents.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or INDEX_CONFIG["path"]
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "id INTEGER PRIMARY KEY, url TEXT, section TEXT, source TEXT, level INTEGER, text TEXT, length INTEGER);"
+            "CREATE INDEX IF NOT EXISTS docs_url ON docs (url, source);"
+            "CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER, blocks INTEGER);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT, block INTEGER, docs BLOB, tfs BLOB, positions BLOB, norms BLOB, levels BLOB,"
+            "PRIMARY KEY (term, block)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS deleted (id INTEGER PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);"
+        )
+        row = self._db.execute("SELECT MAX(id) FROM docs").fetchone()
+        self._next_id = (row[0] or 0) + 1
+        self._docs = []  # Buffered rows for the docs table
+        self._postings = {}  # term -> [(doc_id, positions, length, level)]
+        self._replaced = set()  # (url, source) pages whose stored documents are superseded
+        self._deleted = None  # Cached array of deleted doc ids
+        self._terms = None  # term -> [df, blocks], loaded on the first flush
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_page(self, url, section, headings=None, titles=(), source="pages"):
+        """Index a page's headings ({"h1": [{"text": ...}], ...}) and titles (strings)"""
+        documents = [(0, title) for title in titles if title]
+        for level, items in (headings or {}).items():
+            documents.extend((int(level[1]), item["text"]) for item in items if item.get("text"))
+        with self._lock:
+            self._replaced.add((url, source))
+            for level, text in documents:
+                tokens = tokenize(text)
+                if not tokens:
+                    continue
+                doc_id = self._next_id
+                self._next_id += 1
+                self._docs.append((doc_id, url, section, source, level, text, len(tokens)))
+                term_positions = {}
+                for position, token in enumerate(tokens):
+                    term_positions.setdefault(token, []).append(position)
+                for term, positions in term_positions.items():
+                    self._postings.setdefault(term, []).append((doc_id, positions, len(tokens), level))
+            full = len(self._docs) >= INDEX_CONFIG["flush_docs"]
+        if full:
+            self.flush()
+
+    def _delete_replaced(self, first_new_id):
+        # Mark earlier documents of re-added pages as deleted and take them out of df
+        removed_terms = {}
+        removed_docs = removed_length = 0
+        for url, source in self._replaced:
+            rows = self._db.execute(
+                "SELECT id, text, length FROM docs WHERE url = ? AND source = ? AND id < ? "
+                "AND id NOT IN (SELECT id FROM deleted)", (url, source, first_new_id)).fetchall()
+            for doc_id, text, length in rows:
+                self._db.execute("INSERT OR IGNORE INTO deleted VALUES (?)", (doc_id,))
+                removed_docs += 1
+                removed_length += length
+                for term in set(tokenize(text)):
+                    removed_terms[term] = removed_terms.get(term, 0) + 1
+        for term, count in removed_terms.items():
+            if term in self._terms:
+                self._terms[term][0] -= count
+        self._db.executemany("UPDATE terms SET df = df - ? WHERE term = ?",
+                             [(count, term) for term, count in removed_terms.items()])
+        return removed_docs, removed_length
+
+    def flush(self):
+        """Write buffered documents and one postings block per term"""
+        with self._lock, self._db:
+            if not self._docs and not self._replaced:
+                return
+            if self._terms is None:
+                self._terms = {term: [df, blocks] for term, df, blocks in self._db.execute("SELECT * FROM terms")}
+            first_new_id = self._docs[0][0] if self._docs else self._next_id
+            removed_docs, removed_length = self._delete_replaced(first_new_id)
+            self._db.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?, ?)", self._docs)
+            blocks, terms = [], []
+            for term, postings in self._postings.items():
+                entry = self._terms.setdefault(term, [0, 0])
+                blocks.append((term, entry[1], *_encode_block(postings)))
+                entry[0] += len(postings)
+                entry[1] += 1
+                terms.append((term, *entry))
+            self._db.executemany("INSERT INTO postings VALUES (?, ?, ?, ?, ?, ?, ?)", blocks)
+            self._db.executemany("INSERT OR REPLACE INTO terms VALUES (?, ?, ?)", terms)
+            self._bump("docs", len(self._docs) - removed_docs)
+            self._bump("length", sum(doc[6] for doc in self._docs) - removed_length)
+            self._docs, self._postings, self._replaced = [], {}, set()
+            self._deleted = None
+
+    def _bump(self, key, delta):
+        self._db.execute("INSERT OR IGNORE INTO meta VALUES (?, 0)", (key,))
+        self._db.execute("UPDATE meta SET value = value + ? WHERE key = ?", (delta, key))
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _term(self, term):
+        blocks = self._db.execute(
+            "SELECT docs, tfs, positions, norms, levels FROM postings WHERE term = ? ORDER BY block",
+            (term,)).fetchall()
+        return _Postings(blocks)
+
+    def _deleted_ids(self):
+        if self._deleted is None:
+            self._deleted = np.array([row[0] for row in self._db.execute("SELECT id FROM deleted")],
+                                     dtype=np.int64)
+        return self._deleted
+
+    def search(self, query, limit=10, section=None):
+        """Best-matching headings and titles for a query, by BM25 with a heading-level boost
+
+        Words are matched in any order; "quoted phrases" must appear as
+        written. Returns dicts with url, section, level, text and score.
+        """
+        phrases = [tokenize(phrase) for phrase in PHRASE_RE.findall(query)]
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        k1, b = INDEX_CONFIG["k1"], INDEX_CONFIG["b"]
+        boost = np.array([INDEX_CONFIG["level_boost"].get(level, 1.0) for level in range(7)])
+        with self._lock:
+            docs = max(self._meta("docs"), 1)
+            avgdl = max(self._meta("length"), 1) / docs
+            postings = {term: self._term(term) for term in terms}
+            deleted = self._deleted_ids()
+            dfs = dict(self._db.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(terms))})", terms).fetchall())
+
+        ids, scores = [], []
+        for term, posting in postings.items():
+            if not len(posting.doc_ids):
+                continue
+            df = max(dfs.get(term, 0), 1)
+            idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+            tf = posting.tfs
+            score = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * posting.norms / avgdl))
+            ids.append(posting.doc_ids)
+            scores.append(score * boost[posting.levels])
+        if not ids:
+            return []
+        # Dense accumulator indexed by doc id: no sorting of the (possibly huge) match lists
+        totals = np.bincount(np.concatenate(ids), weights=np.concatenate(scores))
+        totals[deleted[deleted < len(totals)]] = 0
+        for phrase in phrases:
+            matched = np.zeros(len(totals), dtype=bool)
+            matched[self._phrase_docs(phrase, postings)] = True
+            totals[~matched] = 0
+        candidates = np.flatnonzero(totals)
+        ranked = totals[candidates]
+        if section is None and len(candidates) > limit:
+            top = np.argpartition(-ranked, limit - 1)[:limit]
+            candidates, ranked = candidates[top], ranked[top]
+        order = np.argsort(-ranked, kind="stable")
+        return self._results(candidates[order], ranked[order], limit, section)
+
+    @staticmethod
+    def _phrase_docs(phrase, postings):
+        # Docs where the phrase's tokens appear at consecutive positions: each occurrence
+        # becomes the key (doc id, position - offset in phrase) and the keys are intersected.
+        # Postings are in doc id then position order, so the keys come out sorted.
+        keys = None
+        for offset, term in enumerate(phrase):
+            doc_ids, positions = postings[term].positions()
+            starts = positions - offset
+            valid = starts >= 0
+            term_keys = (doc_ids[valid] << POSITION_BITS) | starts[valid]
+            if keys is None:
+                keys = term_keys
+            elif len(term_keys):
+                found = np.searchsorted(term_keys, keys).clip(max=len(term_keys) - 1)
+                keys = keys[term_keys[found] == keys]
+            else:
+                keys = term_keys
+            if not len(keys):
+                break
+        docs = keys >> POSITION_BITS
+        return docs[np.concatenate(([True], docs[1:] != docs[:-1]))] if len(docs) else docs
+
+    def _results(self, doc_ids, scores, limit, section):
+        # Fetch the ranked documents in chunks until `limit` pass the section filter
+        results = []
+        for start in range(0, len(doc_ids), max(limit, 50)):
+            chunk = doc_ids[start:start + max(limit, 50)].tolist()
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT id, url, section, level, text FROM docs WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+            by_id = {row[0]: row[1:] for row in rows}
+            for doc_id, score in zip(chunk, scores[start:start + len(chunk)].tolist()):
+                url, doc_section, level, text = by_id[doc_id]
+                if section is None or doc_section == section:
+                    results.append({"url": url, "section": doc_section, "level": level,
+                                    "text": text, "score": round(score, 4)})
+                    if len(results) == limit:
+                        return results
+        return results
+
+    def optimize(self):
+        """Merge every term's postings into one block and drop deleted documents"""
+        self.flush()
+        with self._lock, self._db:
+            deleted = self._deleted_ids()
+            for (term,) in self._db.execute("SELECT term FROM terms").fetchall():
+                posting = self._term(term)
+                keep = ~np.isin(posting.doc_ids, deleted)
+                self._db.execute("DELETE FROM postings WHERE term = ?", (term,))
+                if not keep.any():
+                    self._db.execute("DELETE FROM terms WHERE term = ?", (term,))
+                    continue
+                _, positions = posting.positions()
+                per_doc = np.split(positions, np.cumsum(posting.tfs)[:-1])
+                merged = [(doc_id, doc_positions.tolist(), int(norm), int(level))
+                          for doc_id, doc_positions, norm, level, kept
+                          in zip(posting.doc_ids.tolist(), per_doc, posting.norms, posting.levels.tolist(), keep)
+                          if kept]
+                self._db.execute("INSERT INTO postings VALUES (?, 0, ?, ?, ?, ?, ?)", (term, *_encode_block(merged)))
+                self._db.execute("UPDATE terms SET df = ?, blocks = 1 WHERE term = ?", (len(merged), term))
+            self._db.execute("DELETE FROM docs WHERE id IN (SELECT id FROM deleted)")
+            self._db.execute("DELETE FROM deleted")
+            self._deleted = None
+        with self._lock:
+            self._db.execute("VACUUM")
+
+    def counts(self):
+        with self._lock:
+            return {"docs": self._meta("docs"),
+                    "terms": self._db.execute("SELECT COUNT(*) FROM terms").fetchone()[0]}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+_index = None
+
+
+def get_index():
+    """Shared HeadingIndex, or None when INDEX_CONFIG["enabled"] is off"""
+    global _index
+    if _index is None and INDEX_CONFIG["enabled"]:
+        _index = HeadingIndex()
+    return _index
+
+
+def build(pages_path, titles_path=None, path=None):
+    """Index every page of an NDJSON page stream (and crawler.py's extracted titles)"""
+    start = time.perf_counter()
+    with HeadingIndex(path) as index:
+        for record in read_ndjson(pages_path):
+            index.add_page(record["url"], record["section"], record["headings"],
+                           [record["title"]] if record.get("title") else ())
+        if titles_path and os.path.exists(titles_path):
+            with open(titles_path, "r", encoding="utf-8") as f:
+                index.add_page(titles_path, None, titles=json.load(f), source="titles")
+        index.optimize()
+        counts = index.counts()
+    print(f"Indexed {counts['docs']} headings and titles ({counts['terms']} terms) "
+          f"in {time.perf_counter() - start:.1f}s into '{index.path}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="index an existing crawl")
+    build_parser.add_argument("--pages", default=os.path.join(OUTPUT_CONFIG["output_dir"], OUTPUT_CONFIG["pages_file"]),
+                              help="NDJSON page stream to index")
+    build_parser.add_argument("--titles", default="extracted_titles.json", help="crawler.py titles to index")
+    query_parser = commands.add_parser("query", help="search the index")
+    query_parser.add_argument("query")
+    query_parser.add_argument("--limit", type=int, default=10)
+    query_parser.add_argument("--section", help="only results from this section")
+    args = parser.parse_args()
+    if args.command == "build":
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(INDEX_CONFIG["path"] + suffix):
+                os.remove(INDEX_CONFIG["path"] + suffix)
+        build(args.pages, args.titles)
+    else:
+        index = HeadingIndex()
+        start = time.perf_counter()
+        results = index.search(args.query, args.limit, args.section)
+        print(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for result in results:
+            level = "title" if result["level"] == 0 else f"h{result['level']}"
+            print(f"{result['score']:8.3f}  {level:<5}  {result['text']}  ({result['url']})")
+        index.close()
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import struct
+import threading
+
+# Configuration
+SEEN_CONFIG = {
+    "kind": "memory",  # "memory", "bloom" or "sqlite"
+    "path": "seen_urls",  # File prefix for the persistent kinds (.bloom / .sqlite is appended)
+    "bloom_capacity": 1_000_000,  # URLs the first Bloom stage holds before a larger one is added
+    "bloom_error": 0.001,  # Target false-positive rate of the whole Bloom filter
+    "sqlite_batch": 1000  # Inserts per SQLite transaction
+}
+
+
+def _digest(key, size=16):
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=size).digest()
+
+
+class MemorySeenSet:
+    """Plain in-memory set; exact, but grows with every URL and is lost on exit"""
+
+    def __init__(self):
+        self.items = set()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Record `key`; returns True if it had not been seen before"""
+        with self._lock:
+            if key in self.items:
+                return False
+            self.items.add(key)
+            return True
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _BloomStage:
+    def __init__(self, capacity, error, bits=None, count=0):
+        self.capacity = capacity
+        self.error = error
+        self.size = max(8, int(-capacity * math.log(error) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def positions(self, digest):
+        # Double hashing: h1 + i * h2 gives k independent-enough positions
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def has(self, positions):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def set(self, positions):
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class BloomSeenSet:
+    """Scalable Bloom filter with a bounded false-positive rate.
+
+    When the current stage is full a new one with twice the capacity and a
+    tighter error is added, so the overall false-positive rate stays under
+    `error` however many URLs arrive. A false positive means a new URL is
+    treated as seen and skipped; URLs are never crawled twice. The bit
+    arrays are saved to `path` on flush and reloaded on start.
+    """
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, path=None, capacity=None, error=None):
+        self.path = path
+        self.capacity = capacity or SEEN_CONFIG["bloom_capacity"]
+        self.error = error or SEEN_CONFIG["bloom_error"]
+        self.stages = []
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _new_stage(self):
+        n = len(self.stages)
+        # Stage errors form a geometric series summing to at most self.error
+        error = self.error * (1 - self.TIGHTENING) * self.TIGHTENING ** n
+        self.stages.append(_BloomStage(self.capacity * self.GROWTH ** n, error))
+
+    def add(self, key):
+        digest = _digest(key)
+        with self._lock:
+            for stage in self.stages:
+                if stage.has(stage.positions(digest)):
+                    return False
+            if not self.stages or self.stages[-1].count >= self.stages[-1].capacity:
+                self._new_stage()
+            stage = self.stages[-1]
+            stage.set(stage.positions(digest))
+            return True
+
+    def __contains__(self, key):
+        digest = _digest(key)
+        with self._lock:
+            return any(stage.has(stage.positions(digest)) for stage in self.stages)
+
+    def __len__(self):
+        return sum(stage.count for stage in self.stages)
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            header = json.loads(f.readline())
+            for meta in header["stages"]:
+                stage = _BloomStage(meta["capacity"], meta["error"], count=meta["count"])
+                stage.bits = bytearray(f.read(len(stage.bits)))
+                self.stages.append(stage)
+
+    def flush(self):
+        if not self.path:
+            return
+        with self._lock:
+            header = {"stages": [{"capacity": s.capacity, "error": s.error, "count": s.count}
+                                 for s in self.stages]}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                for stage in self.stages:
+                    f.write(stage.bits)
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        self.flush()
+
+
+class SqliteSeenSet:
+    """On-disk seen-set keyed by a 12-byte URL hash; exact and restart-safe
+
+    Inserts are committed every `batch` adds (sqlite_batch by default), or
+    only on flush with batch=0, so the stored set matches a checkpoint.
+    """
+
+    def __init__(self, path, batch=None):
+        self.path = path
+        self.batch = SEEN_CONFIG["sqlite_batch"] if batch is None else batch
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (hash BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._pending = 0
+
+    def add(self, key):
+        with self._lock:
+            cursor = self._db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (_digest(key, 12),))
+            self._pending += 1
+            if self.batch and self._pending >= self.batch:
+                self._db.commit()
+                self._pending = 0
+            return cursor.rowcount == 1
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM seen WHERE hash = ?", (_digest(key, 12),)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def flush(self):
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def make_seen_set(kind=None, path=None, reset=False, batch=None):
+    """Create the configured seen-set; `reset` discards what a previous run stored
+
+    `batch` is passed on to SqliteSeenSet.
+    """
+    kind = kind or SEEN_CONFIG["kind"]
+    if kind == "memory":
+        return MemorySeenSet()
+    if kind not in ("bloom", "sqlite"):
+        raise ValueError(f"Unknown seen-set kind: {kind}")
+    path = path or f"{SEEN_CONFIG['path']}.{kind}"
+    if reset:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return BloomSeenSet(path) if kind == "bloom" else SqliteSeenSet(path, batch)
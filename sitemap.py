@@ -0,0 +1,262 @@
+import queue
+import threading
+import zlib
+from urllib.parse import urlparse
+from xml.etree.ElementTree import XMLPullParser
+
+import fetcher
+from metrics import get_metrics
+from robots import get_robots
+
+# Configuration
+SITEMAP_CONFIG = {
+    "workers": 8,  # Child sitemaps downloaded in parallel
+    "queue_size": 10000,  # URL entries buffered between workers and the consumer
+    "delay": 1,  # Seconds between sitemap requests to the same host (or its robots.txt crawl-delay, if longer)
+    "chunk_size": 64 * 1024  # Bytes read from the network per step
+}
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _local(tag):
+    """Strip the XML namespace from a tag name"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _decompressed(chunks):
+    """Gunzip a byte stream on the fly if it starts with the gzip magic"""
+    inflater = None
+    for chunk in chunks:
+        if inflater is None:
+            if chunk[:2] != GZIP_MAGIC:
+                yield chunk
+                yield from chunks
+                return
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        yield inflater.decompress(chunk)
+    if inflater is not None:
+        yield inflater.flush()
+
+
+def iter_sitemap(sitemap_url, throttle=None):
+    """Stream-parse one sitemap or sitemap index.
+
+    Yields {"type": "url", "loc", "lastmod", "priority"} for <url> entries and
+    {"type": "sitemap", "loc", "lastmod"} for <sitemap> entries. Parsed
+    elements are discarded as soon as they are yielded, so memory stays flat
+    regardless of the file size. Retries of a failed download wait for
+    the host's turn on `throttle`.
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    chunks = fetcher.iter_content(sitemap_url, SITEMAP_CONFIG["chunk_size"], throttle)
+    for data in _decompressed(chunks):
+        parser.feed(data)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            tag = _local(elem.tag)
+            if tag not in ("url", "sitemap"):
+                continue
+            fields = {_local(child.tag): (child.text or "").strip() for child in elem}
+            entry = {"type": tag, "loc": fields.get("loc"), "lastmod": fields.get("lastmod")}
+            if tag == "url":
+                entry["priority"] = fields.get("priority")
+            root.clear()
+            yield entry
+    parser.close()
+
+
+def _wait(throttle, sitemap_url):
+    """Wait for the host's turn, spacing its requests by its robots.txt crawl-delay if longer"""
+    host = urlparse(sitemap_url).netloc
+    if host not in throttle.floors:
+        crawl_delay = get_robots().crawl_delay(sitemap_url) or 0
+        throttle.set_delay(host, max(crawl_delay, SITEMAP_CONFIG["delay"]))
+    throttle.wait(sitemap_url)
+
+
+def _walk(sitemap_url, throttle):
+    """Yield URL entries under one sitemap, descending into nested indexes"""
+    _wait(throttle, sitemap_url)
+    for entry in iter_sitemap(sitemap_url, throttle):
+        if entry["type"] == "url":
+            yield entry
+        elif entry["loc"]:
+            yield from _walk(entry["loc"], throttle)
+
+
+def iter_sitemap_urls(sitemap_url, workers=None, max_sitemaps=None, index=None):
+    """Yield every URL entry reachable from a sitemap or sitemap index.
+
+    The index is streamed by a feeder thread while `workers` threads expand
+    its child sitemaps concurrently. Both hand-offs go through bounded
+    queues, so a slow consumer pauses the downloads instead of piling up
+    entries in memory. `max_sitemaps` caps how many children are expanded.
+    `index` is an iterable of the entries of `sitemap_url` (e.g. one
+    already streaming it), so it is not downloaded again. The rest of the
+    index is still read once the cap is reached.
+    """
+    workers = workers or SITEMAP_CONFIG["workers"]
+    throttle = fetcher.HostThrottle(SITEMAP_CONFIG["delay"])
+    children = queue.Queue(maxsize=workers * 2)
+    entries = queue.Queue(maxsize=SITEMAP_CONFIG["queue_size"])
+    stop = threading.Event()
+    done = object()
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def feed():
+        expanded = 0
+        try:
+            if index is None:
+                _wait(throttle, sitemap_url)
+            for entry in iter_sitemap(sitemap_url, throttle) if index is None else index:
+                if entry["type"] == "url":
+                    if not put(entries, entry):
+                        return
+                elif entry["loc"]:
+                    if max_sitemaps is not None and expanded >= max_sitemaps:
+                        continue
+                    if not put(children, entry["loc"]):
+                        return
+                    expanded += 1
+        except Exception as e:
+            print(f"Error reading sitemap {sitemap_url}: {e}")
+        finally:
+            for _ in range(workers):
+                put(children, done)
+
+    def expand():
+        try:
+            while not stop.is_set():
+                try:
+                    child = children.get(timeout=0.5)
+                except queue.Empty:
+                    continue  # Checks stop: the consumer may have closed the generator
+                if child is done:
+                    return
+                try:
+                    for entry in _walk(child, throttle):
+                        if not put(entries, entry):
+                            return
+                except Exception as e:
+                    print(f"Error expanding sitemap {child}: {e}")
+        finally:
+            put(entries, done)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=expand, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        finished = 0
+        while finished < workers:
+            entry = entries.get()
+            if entry is done:
+                finished += 1
+            else:
+                yield entry
+    finally:
+        stop.set()
+
+
+def analyze_sitemap(sitemap_url, expand=False, max_sitemaps=None, writer=None, page_state=None):
+    """Analyze a sitemap and return its contents
+
+    The file is stream-parsed (gunzipping on the fly). With `expand`, the
+    children of a sitemap index are fetched in parallel and their URL
+    entries counted as well. With a crawl_output.CrawlWriter, every entry is
+    streamed to it and the analysis only keeps counts and samples. With an
+    incremental.PageState, the lastmod of every URL entry is stored in it.
+    """
+    metrics = get_metrics()
+    with metrics.timer("sitemap_seconds"):
+        analysis = _analyze_sitemap(sitemap_url, expand, max_sitemaps, writer, page_state)
+    if analysis["type"] == "error":
+        metrics.inc("sitemap_errors_total")
+    else:
+        metrics.inc("sitemap_entries_total", analysis["count"], type=analysis["type"])
+        metrics.inc("sitemap_entries_total", analysis.get("url_count", 0), type="expanded")
+    return analysis
+
+
+def _analyze_sitemap(sitemap_url, expand, max_sitemaps, writer, page_state):
+    try:
+        counts = {"url": 0, "sitemap": 0}
+        children = []  # Child sitemap URLs, listed in the analysis when there is no writer
+        sample_urls = []
+        failed = []
+
+        def index():
+            # Stream the sitemap itself, recording its child entries as they go by
+            try:
+                for entry in iter_sitemap(sitemap_url):
+                    if entry["type"] == "sitemap":
+                        counts["sitemap"] += 1
+                        if writer:
+                            writer.write_sitemap_entry(sitemap_url, entry)
+                        else:
+                            children.append(entry["loc"])
+                    yield entry
+            except Exception as e:
+                failed.append(e)
+                raise
+
+        def add_url(entry):
+            if writer:
+                writer.write_sitemap_entry(sitemap_url, entry)
+            if page_state:
+                page_state.note_lastmod(entry["loc"], entry.get("lastmod"))
+            counts["url"] += 1
+            if len(sample_urls) < 5:
+                sample_urls.append(entry["loc"])
+
+        if expand:
+            # The index is read once, by the feeder of iter_sitemap_urls; its own URL
+            # entries come back with those of its children
+            for entry in iter_sitemap_urls(sitemap_url, max_sitemaps=max_sitemaps, index=index()):
+                add_url(entry)
+            if failed:
+                raise failed[0]
+        else:
+            for entry in index():
+                if entry["type"] == "url":
+                    add_url(entry)
+        if page_state:
+            page_state.flush()
+
+        # Regular sitemap
+        if not counts["sitemap"]:
+            return {
+                "type": "sitemap",
+                "count": counts["url"],
+                "sample_urls": sample_urls
+            }
+
+        analysis = {
+            "type": "sitemap_index",
+            "count": counts["sitemap"]
+        }
+        if not writer:
+            analysis["sitemaps"] = children
+        if expand:
+            analysis["url_count"] = counts["url"]
+            analysis["sample_urls"] = sample_urls
+        return analysis
+    except Exception as e:
+        return {
+            "type": "error",
+            "error": str(e)
+        }
@@ -0,0 +1,128 @@
+import pytest
+
+import archive
+from archive import ARCHIVE_CONFIG, ArchiveReader, PageArchive, get_archive, segment_paths
+from crawl_output import CrawlWriter, read_ndjson
+from fetcher import FetchResult
+from reextract import headings_of, reextract, reextract_headings, titles_of
+from title_parser import parse_titles
+
+PAGE = "<html><head><title>Algebra</title></head><body><h1>Algebra</h1><h2>Unit 1</h2></body></html>"
+RENDERED = "<html><head><title>Algebra</title></head><body><h1>Algebra</h1><h2>Unit 1</h2><h2>Ünit 2</h2></body></html>"
+
+
+def response(url, html, status=200, **headers):
+    return FetchResult(url, status_code=status, content=html.encode("utf-8"), encoding="utf-8",
+                       headers={"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip", **headers})
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "pages.warc.gz"), str(tmp_path / "pages.idx.ndjson")
+
+
+def test_records_read_back_from_their_offsets(paths):
+    archive = PageArchive(*paths)
+    archive.write_response(response("https://example.com/a", PAGE, ETag='"v1"'))
+    archive.write_rendered("https://example.com/a", RENDERED)
+    archive.write_response(FetchResult("https://example.com/down", error=OSError("refused")))
+    archive.close()
+
+    reader = ArchiveReader(*paths)
+    first, second = reader.entries()
+    stored = reader.read(first["offset"], first["length"], first["file"])
+    assert stored["kind"] == "response" and stored["status"] == 200
+    assert stored["headers"]["ETag"] == '"v1"'
+    assert "Content-Encoding" not in stored["headers"]  # The body is stored decoded
+    assert stored["body"] == PAGE.encode("utf-8")
+    assert reader.html(second) == RENDERED
+    reader.close()
+
+
+def test_latest_prefers_the_rendered_dom(paths):
+    archive = PageArchive(*paths)
+    archive.write_response(response("https://example.com/a", PAGE))
+    archive.write_rendered("https://example.com/a", RENDERED)
+    archive.write_response(response("https://example.com/b", PAGE))
+    archive.close()
+
+    reader = ArchiveReader(*paths)
+    assert {(entry["url"], entry["kind"]) for entry in reader.latest()} == {
+        ("https://example.com/a", "rendered"), ("https://example.com/b", "response")}
+    assert {entry["kind"] for entry in reader.latest(("response",))} == {"response"}
+    reader.close()
+
+
+def test_a_record_cut_short_by_a_crash_is_skipped(paths):
+    archive = PageArchive(*paths)
+    archive.write_response(response("https://example.com/a", PAGE))
+    archive.write_response(response("https://example.com/b", PAGE))
+    archive.close()
+    with open(archive.segment, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 10)
+
+    reader = ArchiveReader(*paths)
+    assert [entry["url"] for entry in reader.entries()] == ["https://example.com/a"]
+    reader.close()
+
+
+def test_segments_rotate_by_size_and_run_and_old_ones_are_dropped(paths, monkeypatch):
+    monkeypatch.setitem(ARCHIVE_CONFIG, "max_bytes", 1)
+    monkeypatch.setitem(ARCHIVE_CONFIG, "max_segments", 3)
+    archive = PageArchive(*paths)
+    for i in range(3):
+        archive.write_response(response(f"https://example.com/{i}", PAGE))
+    archive.close()
+    first_run = segment_paths(paths[0])
+    assert len(first_run) == 3  # Every record fills a segment
+
+    archive = PageArchive(*paths)  # The next run starts a segment of its own
+    archive.write_response(response("https://example.com/3", PAGE))
+    archive.close()
+
+    assert segment_paths(paths[0]) == first_run[1:] + [archive.segment]
+    reader = ArchiveReader(*paths)
+    assert [entry["url"] for entry in reader.entries()] == [f"https://example.com/{i}" for i in (1, 2, 3)]
+    assert all(reader.html(entry) == PAGE for entry in reader.entries())
+    reader.close()
+
+
+def test_the_archive_is_off_unless_enabled(monkeypatch):
+    monkeypatch.setattr(archive, "_archive", None)
+    assert get_archive() is None
+    monkeypatch.setitem(ARCHIVE_CONFIG, "enabled", True)
+    assert isinstance(get_archive(), PageArchive)
+    get_archive().close()
+
+
+def test_reextract_gives_what_extraction_of_the_live_page_gave(paths):
+    archive = PageArchive(*paths)
+    archive.write_response(response("https://example.com/a", PAGE))
+    archive.write_response(response("https://example.com/b", RENDERED))
+    archive.write_response(response("https://example.com/missing", "<h1>Not found</h1>", status=404))
+    archive.close()
+
+    found = dict(reextract(titles_of, kinds=("response",), workers=2,
+                           archive_path=paths[0], index_path=paths[1]))
+
+    assert found == {"https://example.com/a": parse_titles(PAGE), "https://example.com/b": parse_titles(RENDERED)}
+
+
+def test_reextract_headings_rewrites_the_page_stream(paths, tmp_path, monkeypatch):
+    monkeypatch.setitem(ARCHIVE_CONFIG, "path", paths[0])
+    monkeypatch.setitem(ARCHIVE_CONFIG, "index_path", paths[1])
+    archive = PageArchive(*paths)
+    archive.write_response(response("https://example.com/a", PAGE))
+    archive.write_rendered("https://example.com/a", RENDERED)
+    archive.close()
+    writer = CrawlWriter(str(tmp_path))
+    writer.write_page("/math", "https://example.com/a", {}, title="")
+    writer.write_page("/math", "https://example.com/gone", {}, title="")
+    writer.close()
+
+    reextract_headings(writer.path("pages"))
+
+    first, second = read_ndjson(writer.path("pages"))
+    assert first == dict(first, **headings_of(RENDERED, "https://example.com/a"))
+    assert first["headings"]["h2"] == [{"text": "Unit 1", "level": 2}, {"text": "Ünit 2", "level": 2}]
+    assert second["headings"] == {}
@@ -0,0 +1,32 @@
+from checkpoint import CrawlCheckpoint
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    setup = {"sitemaps": ["https://example.com/sitemap.xml"], "allowed_paths": ["/math"]}
+    state = {"frontier": [{"url": "https://example.com/math", "depth": 0}], "offsets": {"pages": 120}}
+    CrawlCheckpoint(path, setup=setup).save(state)
+    loaded = CrawlCheckpoint.load(path)
+    assert loaded.setup == setup
+    assert loaded.state == state
+
+
+def test_save_keeps_the_last_state(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = CrawlCheckpoint(path, setup={"step": 1})
+    checkpoint.save({"pages": 1})
+    checkpoint.setup["step"] = 2
+    checkpoint.save()
+    loaded = CrawlCheckpoint.load(path)
+    assert loaded.setup == {"step": 2}
+    assert loaded.state == {"pages": 1}
+
+
+def test_missing_and_cleared(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    assert CrawlCheckpoint.load(path) is None
+    checkpoint = CrawlCheckpoint(path, interval=0)
+    assert checkpoint.due()
+    checkpoint.save({})
+    checkpoint.clear()
+    assert CrawlCheckpoint.load(path) is None
@@ -0,0 +1,138 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+import crawler
+import fetcher
+import robots
+from robots import ROBOTS_CONFIG
+
+ROBOTS_TXT = """User-agent: crawlerbot
+Disallow: /math
+
+User-agent: *
+Disallow: /science
+"""
+
+
+@pytest.fixture
+def fresh_robots(monkeypatch):
+    monkeypatch.setattr(robots, "_robots", None)
+    monkeypatch.setattr(fetcher, "_session", None, raising=False)
+    monkeypatch.setattr(fetcher, "_cache", None, raising=False)
+    monkeypatch.setitem(ROBOTS_CONFIG, "user_agent", ROBOTS_CONFIG["user_agent"])
+
+
+@pytest.fixture
+def extract_calls(monkeypatch):
+    """crawler.main replaced by a recorder, with CONFIG restored afterwards"""
+    calls = []
+    monkeypatch.setattr(crawler, "CONFIG", dict(crawler.CONFIG))
+    monkeypatch.setattr(crawler, "main", lambda *args: calls.append(args))
+    return calls
+
+
+def write_config(tmp_path, config, name="crawl.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps(config), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("setting, expected", [
+    ("fetcher.timeout=10", ("fetcher", "timeout", 10)),
+    ("robots.user_agent=crawlerbot", ("robots", "user_agent", "crawlerbot")),
+    ('crawler.seeds=["https://a.org"]', ("crawler", "seeds", ["https://a.org"])),
+    ("fetcher.adaptive=false", ("fetcher", "adaptive", False))
+])
+def test_parse_setting(setting, expected):
+    assert cli.parse_setting(setting) == expected
+
+
+def test_parse_setting_needs_a_module_and_a_key():
+    with pytest.raises(ValueError):
+        cli.parse_setting("timeout=10")
+
+
+def test_load_config_reads_json_and_toml(tmp_path):
+    toml = tmp_path / "crawl.toml"
+    toml.write_text('depth = 1\n[fetcher]\ntimeout = 10\n', encoding="utf-8")
+
+    assert cli.load_config(str(toml)) == {"depth": 1, "fetcher": {"timeout": 10}}
+    assert cli.load_config(write_config(tmp_path, {"depth": 1})) == {"depth": 1}
+
+
+def test_config_options_become_defaults_and_flags_win(tmp_path, extract_calls):
+    config = write_config(tmp_path, {"seeds": ["https://a.org"], "delay": 5, "crawler": {"parser": "lxml"}})
+
+    cli.main(["--config", config, "extract", "--delay", "2", "--resume"])
+
+    assert (crawler.CONFIG["seeds"], crawler.CONFIG["delay"], crawler.CONFIG["parser"]) == (["https://a.org"], 2, "lxml")
+    assert extract_calls[0][0] is True
+
+
+def test_set_overrides_the_config_file(tmp_path, extract_calls):
+    config = write_config(tmp_path, {"crawler": {"parser": "lxml"}})
+
+    cli.main(["--config", config, "--set", "crawler.parser=selectolax", "extract"])
+
+    assert crawler.CONFIG["parser"] == "selectolax"
+
+
+@pytest.mark.parametrize("argv", [["--set", "nosuchmodule.key=1", "extract"], ["--set", "crawler", "extract"]])
+def test_bad_settings_are_usage_errors(argv, extract_calls):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(argv)
+    assert exit_info.value.code == 2
+    assert not extract_calls
+
+
+def test_unknown_keys_are_rejected(extract_calls):
+    with pytest.raises(SystemExit, match="Unknown crawler setting"):
+        cli.main(["--set", "crawler.no_such_key=1", "extract"])
+
+
+def test_robots_command_uses_the_configured_user_agent(site, fresh_robots, tmp_path, capsys):
+    site.routes["/robots.txt"] = (200, {"Content-Type": "text/plain"}, ROBOTS_TXT)
+    config = write_config(tmp_path, {"seeds": [site.url("/")], "robots": {"user_agent": "crawlerbot"}})
+
+    cli.main(["--config", config, "robots", "--paths", "/math", "/science"])
+
+    out = capsys.readouterr().out
+    assert "❌ Disallowed: /math" in out
+    assert "✅ Allowed: /science" in out
+
+
+def test_report_without_results(capsys):
+    assert cli.main(["report", "--results", "missing.json"]) == 1
+    assert "not found" in capsys.readouterr().out
+
+
+def test_robots_and_sitemap_start_without_the_heavy_modules():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import sys, cli; cli.build_parser(); import robots, sitemap; "
+            "print(' '.join(m for m in ('selenium', 'aiohttp', 'asyncio', 'concurrent.futures', 'numpy', "
+            "'bs4', 'lxml', 'pyarrow', 'scrapper', 'crawler') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+
+    assert loaded.split() == []
+
+
+def test_unset_incremental_keeps_the_configured_default(tmp_path, extract_calls):
+    cli.main(["extract"])
+    cli.main(["extract", "--incremental"])
+
+    assert [incremental for _, incremental in extract_calls] == [None, True]
+
+
+def test_archive_flag_turns_the_archive_on(extract_calls, monkeypatch):
+    from archive import ARCHIVE_CONFIG
+    monkeypatch.setitem(ARCHIVE_CONFIG, "enabled", False)
+
+    cli.main(["extract"])
+    assert not ARCHIVE_CONFIG["enabled"]
+    cli.main(["extract", "--archive"])
+    assert ARCHIVE_CONFIG["enabled"]
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pyarrow.parquet as pq
+
+from crawl_output import OUTPUT_CONFIG, CrawlWriter, load_results, read_ndjson
+
+HEADINGS = {"h1": [{"text": "Algebra"}], "h2": [{"text": "Unit 1"}, {"text": "Unit 2"}]}
+
+
+def write_crawl(output_dir):
+    writer = CrawlWriter(str(output_dir))
+    writer.write_page("/math", "https://example.com/math", HEADINGS, depth=0)
+    writer.write_page("/science", "https://example.com/science", {"h1": [{"text": "Science"}]})
+    writer.write_sitemap_entry("https://example.com/sitemap.xml",
+                               {"type": "url", "loc": "https://example.com/a", "lastmod": "2024-01-01"})
+    return writer
+
+
+def test_pages_and_sitemap_entries_stream_to_ndjson(tmp_path):
+    writer = write_crawl(tmp_path / "out")
+    writer.close()
+
+    pages = list(read_ndjson(writer.path("pages")))
+    assert [(page["section"], page["url"]) for page in pages] == [
+        ("/math", "https://example.com/math"), ("/science", "https://example.com/science")]
+    assert pages[0]["headings"] == HEADINGS
+    assert pages[0]["depth"] == 0
+    assert list(read_ndjson(writer.path("sitemap_entries"))) == [
+        {"sitemap": "https://example.com/sitemap.xml", "type": "url",
+         "loc": "https://example.com/a", "lastmod": "2024-01-01"}]
+
+
+def test_read_ndjson_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "pages.ndjson"
+    path.write_text('{"url": "a"}\n{"url": "b"}\n{"url": "c', encoding="utf-8")
+
+    assert list(read_ndjson(str(path))) == [{"url": "a"}, {"url": "b"}]
+
+
+def test_manifest_points_at_the_streams_and_loads_back(tmp_path):
+    writer = write_crawl(tmp_path / "out")
+    writer.close()
+    manifest = tmp_path / "crawl_results.json"
+    writer.write_manifest(str(manifest), {"tested_paths": {"/math": "Allowed", "/art": "Allowed",
+                                                           "/science": "Disallowed"}})
+
+    assert json.loads(manifest.read_text())["files"]["pages"] == os.path.join("out", OUTPUT_CONFIG["pages_file"])
+    results = load_results(str(manifest))
+    assert results["extracted_headings"] == {
+        "/math": {"https://example.com/math": HEADINGS},
+        "/art": {},
+        "/science": {"https://example.com/science": {"h1": [{"text": "Science"}]}}
+    }
+
+
+def test_compact_writes_one_parquet_row_per_heading(tmp_path, monkeypatch):
+    monkeypatch.setitem(OUTPUT_CONFIG, "parquet_batch", 2)  # Several row groups
+    writer = write_crawl(tmp_path)
+    writer.close()
+
+    writer.compact()
+
+    pages = pq.read_table(str(tmp_path / writer.files["pages_parquet"])).to_pylist()
+    assert pages == [
+        {"section": "/math", "url": "https://example.com/math", "level": "h1", "text": "Algebra"},
+        {"section": "/math", "url": "https://example.com/math", "level": "h2", "text": "Unit 1"},
+        {"section": "/math", "url": "https://example.com/math", "level": "h2", "text": "Unit 2"},
+        {"section": "/science", "url": "https://example.com/science", "level": "h1", "text": "Science"}
+    ]
+    entries = pq.read_table(str(tmp_path / writer.files["sitemap_entries_parquet"])).to_pylist()
+    assert entries == [{"sitemap": "https://example.com/sitemap.xml", "type": "url",
+                        "loc": "https://example.com/a", "lastmod": "2024-01-01", "priority": None}]
+
+
+def test_append_truncates_the_streams_back_to_the_checkpointed_offsets(tmp_path):
+    writer = CrawlWriter(str(tmp_path))
+    writer.write_page("/math", "https://example.com/a", HEADINGS)
+    offsets = writer.offsets()
+    writer.write_page("/math", "https://example.com/b", HEADINGS)  # Written after the last checkpoint
+    writer.close()
+
+    writer = CrawlWriter(str(tmp_path), append=True, offsets=offsets)
+    writer.write_page("/math", "https://example.com/c", HEADINGS)
+    writer.close()
+
+    assert [page["url"] for page in read_ndjson(writer.path("pages"))] == [
+        "https://example.com/a", "https://example.com/c"]
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import archive
+import crawler
+import fetcher
+import metrics
+import robots
+import search_index
+from checkpoint import CrawlCheckpoint
+from crawler import extract_titles
+from fetcher import FETCH_CONFIG
+from pipeline import PIPELINE_CONFIG
+
+NAV_PAGE = """<html><body>
+<a data-test-id="nav-item" href="/math">Math</a>
+<a data-test-id="nav-item" href="/arts">Arts</a>
+<a data-test-id="nav-item" href="/math">Math</a>
+</body></html>"""
+
+
+def test_extract_titles_fetches_the_page_and_drops_duplicates(site):
+    site.routes["/"] = (200, {"Content-Type": "text/html; charset=utf-8"}, NAV_PAGE)
+
+    assert extract_titles(site.url("/")) == ["Math", "Arts"]
+
+
+def test_extract_titles_of_a_missing_page_is_empty(site):
+    assert extract_titles(site.url("/missing")) == []
+
+
+@pytest.fixture
+def crawl(site, monkeypatch):
+    """crawler.main against the test site, with fresh shared state and a kept checkpoint"""
+    shared = ((archive, "_archive"), (fetcher, "_cache"), (fetcher, "_session"),
+              (metrics, "_metrics"), (robots, "_robots"), (search_index, "_index"))
+    for module, name in shared:
+        monkeypatch.setattr(module, name, None)
+    monkeypatch.setitem(FETCH_CONFIG, "retries", 0)
+    monkeypatch.setitem(PIPELINE_CONFIG, "extract_workers", 0)
+    monkeypatch.setattr(crawler, "CONFIG", dict(crawler.CONFIG, seeds=[site.url("")], sections=["/math", "/science"],
+                                                delay=0, parser="html.parser"))
+    monkeypatch.setattr(CrawlCheckpoint, "clear", lambda self: None)  # Keep it, as an interrupted run would
+    site.routes["/"] = (200, {}, NAV_PAGE)
+    site.routes["/math"] = (200, {}, "<h1>Algebra</h1>")
+
+    def run(resume=False):
+        for module, name in shared:
+            setattr(module, name, None)  # A new process each run; main closes the index and metrics
+        site.requests.clear()
+        crawler.main(resume)
+        return CrawlCheckpoint.load(crawler.CONFIG["checkpoint"]).state["titles"]
+    return run
+
+
+def test_failed_pages_are_not_checkpointed_and_resume_retries_them(site, crawl):
+    site.routes["/science"] = (500, {}, "down")
+
+    titles = crawl()
+
+    assert titles == {site.url(""): ["Math", "Arts"], site.url("/math"): ["Algebra"]}
+    site.routes["/science"] = (200, {}, "<h1>Physics</h1>")
+    titles = crawl(resume=True)
+    assert [path for path in site.paths() if path in ("/", "/math", "/science")] == ["/science"]
+    assert titles[site.url("/science")] == ["Physics"]
+    assert json.load(open("extracted_titles.json", encoding="utf-8")) == ["Math", "Arts", "Algebra", "Physics"]
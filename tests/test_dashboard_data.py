@@ -0,0 +1,25 @@
+import json
+import os
+
+from dashboard_data import results_version
+
+
+def test_results_version_follows_the_page_stream_named_in_the_manifest(tmp_path):
+    os.makedirs(tmp_path / "out")
+    pages = tmp_path / "out" / "run1_pages.ndjson"
+    pages.write_text("")
+    manifest = tmp_path / "crawl_results.json"
+    manifest.write_text(json.dumps({"files": {"pages": os.path.join("out", "run1_pages.ndjson")}}))
+    before = results_version(str(manifest))
+
+    os.utime(pages, ns=(0, before[0] + 10**9))
+
+    after = results_version(str(manifest))
+    assert len(before) == 2 and after[0] == before[0] and after[1] != before[1]
+
+
+def test_results_version_of_a_manifest_without_a_page_stream(tmp_path):
+    manifest = tmp_path / "crawl_results.json"
+    manifest.write_text(json.dumps({"extracted_headings": {}}))
+
+    assert results_version(str(manifest)) == (os.stat(manifest).st_mtime_ns,)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from dedup import MinHasher, NearDuplicates, heading_text, shingles
+
+TEXT = ("Introduction to fractions and decimals for middle school students with worked examples "
+        "practice problems and quizzes covering addition subtraction multiplication and division "
+        "then ratios percentages and proportions with a unit test at the end of every chapter "
+        "plus hints and step by step videos")
+
+
+def test_shingles():
+    assert shingles("One two three four", 3) == {"one two three", "two three four"}
+    assert shingles("Just two", 3) == {"just two"}
+    assert shingles("", 3) == set()
+
+
+def test_heading_text():
+    assert heading_text({"h1": [{"text": "A"}], "h2": [{"text": "B"}, {"text": "C"}]}) == "A\nB\nC"
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(permutations=256, seed=7)
+    a = {f"feature {i}" for i in range(300)}
+    b = {f"feature {i}" for i in range(100, 400)}  # Jaccard 200 / 400 = 0.5
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+    assert abs(estimate - 0.5) < 0.1
+    assert (hasher.signature(a) == hasher.signature(set(a))).all()
+
+
+def test_minhash_is_deterministic_per_seed():
+    features = shingles(TEXT)
+    assert np.array_equal(MinHasher(seed=1).signature(features), MinHasher(seed=1).signature(features))
+    assert not np.array_equal(MinHasher(seed=1).signature(features), MinHasher(seed=2).signature(features))
+
+
+def test_near_duplicates_are_flagged():
+    detector = NearDuplicates()
+    assert detector.check("https://example.com/a", TEXT) is None
+    duplicate_url, similarity = detector.check("https://example.com/copy", TEXT)
+    assert (duplicate_url, similarity) == ("https://example.com/a", 1.0)
+    # One word changed out of 45 keeps most shingles
+    edited = TEXT.replace("quizzes", "tests")
+    assert detector.check("https://example.com/edited", edited)[0] == "https://example.com/a"
+    assert detector.check("https://example.com/other", "Cell biology genetics evolution ecology "
+                          "and the chemistry of life explained with diagrams and short videos") is None
+    assert detector.counts() == {"unique_pages": 2, "duplicate_pages": 2}
+
+
+def test_short_pages_are_never_flagged():
+    detector = NearDuplicates()
+    assert detector.check("https://example.com/a", "Math") is None
+    assert detector.check("https://example.com/b", "Math") is None
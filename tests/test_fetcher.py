@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fetcher import (FETCH_CONFIG, FetchError, FetchResult, HostThrottle, TokenBucket, fetch_many, fetch_url, get,
+                     iter_content)
+
+
+def test_token_bucket_allows_a_burst_then_spaces_requests():
+    async def timed(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(timed(TokenBucket(rate=10, capacity=3), 3)) < 0.05
+    assert asyncio.run(timed(TokenBucket(rate=10, capacity=1), 3)) >= 0.18
+
+
+def test_fetch_many_returns_results_in_input_order(site):
+    for name in ("a", "b", "c"):
+        site.routes[f"/{name}"] = (200, {"Content-Type": "text/html; charset=utf-8"}, f"<p>{name}</p>")
+    urls = [site.url(f"/{name}") for name in ("c", "a", "b")]
+
+    results = fetch_many(urls, delay=0)
+
+    assert [result.url for result in results] == urls
+    assert [result.text for result in results] == ["<p>c</p>", "<p>a</p>", "<p>b</p>"]
+    assert all(result.ok and result.status_code == 200 for result in results)
+
+
+def test_requests_to_one_host_are_spaced_but_hosts_run_in_parallel(site):
+    site.routes["/page"] = (200, {}, "ok")
+    urls = [site.url("/page", host) for host in ("127.0.0.1", "localhost") for _ in range(3)]
+
+    start = time.monotonic()
+    fetch_many(urls, delay=0.2)
+    elapsed = time.monotonic() - start
+
+    by_host = {}
+    for _, headers, at in site.requests:
+        by_host.setdefault(headers["Host"].split(":")[0], []).append(at)
+    for times in by_host.values():
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        assert min(gaps) >= 0.15
+    assert elapsed < 0.8  # Two hosts of three requests each, not six in a row
+
+
+def test_connection_errors_become_failed_results(site, monkeypatch):
+    monkeypatch.setitem(FETCH_CONFIG, "retries", 0)
+    url = site.url("/page")
+    site.close()
+
+    result = fetch_url(url)
+
+    assert not result.ok
+    assert result.error is not None
+    with pytest.raises(FetchError):
+        result.raise_for_status()
+
+
+def test_raise_for_status():
+    FetchResult("http://example.com/", status_code=200).raise_for_status()
+    for result in (FetchResult("http://example.com/", status_code=404), FetchResult("http://example.com/")):
+        with pytest.raises(FetchError):
+            result.raise_for_status()
+
+
+def test_a_slow_on_result_does_not_stall_the_event_loop(site):
+    site.routes["/page"] = (200, {}, "ok")
+    loop_thread = threading.current_thread()
+    handled = []
+
+    def on_result(result):
+        handled.append(threading.current_thread())
+        if len(handled) == 1:
+            time.sleep(0.6)  # E.g. a full extraction queue
+
+    fetch_many([site.url("/page")] * 2, on_result=on_result, delay=0.2, adaptive=False)
+
+    first, second = (at for _, _, at in site.requests)
+    assert second - first < 0.5  # The second request kept its slot instead of waiting for the callback
+    assert len(handled) == 2 and loop_thread not in handled
+
+
+@pytest.fixture
+def fresh_fetcher(monkeypatch):
+    """A new session and an empty cache in the test's directory"""
+    import fetcher
+    monkeypatch.setattr(fetcher, "_session", None, raising=False)
+    monkeypatch.setattr(fetcher, "_cache", None, raising=False)
+    monkeypatch.setitem(FETCH_CONFIG, "backoff", 0.01)
+
+
+def etag_route(body):
+    """200 with an ETag, or 304 when the client already has it"""
+    def route(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"', "Content-Type": "text/html; charset=utf-8"}, body
+    return route
+
+
+def test_get_retries_failed_statuses(site, fresh_fetcher):
+    site.routes["/flaky"] = [(503, {"Retry-After": "0"}, "busy"), (200, {}, "done")]
+
+    result = get(site.url("/flaky"))
+
+    assert result.status_code == 200
+    assert result.text == "done"
+    assert site.paths() == ["/flaky", "/flaky"]
+
+
+def test_get_retries_wait_for_the_host_throttle_which_slows_down(site, fresh_fetcher, monkeypatch):
+    monkeypatch.setitem(FETCH_CONFIG, "min_delay", 0.1)
+    site.routes["/busy"] = [(429, {"Retry-After": "0"}, "slow down"), (200, {}, "done")]
+    url = site.url("/busy")
+    throttle = HostThrottle(0.2)
+    throttle.wait(url)
+
+    result = get(url, throttle=throttle)
+
+    (_, _, first), (_, _, second) = site.requests
+    assert result.status_code == 200
+    assert second - first >= 0.35  # The 429 doubled the host's 0.2s delay
+    assert throttle.delays[f"127.0.0.1:{site.port}"] > 0.2
+
+
+def test_iter_content_retries_failed_statuses_before_the_body(site, fresh_fetcher):
+    site.routes["/flaky"] = [(503, {"Retry-After": "0"}, "busy"), (200, {}, "done")]
+
+    assert b"".join(iter_content(site.url("/flaky"))) == b"done"
+    assert site.paths() == ["/flaky", "/flaky"]
+
+
+def test_engine_retries_failed_statuses(site, fresh_fetcher):
+    site.routes["/flaky"] = [(503, {"Retry-After": "0"}, "busy"), (200, {}, "done")]
+
+    result = fetch_url(site.url("/flaky"), delay=0)
+
+    assert result.status_code == 200
+    assert site.paths() == ["/flaky", "/flaky"]
+
+
+@pytest.mark.parametrize("fetch", [get, lambda url: fetch_url(url, delay=0)], ids=["get", "engine"])
+def test_recrawl_is_a_conditional_get_answered_from_the_cache(site, fresh_fetcher, fetch):
+    site.routes["/page"] = etag_route("<h1>Cached</h1>")
+
+    first = fetch(site.url("/page"))
+    second = fetch(site.url("/page"))
+
+    assert (first.status_code, first.from_cache) == (200, False)
+    assert (second.status_code, second.from_cache) == (304, True)
+    assert second.text == first.text == "<h1>Cached</h1>"
+    assert "If-None-Match" not in site.requests[0][1]
+    assert site.requests[1][1]["If-None-Match"] == '"v1"'
+
+
+@pytest.mark.parametrize("fetch", [get, lambda url: fetch_url(url, delay=0)], ids=["get", "engine"])
+def test_a_304_without_a_stored_body_is_fetched_again(site, fresh_fetcher, fetch):
+    site.routes["/page"] = [(304, {}, ""), (200, {"ETag": '"v2"'}, "<h1>Fresh</h1>")]
+
+    result = fetch(site.url("/page"))
+
+    assert (result.status_code, result.from_cache, result.text) == (200, False, "<h1>Fresh</h1>")
+    assert site.paths() == ["/page", "/page"]
+    assert fetch(site.url("/page")).text == "<h1>Fresh</h1>"  # Stored for the next re-crawl
+
+
+def test_unconditional_get_skips_the_cache(site, fresh_fetcher):
+    site.routes["/page"] = etag_route("<h1>Fresh</h1>")
+
+    get(site.url("/page"))
+    result = get(site.url("/page"), conditional=False)
+
+    assert (result.status_code, result.from_cache) == (200, False)
+    assert "If-None-Match" not in site.requests[1][1]
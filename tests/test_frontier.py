@@ -0,0 +1,27 @@
+import pytest
+
+from frontier import Frontier, canonicalize
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM:443/Math/", "https://example.com/Math"),
+    ("http://example.com:80", "http://example.com/"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com/a#section", "https://example.com/a"),
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?utm_source=x&gclid=y&id=3", "https://example.com/a?id=3"),
+    ("https://example.com/a?q=", "https://example.com/a?q="),
+    ("https://example.com/a?foo&b=x%20y&a=1+2", "https://example.com/a?a=1+2&b=x%20y&foo"),
+    ("https://example.com/a?b=2&&UTM_Medium=x&a=", "https://example.com/a?a=&b=2"),
+    ("https://user:pw@Example.com:443/a", "https://user:pw@example.com/a"),
+    ("  https://example.com/a  ", "https://example.com/a"),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+def test_frontier_dedups_canonical_urls():
+    frontier = Frontier()
+    assert frontier.push("https://example.com/a/", 0)
+    assert not frontier.push("https://EXAMPLE.com/a?utm_medium=mail", 1)
+    assert len(frontier) == 1
@@ -0,0 +1,141 @@
+import pytest
+
+import archive
+import fetcher
+import metrics
+import robots
+import scrapper
+import search_index
+from driver_pool import DriverPool
+from fetcher import FETCH_CONFIG
+from hybrid import HYBRID_CONFIG, HybridFetcher, is_sufficient, path_prefix, static_extract
+from pipeline import PIPELINE_CONFIG
+from title_parser import BACKENDS
+
+RICH_PAGE = """<!DOCTYPE html>
+<html lang="en"><head><title> Algebra </title>
+<meta name="description" content="Learn algebra"><meta property="og:type" content="website"></head>
+<body>
+<h1>Algebra <b>basics</b></h1><h2>Unit 1</h2><h3>Lesson</h3><h2>  </h2>
+<a href="/math/a">a</a><a href="b">b</a><a href="https://other.org/c">c</a><a href="/d">d</a><a href="/e">e</a>
+<a>no href</a>
+</body></html>"""
+
+EMPTY_SHELL = '<html><head><title>App</title></head><body><div id="root"></div></body></html>'
+
+
+@pytest.fixture
+def thresholds(monkeypatch):
+    monkeypatch.setitem(HYBRID_CONFIG, "min_samples", 3)
+    monkeypatch.setitem(HYBRID_CONFIG, "browser_ratio", 0.8)
+    monkeypatch.setitem(HYBRID_CONFIG, "prefix_depth", 2)
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_static_extract_reads_server_rendered_html(backend):
+    page = static_extract(RICH_PAGE, "https://example.com/math/algebra/", backend)
+
+    assert page["title"] == "Algebra"
+    assert page["lang"] == "en"
+    assert page["meta"] == {"description": "Learn algebra", "og:type": "website"}
+    assert page["headings"] == [{"level": 1, "text": "Algebra basics"}, {"level": 2, "text": "Unit 1"},
+                                {"level": 3, "text": "Lesson"}]
+    assert page["links"] == ["https://example.com/math/a", "https://example.com/math/algebra/b",
+                             "https://other.org/c", "https://example.com/d", "https://example.com/e"]
+    assert is_sufficient(page)
+
+
+def test_a_client_rendered_shell_is_not_sufficient():
+    assert not is_sufficient(static_extract(EMPTY_SHELL, "https://example.com/app"))
+
+
+def test_path_prefix_groups_by_host_and_leading_segments(thresholds):
+    assert path_prefix("https://example.com/math/algebra/unit-1?x=1") == "example.com/math/algebra"
+    assert path_prefix("https://example.com/") == "example.com/"
+
+
+def test_prefixes_that_keep_failing_go_to_the_browser(thresholds, tmp_path):
+    hybrid = HybridFetcher(str(tmp_path / "decisions.json"))
+    url = "https://example.com/app/page/1"
+
+    for _ in range(2):
+        hybrid.record(url, sufficient=False)
+    assert not hybrid.needs_browser(url)  # Too few samples yet
+    hybrid.record(url, sufficient=False)
+    assert hybrid.needs_browser(url)
+    assert not hybrid.needs_browser("https://example.com/math/page/1")
+
+
+def test_mixed_results_stay_static(thresholds, tmp_path):
+    hybrid = HybridFetcher(str(tmp_path / "decisions.json"))
+    url = "https://example.com/math/page/1"
+
+    for sufficient in (True, False, False, True):
+        hybrid.record(url, sufficient)
+
+    assert not hybrid.needs_browser(url)
+
+
+def test_decisions_survive_a_restart(thresholds, tmp_path):
+    path = str(tmp_path / "decisions.json")
+    hybrid = HybridFetcher(path)
+    for _ in range(3):
+        hybrid.record("https://example.com/app/page/x", sufficient=False)
+    hybrid.save()
+
+    assert HybridFetcher(path).needs_browser("https://example.com/app/page/y")
+
+
+def test_accept_returns_sufficient_pages_and_learns_from_the_rest(thresholds, site, tmp_path):
+    site.routes["/math/page/1"] = (200, {"Content-Type": "text/html"}, RICH_PAGE)
+    site.routes["/app/page/1"] = (200, {"Content-Type": "text/html"}, EMPTY_SHELL)
+    hybrid = HybridFetcher(str(tmp_path / "decisions.json"))
+
+    def fetch(path):
+        response = hybrid.download(site.url(path))
+        return hybrid.accept(response.url, static_extract(response.text, response.url))
+
+    assert fetch("/math/page/1")["title"] == "Algebra"
+    assert fetch("/app/page/1") is None
+    assert hybrid.decisions == {f"127.0.0.1:{site.port}/math/page": [1, 0],
+                                f"127.0.0.1:{site.port}/app/page": [0, 1]}
+
+
+def test_download_reports_responses_to_the_throttle(site, tmp_path):
+    site.routes["/page"] = (200, {}, "ok")
+    recorded = []
+
+    class Throttle:
+        def record(self, result):
+            recorded.append(result.status_code)
+
+    HybridFetcher(str(tmp_path / "decisions.json"), throttle=Throttle()).download(site.url("/page"))
+
+    assert recorded == [200]
+
+
+def test_only_insufficient_pages_go_to_the_browser(site, monkeypatch):
+    for module, name in ((archive, "_archive"), (fetcher, "_cache"), (fetcher, "_session"),
+                         (metrics, "_metrics"), (robots, "_robots"), (search_index, "_index")):
+        monkeypatch.setattr(module, name, None)
+    monkeypatch.setitem(FETCH_CONFIG, "retries", 0)
+    monkeypatch.setitem(PIPELINE_CONFIG, "extract_workers", 0)
+    monkeypatch.setattr(scrapper, "CRAWL_DELAY", 0)
+    site.routes["/math"] = (500, {}, RICH_PAGE)
+    site.routes["/science"] = (200, {}, EMPTY_SHELL)
+    rendered = []
+
+    class Driver:
+        def get(self, url):
+            rendered.append(url)
+            raise RuntimeError("no browser here")
+
+        def quit(self):
+            pass
+
+    stats = {}
+    scrapper.crawl_sections(site.url("/"), ["/math", "/science"], max_depth=0,
+                            pool=DriverPool(Driver, size=1), stats=stats)
+
+    assert rendered == [site.url("/science")]
+    assert stats["static_pages"] == stats["browser_pages"] == 1
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from incremental import PageState, content_diff, content_hash
+
+PAGE = {"title": "Algebra", "headings": [{"level": 1, "text": "Algebra"}, {"level": 2, "text": "Unit 1"}]}
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = PageState(str(tmp_path / "state.sqlite"))
+    yield state
+    state.close()
+
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+
+def test_content_diff_lists_added_and_removed_items():
+    new = {"title": "Algebra I", "headings": [{"level": 1, "text": "Algebra"}, {"level": 2, "text": "Unit 2"}]}
+
+    assert content_diff(PAGE, new) == {
+        "headings": {"added": ["h2 Unit 2"], "removed": ["h2 Unit 1"]},
+        "title": {"old": "Algebra", "new": "Algebra I"}
+    }
+    assert content_diff(PAGE, dict(PAGE)) == {}
+
+
+def test_update_classifies_new_unchanged_and_changed_pages(state):
+    state.update("https://example.com/a", PAGE, ["https://example.com/b"], "2024-01-01")
+    state.update("https://example.com/a", PAGE, ["https://example.com/b"], "2024-01-01")
+    state.update("https://example.com/a/", dict(PAGE, title="Algebra I"), [], "2024-02-01")
+
+    assert state.counts() == {"new": 1, "changed": 1, "unchanged": 1, "skipped": 0}
+    assert state.changes["changed"] == [{"url": "https://example.com/a/",
+                                         "diff": {"title": {"old": "Algebra", "new": "Algebra I"}}}]
+    assert state.previous("https://example.com/a") == (dict(PAGE, title="Algebra I"), [], "2024-02-01")
+
+
+def test_unchanged_reuses_pages_whose_lastmod_has_not_moved(state):
+    state.update("https://example.com/a", PAGE, ["https://example.com/b"], "2024-01-01T00:00:00+00:00")
+
+    assert state.unchanged("https://example.com/a", "2024-01-01") == (PAGE, ["https://example.com/b"])
+    assert state.unchanged("https://example.com/a", "2024-03-01") is None  # Newer in the sitemap
+    assert state.unchanged("https://example.com/a", None) is None
+    assert state.unchanged("https://example.com/new", "2024-01-01") is None
+    assert state.counts()["skipped"] == 1
+
+
+def test_pages_crawled_without_a_lastmod_are_always_fetched(state):
+    state.update("https://example.com/a", PAGE)
+
+    assert state.unchanged("https://example.com/a", "2024-01-01") is None
+
+
+def test_sitemap_lastmods_are_kept_by_canonical_url(state):
+    state.note_lastmod("HTTPS://Example.com/a#top", "2024-01-01")
+    state.note_lastmod("https://example.com/b", None)
+    state.flush()
+
+    assert state.lastmod("https://example.com/a") == "2024-01-01"
+    assert state.lastmod("https://example.com/b") is None
+
+
+def test_state_persists_between_runs(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    state = PageState(path)
+    state.update("https://example.com/a", PAGE, [], "2024-01-01")
+    state.close()
+
+    state = PageState(path)
+    state.update("https://example.com/a", PAGE, [], "2024-01-01")
+    assert state.counts()["unchanged"] == 1
+    state.close()
+
+
+def test_write_diff_lists_new_and_changed_pages(state, tmp_path):
+    state.update("https://example.com/a", PAGE)
+    state.update("https://example.com/a", dict(PAGE, title="Algebra I"))
+    state.update("https://example.com/b", PAGE)
+
+    diff = json.loads(open(state.write_diff(str(tmp_path / "diff.json")), encoding="utf-8").read())
+
+    assert diff["counts"] == {"new": 2, "changed": 1, "unchanged": 0, "skipped": 0}
+    assert diff["new"] == ["https://example.com/a", "https://example.com/b"]
+    assert [change["url"] for change in diff["changed"]] == ["https://example.com/a"]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import linkgraph
+from linkgraph import LinkGraph
+
+
+def dense_pagerank(edges, n, damping=0.85, iterations=200):
+    # Reference implementation on a dense matrix, dangling nodes spread evenly
+    matrix = np.zeros((n, n))
+    for source, target in set(edges):
+        if source != target:
+            matrix[target, source] = 1
+    out_degree = matrix.sum(axis=0)
+    scores = np.full(n, 1 / n)
+    for _ in range(iterations):
+        spread = matrix @ np.divide(scores, out_degree, out=np.zeros(n), where=out_degree > 0)
+        scores = damping * spread + (1 - damping + damping * scores[out_degree == 0].sum()) / n
+    return scores
+
+
+def graph_from(edges, n):
+    graph = LinkGraph()
+    for node in range(n):
+        graph.add_page(f"https://example.com/{node}", "/s",
+                       [f"https://example.com/{target}" for source, target in edges if source == node])
+    return graph
+
+
+def test_csr_drops_duplicates_and_self_links():
+    graph = LinkGraph()
+    graph.add_page("https://example.com/a", "/s", ["https://example.com/b", "https://example.com/b/",
+                                                  "https://example.com/a", "https://example.com/c"])
+    indptr, indices = graph.csr()
+    assert len(graph) == 3
+    assert graph.edge_count() == 2
+    assert indices[indptr[0]:indptr[1]].tolist() == [1, 2]
+    assert graph.in_degree().tolist() == [0, 1, 1]
+
+
+@pytest.mark.parametrize("use_scipy", [True, False])
+def test_pagerank_matches_dense_reference(monkeypatch, use_scipy):
+    if use_scipy and linkgraph.sparse is None:
+        pytest.skip("scipy is not installed")
+    if not use_scipy:
+        monkeypatch.setattr(linkgraph, "sparse", None)
+    rng = np.random.default_rng(3)
+    n = 40
+    edges = [tuple(edge) for edge in rng.integers(0, n, (150, 2)).tolist()]
+    graph = graph_from(edges, n)
+    scores = graph.pagerank(tolerance=1e-12, max_iterations=500)
+    assert scores.sum() == pytest.approx(1.0)
+    # Ids are interned in order of first sight, not by node number
+    by_node = [scores[graph.ids[f"https://example.com/{node}"]] for node in range(n)]
+    assert np.allclose(by_node, dense_pagerank(edges, n), atol=1e-9)
+
+
+def test_pagerank_ranks_hubs_first():
+    edges = [(node, 0) for node in range(1, 6)] + [(0, 1)]
+    graph = graph_from(edges, 6)
+    scores = graph.pagerank()
+    assert int(np.argmax(scores)) == 0
+    assert graph.rank("https://example.com/0") > 1 > graph.rank("https://example.com/5")
+    assert graph.rank("https://EXAMPLE.com/0/") == graph.rank("https://example.com/0")
+    assert graph.rank("https://example.com/unknown") == 0.0
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "graph.npz")
+    graph = graph_from([(0, 1), (1, 2), (2, 0)], 3)
+    graph.add_page("https://example.com/other", "/t", ["https://example.com/0"])
+    graph.save(path)
+    loaded = LinkGraph.load(path)
+    assert loaded.urls == graph.urls
+    assert loaded.sections == ["/s", "/t"]
+    assert loaded.edge_count() == graph.edge_count() == 4
+    assert np.allclose(loaded.pagerank(), graph.pagerank())
+    sections, counts = loaded.section_matrix()
+    assert sections == ["/s", "/t"]
+    assert counts.tolist() == [[3, 0], [1, 0]]
@@ -0,0 +1,90 @@
+import json
+import urllib.request
+
+import pytest
+
+from metrics import METRICS_CONFIG, JsonlSink, Metrics, PrometheusSink, StatsSink
+
+
+@pytest.fixture
+def stats():
+    return StatsSink(buckets=(0.1, 1))
+
+
+def test_stats_sink_aggregates_counters_gauges_and_histograms(stats):
+    metrics = Metrics([stats])
+    metrics.inc("fetch_responses_total", host="a.org", status=200)
+    metrics.inc("fetch_responses_total", 2, status=200, host="a.org")
+    metrics.set("queue_depth", 5, queue="extract")
+    metrics.set("queue_depth", 3, queue="extract")
+    for seconds in (0.05, 0.5, 2):
+        metrics.observe("fetch_seconds", seconds)
+
+    assert metrics.snapshot() == {
+        "counters": {'fetch_responses_total{host="a.org",status="200"}': 3},
+        "gauges": {'queue_depth{queue="extract"}': 3},
+        "histograms": {"fetch_seconds": {"count": 3, "sum": 2.55, "avg": 0.85}}
+    }
+
+
+def test_timer_observes_the_block_even_when_it_raises(stats):
+    metrics = Metrics([stats])
+    with pytest.raises(ValueError):
+        with metrics.timer("parse_seconds", extractor="titles"):
+            raise ValueError
+
+    assert metrics.snapshot()["histograms"]['parse_seconds{extractor="titles"}']["count"] == 1
+
+
+def test_render_prometheus(stats):
+    metrics = Metrics([stats])
+    metrics.inc("pages_total", section="/math")
+    metrics.observe("fetch_seconds", 0.5)
+
+    assert stats.render_prometheus(prefix="crawler_").splitlines() == [
+        "# TYPE crawler_pages_total counter",
+        'crawler_pages_total{section="/math"} 1',
+        "# TYPE crawler_fetch_seconds histogram",
+        'crawler_fetch_seconds_bucket{le="0.1"} 0',
+        'crawler_fetch_seconds_bucket{le="1"} 1',
+        'crawler_fetch_seconds_bucket{le="+Inf"} 1',
+        "crawler_fetch_seconds_sum 0.5",
+        "crawler_fetch_seconds_count 1"
+    ]
+
+
+def test_jsonl_sink_writes_one_line_per_value(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    metrics = Metrics([JsonlSink(str(path))])
+    metrics.inc("pages_total", section="/math")
+    metrics.observe("fetch_seconds", 0.25)
+    metrics.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["kind"], r["name"], r["value"], r["labels"]) for r in records] == [
+        ("counter", "pages_total", 1, {"section": "/math"}), ("histogram", "fetch_seconds", 0.25, {})]
+
+
+def test_prometheus_sink_serves_metrics():
+    sink = PrometheusSink(host="127.0.0.1", port=0)
+    metrics = Metrics([sink])
+    metrics.inc("pages_total")
+    host, port = sink.server.server_address
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            body = response.read().decode("utf-8")
+    finally:
+        metrics.close()
+
+    assert f"{METRICS_CONFIG['prefix']}pages_total 1" in body.splitlines()
+    assert metrics.stats is sink.stats
+
+
+def test_without_sinks_nothing_is_recorded():
+    metrics = Metrics()
+    metrics.inc("pages_total")
+    with metrics.timer("fetch_seconds"):
+        pass
+
+    assert metrics.stats is None
+    assert metrics.snapshot() == {}
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from pipeline import PIPELINE_CONFIG, ExtractionPipeline
+
+
+def shout(html, suffix=""):
+    if "fail" in html:
+        raise ValueError("cannot parse")
+    return html.upper() + suffix
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setitem(PIPELINE_CONFIG, "report_interval", 0)
+
+
+def run(workers, pages, **options):
+    written = {}
+
+    def write(meta, result):
+        written[meta] = result
+
+    with ExtractionPipeline(shout, write, workers=workers, **options) as pipeline:
+        for meta, html in pages.items():
+            pipeline.submit(meta, html.encode("utf-8"), "utf-8", args=("!",))
+    return written, pipeline.counters()
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_every_submitted_page_is_extracted_and_written(workers):
+    pages = {f"page-{i}": f"<h1>{i}</h1>" for i in range(20)}
+
+    written, counters = run(workers, pages)
+
+    assert written == {meta: html.upper() + "!" for meta, html in pages.items()}
+    assert counters["fetch"]["items"] == counters["extract"]["items"] == counters["write"]["items"] == 20
+    assert counters["in_flight"] == 0 and counters["queued"] == 0
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_failed_extractions_are_written_as_none(workers):
+    written, counters = run(workers, {"good": "<p>ok</p>", "bad": "<p>fail</p>"})
+
+    assert written == {"good": "<P>OK</P>!", "bad": None}
+    assert counters["extract"]["errors"] == 1
+
+
+def test_skipped_pages_go_straight_to_the_writer():
+    written = {}
+    with ExtractionPipeline(shout, written.__setitem__, workers=0) as pipeline:
+        pipeline.skip("cached", "REUSED")
+        pipeline.submit("fresh", b"<p>new</p>")
+
+    assert written == {"cached": "REUSED", "fresh": "<P>NEW</P>"}
+    assert pipeline.counters()["extract"]["items"] == 1
+
+
+def test_a_failing_writer_does_not_stop_the_pipeline():
+    def write(meta, result):
+        if meta == 0:
+            raise OSError("disk full")
+        written.append(meta)
+
+    written = []
+    with ExtractionPipeline(shout, write, workers=0) as pipeline:
+        for meta in range(3):
+            pipeline.submit(meta, b"x")
+
+    assert written == [1, 2]
+    assert pipeline.counters()["write"]["errors"] == 1
+
+
+def test_in_flight_pages_are_bounded():
+    release = threading.Event()
+    seen = []
+
+    def write(meta, result):
+        seen.append(meta)
+        release.wait(5)
+
+    pipeline = ExtractionPipeline(shout, write, workers=0, queue_size=1, in_flight=2)
+    submitter = threading.Thread(target=lambda: [pipeline.submit(i, b"x") for i in range(10)])
+    submitter.start()
+    submitter.join(0.5)
+
+    assert submitter.is_alive()  # Blocked: the writer holds everything up
+    assert pipeline.counters()["in_flight"] <= 2
+    release.set()
+    submitter.join(5)
+    pipeline.close()
+    assert sorted(seen) == list(range(10))
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import pytest
+
+import robots
+from robots import RobotsCache, RobotsPolicy, RobotsRules
+
+
+def rules(*lines):
+    return RobotsRules([(kind == "allow", pattern) for kind, pattern in lines])
+
+
+def test_longest_match_wins():
+    matcher = rules(("disallow", "/a"), ("allow", "/a/b"))
+    assert matcher.allowed("/a/b/c")
+    assert not matcher.allowed("/a/x")
+    assert matcher.allowed("/b")
+
+
+def test_allow_wins_a_tie():
+    assert rules(("disallow", "/p"), ("allow", "/p")).allowed("/p/q")
+    assert rules(("disallow", "/*.php"), ("allow", "/*.php")).allowed("/x.php")
+
+
+@pytest.mark.parametrize("path, allowed", [
+    ("/files/report.pdf", False),
+    ("/report.pdf?download=1", True),  # $ anchors the end of the path
+    ("/a/private/b", False),
+    ("/private", True),
+])
+def test_wildcards(path, allowed):
+    matcher = rules(("disallow", "/*.pdf$"), ("disallow", "/*/private"))
+    assert matcher.allowed(path) is allowed
+
+
+def test_longer_wildcard_beats_shorter_prefix():
+    matcher = rules(("allow", "/shop"), ("disallow", "/shop/*/cart"))
+    assert not matcher.allowed("/shop/12/cart")
+    assert matcher.allowed("/shop/12")
+
+
+def test_root_anchor_only_matches_root():
+    matcher = rules(("disallow", "/$"))
+    assert not matcher.allowed("/")
+    assert matcher.allowed("/page")
+
+
+def test_policy_groups_delay_and_sitemaps():
+    policy = RobotsPolicy(
+        "User-agent: mybot\n"
+        "User-agent: otherbot\n"
+        "Disallow: /private\n"
+        "Crawl-delay: 3\n"
+        "\n"
+        "User-agent: *\n"
+        "Disallow: /\n"
+        "Disallow:\n"
+        "Sitemap: https://example.com/sitemap.xml  # comment\n"
+    )
+    assert policy.sitemaps == ["https://example.com/sitemap.xml"]
+    assert policy.can_fetch("https://example.com/page", "MyBot/1.0")
+    assert not policy.can_fetch("https://example.com/private/x", "otherbot")
+    assert policy.crawl_delay("mybot") == 3.0
+    assert not policy.can_fetch("https://example.com/page", "somebot")
+    assert policy.crawl_delay("somebot") is None
+    assert policy.can_fetch("https://example.com/robots.txt", "somebot")
+
+
+def test_policy_normalises_percent_encoding():
+    policy = RobotsPolicy("User-agent: *\nDisallow: /café\n")
+    assert not policy.can_fetch("https://example.com/caf%c3%a9/menu")
+    assert policy.can_fetch("https://example.com/cafe")
+
+
+@pytest.mark.parametrize("status, error, allowed", [
+    (200, None, False),  # The robots.txt below disallows /private
+    (404, None, True),  # No robots.txt: everything is allowed
+    (410, None, True),
+    (500, None, False),  # Server errors disallow everything
+    (503, None, False),
+    (0, ConnectionError("unreachable"), False),
+])
+def test_cache_status_handling(monkeypatch, status, error, allowed):
+    fetched = []
+
+    def get(url):
+        fetched.append(url)
+        return SimpleNamespace(status_code=status, error=error, text="User-agent: *\nDisallow: /private\n")
+
+    monkeypatch.setattr(robots.fetcher, "get", get)
+    cache = RobotsCache(ttl=60)
+    assert cache.can_fetch("https://example.com/private/page") is allowed
+    assert cache.can_fetch("https://example.com/private/other") is allowed
+    assert fetched == ["https://example.com/robots.txt"]  # Fetched once per host
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from search_index import HeadingIndex, decode_varints, encode_varints, tokenize
+
+
+def test_varints_round_trip():
+    values = [0, 1, 127, 128, 255, 16383, 16384, 2 ** 31, 2 ** 35 + 7]
+    data = encode_varints(values)
+    assert len(encode_varints([127])) == 1
+    assert len(encode_varints([128])) == 2
+    assert decode_varints(data).tolist() == values
+    assert decode_varints(b"").tolist() == []
+
+
+def test_varints_random_round_trip():
+    values = np.random.default_rng(0).integers(0, 2 ** 40, 1000).tolist()
+    assert decode_varints(encode_varints(values)).tolist() == values
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Équations du Second degré") == ["equations", "du", "second", "degre"]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = HeadingIndex(str(tmp_path / "index.sqlite"))
+    index.add_page("https://example.com/algebra", "/math",
+                   {"h1": [{"text": "Linear algebra"}], "h3": [{"text": "Algebra practice for linear equations"}]},
+                   ["Algebra course"])
+    index.add_page("https://example.com/geometry", "/math",
+                   {"h2": [{"text": "Geometry of triangles and algebra review"}]})
+    index.add_page("https://example.com/biology", "/science", {"h2": [{"text": "Cell biology"}]})
+    index.flush()
+    yield index
+    index.close()
+
+
+def test_bm25_prefers_short_and_high_level_documents(index):
+    results = index.search("algebra")
+    texts = [result["text"] for result in results]
+    assert set(texts) == {"Algebra course", "Linear algebra", "Algebra practice for linear equations",
+                          "Geometry of triangles and algebra review"}
+    # Same term frequency: the title (level boost 2.0) beats the h1, both beat the longer headings
+    assert texts[:2] == ["Algebra course", "Linear algebra"]
+    assert [result["score"] for result in results] == sorted((r["score"] for r in results), reverse=True)
+
+
+def test_bm25_length_normalisation(tmp_path):
+    with HeadingIndex(str(tmp_path / "index.sqlite")) as index:
+        index.add_page("https://example.com/long", "/math", {"h2": [{"text": "Fractions with unlike denominators"}]})
+        index.add_page("https://example.com/short", "/math", {"h2": [{"text": "Fractions"}]})
+        index.flush()
+        assert [r["url"] for r in index.search("fractions")] == ["https://example.com/short",
+                                                                 "https://example.com/long"]
+
+
+def test_rarer_terms_score_higher(index):
+    # Same document: "linear" appears in two documents, "equations" only in this one
+    practice = "Algebra practice for linear equations"
+    linear = next(r["score"] for r in index.search("linear") if r["text"] == practice)
+    equations = next(r["score"] for r in index.search("equations") if r["text"] == practice)
+    assert equations > linear
+
+
+def test_phrases_and_sections(index):
+    assert [r["text"] for r in index.search('"linear algebra"')] == ["Linear algebra"]
+    assert index.search('"algebra linear"') == []
+    assert [r["url"] for r in index.search("biology", section="/science")] == ["https://example.com/biology"]
+    assert index.search("biology", section="/math") == []
+    assert index.search("nothing") == []
+
+
+def test_readding_a_page_replaces_it(index):
+    index.add_page("https://example.com/biology", "/science", {"h2": [{"text": "Marine biology"}]})
+    index.flush()
+    assert [r["text"] for r in index.search("biology")] == ["Marine biology"]
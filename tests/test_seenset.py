@@ -0,0 +1,68 @@
+import pytest
+
+from seenset import BloomSeenSet, MemorySeenSet, SqliteSeenSet, make_seen_set
+
+
+@pytest.fixture(params=["memory", "bloom", "sqlite"])
+def seen(request, tmp_path):
+    store = make_seen_set(request.param, str(tmp_path / "seen"))
+    yield store
+    store.close()
+
+
+def test_add_reports_new_keys(seen):
+    assert seen.add("https://example.com/a")
+    assert not seen.add("https://example.com/a")
+    assert seen.add("https://example.com/b")
+    assert "https://example.com/a" in seen
+    assert "https://example.com/c" not in seen
+    assert len(seen) == 2
+
+
+def test_bloom_false_positive_rate_across_stages():
+    seen = BloomSeenSet(capacity=1000, error=0.01)
+    for i in range(5000):
+        seen.add(f"https://example.com/page/{i}")
+    assert len(seen.stages) > 1
+    assert all(f"https://example.com/page/{i}" in seen for i in range(5000))
+    false_positives = sum(f"https://example.com/other/{i}" in seen for i in range(20000))
+    assert false_positives / 20000 < 0.01
+
+
+def test_bloom_survives_restart(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    seen = BloomSeenSet(path)
+    seen.add("https://example.com/a")
+    seen.close()
+    reopened = BloomSeenSet(path)
+    assert "https://example.com/a" in reopened
+    assert len(reopened) == 1
+
+
+def test_sqlite_survives_restart_and_commits_on_flush(tmp_path):
+    path = str(tmp_path / "seen.sqlite")
+    seen = SqliteSeenSet(path, batch=0)
+    seen.add("https://example.com/a")
+    assert len(SqliteSeenSet(path)) == 0  # Not committed until flush
+    seen.flush()
+    seen.add("https://example.com/b")
+    seen.close()
+    reopened = SqliteSeenSet(path)
+    assert "https://example.com/a" in reopened
+    assert "https://example.com/b" in reopened
+    reopened.close()
+
+
+def test_reset_discards_stored_keys(tmp_path):
+    path = str(tmp_path / "seen")
+    seen = make_seen_set("sqlite", path)
+    seen.add("https://example.com/a")
+    seen.close()
+    assert "https://example.com/a" in make_seen_set("sqlite", path)
+    assert len(make_seen_set("sqlite", path, reset=True)) == 0
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        make_seen_set("redis")
+    assert isinstance(make_seen_set("memory"), MemorySeenSet)
@@ -0,0 +1,172 @@
+import gzip
+import threading
+import time
+
+import pytest
+
+import metrics
+import robots
+from metrics import Metrics, StatsSink
+from sitemap import SITEMAP_CONFIG, analyze_sitemap, iter_sitemap, iter_sitemap_urls
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*locs):
+    entries = "".join(f"<url><loc>{loc}</loc><lastmod>2024-01-0{i + 1}</lastmod><priority>0.5</priority></url>"
+                      for i, loc in enumerate(locs))
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'
+
+
+def sitemapindex(*locs):
+    entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NS}>{entries}</sitemapindex>'
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    """Feed the parser a few bytes at a time, so entries span chunk boundaries"""
+    monkeypatch.setitem(SITEMAP_CONFIG, "chunk_size", 16)
+
+
+@pytest.fixture(autouse=True)
+def no_delay(monkeypatch):
+    """No spacing between sitemap requests, and robots.txt read afresh"""
+    monkeypatch.setitem(SITEMAP_CONFIG, "delay", 0)
+    monkeypatch.setattr(robots, "_robots", None)
+    monkeypatch.setattr(metrics, "_metrics", Metrics([StatsSink()]))
+
+
+def test_iter_sitemap_streams_url_entries(site):
+    site.routes["/sitemap.xml"] = (200, {}, urlset("http://example.com/a", "http://example.com/b"))
+
+    entries = list(iter_sitemap(site.url("/sitemap.xml")))
+
+    assert entries == [
+        {"type": "url", "loc": "http://example.com/a", "lastmod": "2024-01-01", "priority": "0.5"},
+        {"type": "url", "loc": "http://example.com/b", "lastmod": "2024-01-02", "priority": "0.5"}
+    ]
+
+
+def test_iter_sitemap_gunzips_sitemap_files(site):
+    site.routes["/sitemap.xml.gz"] = (200, {"Content-Type": "application/x-gzip"},
+                                      gzip.compress(urlset("http://example.com/a").encode()))
+
+    assert [entry["loc"] for entry in iter_sitemap(site.url("/sitemap.xml.gz"))] == ["http://example.com/a"]
+
+
+def test_iter_sitemap_undoes_transport_compression(site):
+    site.routes["/sitemap.xml"] = (200, {"Content-Encoding": "gzip"},
+                                   gzip.compress(urlset("http://example.com/a").encode()))
+
+    assert [entry["loc"] for entry in iter_sitemap(site.url("/sitemap.xml"))] == ["http://example.com/a"]
+
+
+def test_iter_sitemap_reports_index_entries(site):
+    site.routes["/index.xml"] = (200, {}, sitemapindex("http://example.com/1.xml"))
+
+    assert list(iter_sitemap(site.url("/index.xml"))) == [
+        {"type": "sitemap", "loc": "http://example.com/1.xml", "lastmod": None}
+    ]
+
+
+def test_iter_sitemap_urls_expands_every_child(site):
+    site.routes["/index.xml"] = (200, {}, sitemapindex(site.url("/1.xml"), site.url("/2.xml.gz")))
+    site.routes["/1.xml"] = (200, {}, urlset("http://example.com/a", "http://example.com/b"))
+    site.routes["/2.xml.gz"] = (200, {}, gzip.compress(urlset("http://example.com/c").encode()))
+
+    locs = {entry["loc"] for entry in iter_sitemap_urls(site.url("/index.xml"), workers=2)}
+
+    assert locs == {"http://example.com/a", "http://example.com/b", "http://example.com/c"}
+
+
+def test_iter_sitemap_urls_caps_the_expanded_children(site):
+    site.routes["/index.xml"] = (200, {}, sitemapindex(*(site.url(f"/{i}.xml") for i in range(5))))
+    for i in range(5):
+        site.routes[f"/{i}.xml"] = (200, {}, urlset(f"http://example.com/{i}"))
+
+    entries = list(iter_sitemap_urls(site.url("/index.xml"), workers=2, max_sitemaps=2))
+
+    assert sorted(entry["loc"] for entry in entries) == ["http://example.com/0", "http://example.com/1"]
+    assert "/2.xml" not in site.paths()
+
+
+def test_iter_sitemap_urls_of_a_plain_sitemap(site):
+    site.routes["/sitemap.xml"] = (200, {}, urlset("http://example.com/a"))
+
+    assert [entry["loc"] for entry in iter_sitemap_urls(site.url("/sitemap.xml"))] == ["http://example.com/a"]
+
+
+def test_closing_iter_sitemap_urls_early_stops_its_threads(site):
+    site.routes["/index.xml"] = (200, {}, sitemapindex(*(site.url(f"/{i}.xml") for i in range(20))))
+    for i in range(20):
+        site.routes[f"/{i}.xml"] = (200, {}, urlset(*(f"http://example.com/{i}/{j}" for j in range(50))))
+
+    def sitemap_threads():
+        return [thread for thread in threading.enumerate() if thread.name.endswith(("(feed)", "(expand)"))]
+
+    urls = iter_sitemap_urls(site.url("/index.xml"), workers=4)
+    next(urls)
+    urls.close()
+
+    deadline = time.monotonic() + 5
+    while sitemap_threads() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not sitemap_threads()
+
+
+def test_analyze_sitemap_expands_an_index_without_downloading_it_again(site):
+    site.routes["/index.xml"] = (200, {}, sitemapindex(site.url("/1.xml"), site.url("/2.xml")))
+    site.routes["/1.xml"] = (200, {}, urlset("http://example.com/a"))
+    site.routes["/2.xml"] = (200, {}, urlset("http://example.com/b"))
+
+    analysis = analyze_sitemap(site.url("/index.xml"), expand=True)
+
+    assert analysis["type"] == "sitemap_index"
+    assert analysis["count"] == 2
+    assert analysis["url_count"] == 2
+    assert sorted(site.paths()) == ["/1.xml", "/2.xml", "/index.xml", "/robots.txt"]
+
+
+def test_analyze_sitemap_lists_every_child_beyond_the_expansion_cap(site):
+    site.routes["/index.xml"] = (200, {}, sitemapindex(*(site.url(f"/{i}.xml") for i in range(3))))
+    for i in range(3):
+        site.routes[f"/{i}.xml"] = (200, {}, urlset(f"http://example.com/{i}"))
+
+    analysis = analyze_sitemap(site.url("/index.xml"), expand=True, max_sitemaps=1)
+
+    assert (analysis["count"], analysis["url_count"]) == (3, 1)
+    assert analysis["sitemaps"] == [site.url(f"/{i}.xml") for i in range(3)]
+    assert site.paths().count("/index.xml") == 1
+
+
+@pytest.mark.parametrize("expand", [False, True])
+def test_analyze_sitemap_reports_a_missing_sitemap(site, expand):
+    analysis = analyze_sitemap(site.url("/missing.xml"), expand=expand)
+
+    assert analysis["type"] == "error"
+    assert "404" in analysis["error"]
+
+
+def test_child_sitemaps_are_spaced_by_the_robots_crawl_delay(site):
+    site.routes["/robots.txt"] = (200, {}, "User-agent: *\nCrawl-delay: 0.3\n")
+    site.routes["/index.xml"] = (200, {}, sitemapindex(*(site.url(f"/{i}.xml") for i in range(3))))
+    for i in range(3):
+        site.routes[f"/{i}.xml"] = (200, {}, urlset(f"http://example.com/{i}"))
+
+    assert len(list(iter_sitemap_urls(site.url("/index.xml"), workers=3))) == 3
+
+    times = [at for path, _, at in site.requests if path != "/robots.txt"]
+    assert min(b - a for a, b in zip(times, times[1:])) >= 0.25
+
+
+def test_sitemap_downloads_are_counted_in_the_metrics(site):
+    body = urlset("http://example.com/a")
+    site.routes["/sitemap.xml"] = (200, {}, body)
+
+    list(iter_sitemap(site.url("/sitemap.xml")))
+
+    host = f"127.0.0.1:{site.port}"
+    counters = metrics.get_metrics().snapshot()["counters"]
+    assert counters[f'fetch_responses_total{{host="{host}",status="200"}}'] == 1
+    assert counters[f'fetch_bytes_total{{host="{host}"}}'] == len(body)
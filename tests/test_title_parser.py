@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.bench_parsers import FIXTURES_DIR, legacy_titles, load_fixtures
+from title_parser import BACKENDS, parse_titles, resolve_backend
+
+FIXTURES = load_fixtures(FIXTURES_DIR)
+
+NAV_PAGE = """<html><body>
+<h1>Ignored heading</h1>
+<a data-test-id="nav-item" href="/math"> Math </a>
+<div class="subject-title">Science</div>
+<span class="course-title">Algebra 1</span>
+<a data-test-id="nav-item" href="/empty">  </a>
+<a data-test-id="nav-item" href="/arts">Arts</a>
+</body></html>"""
+
+HASHED_PAGE = """<html><body>
+<h1 class="_1lrvdlvj">Course</h1><h2>Plain</h2><h3 class="title x">Lesson</h3>
+</body></html>"""
+
+PLAIN_PAGE = "<html><body><h4>Too deep</h4><h2>Second</h2><h1>First</h1><h3>Third</h3></body></html>"
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+@pytest.mark.parametrize("fixture", sorted(FIXTURES))
+def test_every_backend_matches_the_original_parser_on_the_fixtures(backend, fixture):
+    html = FIXTURES[fixture]
+
+    assert parse_titles(html, backend) == legacy_titles(html)
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+@pytest.mark.parametrize("html", [NAV_PAGE, HASHED_PAGE, PLAIN_PAGE, "", "<html></html>"],
+                         ids=["nav", "hashed", "plain", "empty", "no-body"])
+def test_every_backend_keeps_the_original_priority_order(backend, html):
+    assert parse_titles(html, backend) == legacy_titles(html)
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_every_backend_parses_pages_with_an_xml_declaration(backend):
+    html = '<?xml version="1.0" encoding="utf-8"?>\n' + NAV_PAGE.replace("Science", "Sciençe")
+
+    assert parse_titles(html, backend) == ["Math", "Arts", "Sciençe", "Algebra 1"]
+
+
+def test_priority_order():
+    assert parse_titles(NAV_PAGE, "html.parser") == ["Math", "Arts", "Science", "Algebra 1"]
+    assert parse_titles(HASHED_PAGE, "html.parser") == ["Course", "Lesson"]
+    assert parse_titles(PLAIN_PAGE, "html.parser") == ["Second", "First", "Third"]
+
+
+def test_resolve_backend():
+    assert resolve_backend("auto") in BACKENDS
+    assert resolve_backend("lxml") == "lxml"
+    with pytest.raises(ValueError):
+        resolve_backend("regex")
@@ -0,0 +1,105 @@
+import re
+
+from bs4 import BeautifulSoup
+
+# Backends tried, fastest first, when the parser is "auto"
+AUTO_ORDER = ["selectolax", "lxml", "html.parser"]
+
+HASHED_HEADINGS = {"h1": "_1lrvdlvj", "h2": "_14hvi6g8", "h3": "title"}
+
+# lxml refuses str input that declares its encoding (the text is already decoded)
+XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+def _bs4_elements(html, features):
+    soup = BeautifulSoup(html, features)
+    for element in soup.find_all(True):
+        yield element.name, element.get("class") or [], element.get("data-test-id"), element
+
+
+def _html_parser_elements(html):
+    return _bs4_elements(html, "html.parser")
+
+
+def _lxml_elements(html):
+    import lxml.html
+    if not html.strip():
+        return
+    root = lxml.html.document_fromstring(XML_DECLARATION.sub("", html, count=1))
+    for element in root.iter():
+        if isinstance(element.tag, str):  # Skip comments and processing instructions
+            yield (element.tag, element.get("class", "").split(),
+                   element.get("data-test-id"), element)
+
+
+def _selectolax_elements(html):
+    from selectolax.lexbor import LexborHTMLParser
+    root = LexborHTMLParser(html).root
+    if root is None:
+        return
+    for node in root.traverse():
+        attributes = node.attributes
+        yield (node.tag, (attributes.get("class") or "").split(),
+               attributes.get("data-test-id"), node)
+
+
+# name -> (element iterator, element text)
+BACKENDS = {
+    "html.parser": (_html_parser_elements, lambda element: element.text),
+    "lxml": (_lxml_elements, lambda element: element.text_content()),
+    "selectolax": (_selectolax_elements, lambda node: node.text(deep=True))
+}
+
+# name -> attribute of an element (None when missing), for extractors beyond titles
+ATTRIBUTES = {
+    "html.parser": lambda element, name: element.get(name),
+    "lxml": lambda element, name: element.get(name),
+    "selectolax": lambda node, name: node.attributes.get(name)
+}
+
+
+def resolve_backend(name="auto"):
+    """Return the backend name to use, picking the fastest installed one for "auto" """
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown parser backend: {name}")
+        return name
+    for candidate in AUTO_ORDER:
+        try:
+            if candidate == "selectolax":
+                import selectolax.lexbor  # noqa: F401
+            elif candidate == "lxml":
+                import lxml.html  # noqa: F401
+            return candidate
+        except ImportError:
+            continue
+    return "html.parser"
+
+
+def parse_titles(html, backend="auto"):
+    """Extract titles from a page in a single pass over its elements
+
+    Applies the same rules, in the same priority order, as the original
+    chain of soup.select calls: nav items, subject/domain titles and course
+    titles; failing those the hashed heading classes; failing those every
+    h1-h3. Returns stripped, non-empty texts (duplicates included).
+    """
+    iter_elements, text_of = BACKENDS[resolve_backend(backend)]
+    nav, subjects, courses, hashed, headings = [], [], [], [], []
+    for tag, classes, test_id, element in iter_elements(html):
+        if tag == "a" and test_id == "nav-item":
+            nav.append(element)
+        if "subject-title" in classes or "domain-title" in classes:
+            subjects.append(element)
+        if "course-title" in classes:
+            courses.append(element)
+        if tag in HASHED_HEADINGS:
+            headings.append(element)
+            if HASHED_HEADINGS[tag] in classes:
+                hashed.append(element)
+
+    for group in (nav + subjects + courses, hashed, headings):
+        titles = [text.strip() for text in map(text_of, group) if text.strip()]
+        if titles:
+            return titles
+    return []